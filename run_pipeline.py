@@ -1,21 +1,70 @@
 """Script para executar todo o pipeline de coleta e análise de dados (MARKET INTENT ENGINE V2)."""
+import argparse
 import sys
 import subprocess
+import traceback
 from pathlib import Path
 from datetime import datetime
 
+from src.utils.dag import RUNS_LOG, Stage, StageGraph, critical_path, run_graph, save_run_timings
+
 PROJECT_ROOT = Path(__file__).resolve().parent
 
+
+# --- In-process stages: each takes the shared context and stores its output in it ---
+
+def collect_products(ctx: dict):
+    from src.database import init_db
+    from src.services.mercadolivre_service import fetch_products
+
+    init_db()
+    # Same defaults as `python -m src.services.mercadolivre_service`
+    ctx["ml_data"] = fetch_products(max_keywords=10, products_per_keyword=6)
+
+
+def score_opportunities(ctx: dict):
+    from src.services import pipeline_v2
+
+    # ML products are handed over in memory; other inputs still come from data/raw
+    ctx["opportunities"] = pipeline_v2.main(ml_data=ctx.get("ml_data"))
+
+
+def run_callable(func, ctx: dict, description: str = "") -> bool:
+    """Executa uma etapa no mesmo processo e retorna True se bem-sucedida."""
+    print(f"\n{'=' * 60}")
+    print(f"🔄 {description}")
+    print(f"{'=' * 60}")
+
+    try:
+        func(ctx)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            print(f"❌ Erro: etapa encerrou com código {e.code}")
+            return False
+    except Exception as e:
+        traceback.print_exc()
+        print(f"❌ Erro ao executar: {e}")
+        return False
+
+    print(f"✅ {description} - Concluído!")
+    return True
+
+
 def run_command(module_name: str, args: list[str] = None, description: str = "") -> bool:
     """Executa um módulo Python como script e retorna True se bem-sucedido."""
+    return _run_subprocess([sys.executable, "-m", module_name] + (args or []), description)
+
+
+def run_script(script: str, args: list[str] = None, description: str = "") -> bool:
+    """Executa um script legado (sources/*.py importam módulos vizinhos pelo sys.path)."""
+    return _run_subprocess([sys.executable, str(PROJECT_ROOT / script)] + (args or []), description)
+
+
+def _run_subprocess(cmd: list[str], description: str) -> bool:
     print(f"\n{'=' * 60}")
     print(f"🔄 {description}")
     print(f"{'=' * 60}")
     
-    cmd = [sys.executable, "-m", module_name]
-    if args:
-        cmd.extend(args)
-    
     try:
         # Usamos cwd=PROJECT_ROOT para garantir que o python path inclua a raiz (src/)
         result = subprocess.run(
@@ -40,56 +89,150 @@ def run_command(module_name: str, args: list[str] = None, description: str = "")
         return False
 
 
-def main():
-    print(f"""
-╔══════════════════════════════════════════════════════════╗
-║             MARKET RADAR - INTENT ENGINE V2.0            ║
-║         Predictive Market Gap Identification System      ║
-╚══════════════════════════════════════════════════════════╝
-
-Iniciado em: {datetime.now().strftime('%d/%m/%Y às %H:%M:%S')}
-Mode: V2 SCORING (Velocity + Gap + Quality)
-""")
-    
-    steps = [
+def pipeline_steps(full: bool = False) -> list[dict]:
+    """Grafo de etapas: cada etapa declara os artefatos que consome e produz.
+    Etapas sem dependência entre si rodam em paralelo."""
+    collectors = [
+        # 0. SIGNAL COLLECTORS (independent producers, legacy scripts)
+        {
+            "name": "google_trends",
+            "script": "sources/google_trends.py",
+            "outputs": ("google_trends",),
+            "optional": True,
+            "desc": "📰 Coletando Google News (contexto)"
+        },
+        {
+            "name": "intent_signals",
+            "script": "sources/intent_signals.py",
+            "outputs": ("intent_signals",),
+            "optional": True,
+            "desc": "📡 Coletando Sinais de Intenção (Marketplace)"
+        },
+        {
+            "name": "ml_trends",
+            "script": "sources/ml_trends.py",
+            "outputs": ("ml_keywords",),
+            "optional": True,
+            "desc": "🔎 Coletando Keywords das Vitrines ML"
+        },
+        # AI clustering starts as soon as signals + context are in
+        {
+            "name": "ai_clusters",
+            "script": "sources/ai_processor.py",
+            "inputs": ("intent_signals", "google_trends"),
+            "outputs": ("intent_clusters",),
+            "optional": True,
+            "desc": "🤖 Clusterizando Sinais com IA"
+        },
+        {
+            "name": "amazon",
+            "script": "sources/amazon.py",
+            "inputs": ("intent_clusters", "ml_keywords"),
+            "outputs": ("amazon_products",),
+            "optional": True,
+            "desc": "🛒 Validando na Amazon BR"
+        },
+    ]
+    core = [
         # 1. COLLECT CURATED PRODUCTS (Official API)
         {
+            "name": "ml_products",
             "module": "src.services.mercadolivre_service",
             "args": [],
+            "call": collect_products,
+            "outputs": ("ml_products",),
             "desc": "📦 Coletando Produtos Curados (Official API)"
         },
         
         # 2. V2 ORCHESTRATION (Snapshot -> Scoring -> Persistence)
         {
+            "name": "scoring",
             "module": "src.services.pipeline_v2",
+            "call": score_opportunities,
+            "inputs": ("ml_products", "amazon_products", "intent_clusters"),
+            "outputs": ("opportunities",),
             "desc": "🏆 Executando Motor de Scoring V2 (Velocidade, Lacuna, Qualidade)"
         }
     ]
+    return (collectors if full else []) + core
+
+
+def build_graph(steps: list[dict], isolated: bool = False) -> StageGraph:
+    def runner(step):
+        if step.get("script"):
+            return lambda ctx: run_script(step["script"], step.get("args"), step["desc"])
+        if isolated:
+            return lambda ctx: run_command(step["module"], step.get("args"), step["desc"])
+        return lambda ctx: run_callable(step["call"], ctx, step["desc"])
+
+    return StageGraph([
+        Stage(
+            name=step["name"],
+            run=runner(step),
+            inputs=step.get("inputs", ()),
+            outputs=step.get("outputs", ()),
+            optional=step.get("optional", False),
+            description=step["desc"]
+        )
+        for step in steps
+    ])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Executa o pipeline completo (Intent Engine V2)")
+    parser.add_argument("--isolated", action="store_true",
+                        help="Executa cada etapa em um subprocesso (python -m), como antes")
+    parser.add_argument("--full", action="store_true",
+                        help="Inclui os coletores (Google, sinais, vitrines ML, IA, Amazon)")
+    parser.add_argument("--workers", type=int, default=4, help="Etapas independentes em paralelo")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"""
+╔══════════════════════════════════════════════════════════╗
+║             MARKET RADAR - INTENT ENGINE V2.0            ║
+║         Predictive Market Gap Identification System      ║
+╚══════════════════════════════════════════════════════════╝
+
+Iniciado em: {datetime.now().strftime('%d/%m/%Y às %H:%M:%S')}
+Mode: V2 SCORING (Velocity + Gap + Quality)
+Execução: {'subprocessos isolados' if args.isolated else 'in-process'} ({args.workers} workers)
+""")
+    
+    graph = build_graph(pipeline_steps(full=args.full), isolated=args.isolated)
+    results = run_graph(graph, ctx={}, max_workers=args.workers)
+    save_run_timings(graph, results, path=RUNS_LOG)
     
-    success_count = 0
-    total_steps = len(steps)
+    total_steps = len(results)
+    success_count = sum(1 for r in results.values() if r.status == "ok")
+    required_failed = [n for n, r in results.items() if r.status != "ok" and not graph.stages[n].optional]
     
-    for step in steps:
-        ok = run_command(step["module"], step.get("args"), step["desc"])
-        if ok:
-            success_count += 1
-            continue
-
-        if step.get("optional"):
-            print(f"\n⚠️  Falha na etapa opcional: {step['desc']} (prosseguindo)")
-            continue
-
-        print(f"\n⚠️  Falha na etapa: {step['desc']}")
-        print("Pipeline interrompido.")
-        break
+    for name, r in results.items():
+        stage = graph.stages[name]
+        if r.status == "failed" and stage.optional:
+            print(f"\n⚠️  Falha na etapa opcional: {stage.description} (prosseguindo)")
+        elif r.status == "failed":
+            print(f"\n⚠️  Falha na etapa: {stage.description}")
+        elif r.status == "skipped":
+            print(f"\n⏭️  Etapa ignorada (dependência falhou): {stage.description}")
     
     print(f"\n{'=' * 60}")
     print(f"📊 RESUMO DO PIPELINE V2")
     print(f"{'=' * 60}")
     print(f"✅ Etapas concluídas: {success_count}/{total_steps}")
+    print(f"⏱️  Tempo por etapa:")
+    icons = {"ok": "✅", "failed": "❌", "skipped": "⏭️ "}
+    for name in graph.order:
+        r = results[name]
+        print(f"   {icons[r.status]} +{r.started:6.2f}s {r.duration:7.2f}s  {graph.stages[name].description}")
+    chain = critical_path(graph, results)
+    print(f"   Caminho crítico: {' -> '.join(chain)} ({sum(results[n].duration for n in chain):.2f}s)")
+    print(f"   Total: {max((r.finished for r in results.values()), default=0.0):.2f}s")
     print(f"📁 Relatórios salvos em: {PROJECT_ROOT / 'data' / 'reports'}")
     
-    if success_count == total_steps:
+    if not required_failed:
         print(f"\n🎉 Pipeline V2 executado com sucesso!")
         print(f"\n💡 Próximos passos:")
         print(f"   1. Iniciar o servidor: python -m src.app.server")
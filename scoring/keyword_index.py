@@ -0,0 +1,82 @@
+"""N-gram inverted index for the ranker's fuzzy keyword matching."""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional
+
+GRAM = 3
+
+
+class KeywordIndex:
+    """Finds the first keyword (in insertion order) that is a substring of a term or
+    contains it -- the same answer as scanning ``for k in keys: if k in term or term in k``,
+    without touching every keyword.
+
+    - ``k in term``: keywords are indexed by their first ``GRAM`` chars; only keywords whose
+      prefix occurs somewhere in the term are verified.
+    - ``term in k``: keywords are indexed by every ``GRAM``-gram; only the posting list of the
+      term's rarest gram is verified.
+    """
+
+    def __init__(self, keywords: Iterable[str] = ()):
+        self._keys: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._by_prefix: Dict[str, List[int]] = {}
+        self._by_gram: Dict[str, List[int]] = {}
+        for kw in keywords:
+            self.add(kw)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, keyword: str):
+        if not keyword or keyword in self._ids:
+            return
+        kid = len(self._keys)
+        self._keys.append(keyword)
+        self._ids[keyword] = kid
+        # Posting lists stay sorted by id because ids only grow
+        self._by_prefix.setdefault(keyword[:GRAM], []).append(kid)
+        for gram in {keyword[i:i + GRAM] for i in range(len(keyword) - GRAM + 1)}:
+            self._by_gram.setdefault(gram, []).append(kid)
+
+    def find(self, term: str) -> Optional[str]:
+        """Earliest keyword ``k`` with ``k in term or term in k`` (None if there is none)."""
+        if not term:
+            return self._keys[0] if self._keys else None  # "" is in every keyword
+        best = min(self._contained_in(term), self._containing(term))
+        return self._keys[best] if best < len(self._keys) else None
+
+    # --- Internals ---
+
+    def _contained_in(self, term: str) -> int:
+        """Smallest id of a keyword that is a substring of ``term``."""
+        best = len(self._keys)
+        for pos in range(len(term)):
+            for n in range(1, GRAM + 1):
+                if pos + n > len(term):
+                    break
+                for kid in self._by_prefix.get(term[pos:pos + n], ()):
+                    if kid >= best:
+                        break
+                    # Keywords shorter than GRAM are filed under their full text
+                    if term.startswith(self._keys[kid], pos):
+                        best = kid
+                        break
+        return best
+
+    def _containing(self, term: str) -> int:
+        """Smallest id of a keyword that contains ``term``."""
+        if len(term) < GRAM:
+            # Too short to use the gram index (rare): plain scan
+            return next((kid for kid, key in enumerate(self._keys) if term in key), len(self._keys))
+
+        postings = []
+        for i in range(len(term) - GRAM + 1):
+            posting = self._by_gram.get(term[i:i + GRAM])
+            if not posting:
+                return len(self._keys)  # Some gram appears in no keyword
+            postings.append(posting)
+        for kid in min(postings, key=len):
+            if term in self._keys[kid]:
+                return kid
+        return len(self._keys)
@@ -16,6 +16,9 @@ sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 # IMPORTANT: Import patch BEFORE database to enable Postgres
 from sources import database_patch
 from sources import database
+from scoring.keyword_index import KeywordIndex
+from src.utils.jsonl import iter_records, read_records
+from src.utils.raw_manifest import get_manifest
 
 DATA_DIR = Path(__file__).resolve().parents[1] / "data"
 RAW_DIR = DATA_DIR / "raw"
@@ -92,14 +95,25 @@ class Opportunity:
 
 
 def _latest(prefix: str) -> Optional[Path]:
-    candidates = sorted(RAW_DIR.glob(f"{prefix}-*.json"), key=lambda p: p.stat().st_mtime)
-    return candidates[-1] if candidates else None
+    return get_manifest(RAW_DIR).latest(prefix)
 
-def _load_json(path: Path) -> Any:
-    if not path or not path.exists():
-        return []
-    with path.open(encoding="utf-8") as fp:
-        return json.load(fp)
+def _group_items(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Stream a scraped artifact into per-keyword aggregates (first item, item count,
+    price sum/count), so memory grows with keywords rather than items."""
+    groups: Dict[str, Dict[str, Any]] = {}
+    for item in iter_records(path):
+        if not isinstance(item, dict):
+            continue
+        sk = item.get("search_keyword", "") or item.get("keyword", "") or item.get("title", "")
+        sk = sk.strip().lower()
+        if not sk:
+            continue
+        group = groups.setdefault(sk, {"first": item, "count": 0, "price_sum": 0, "price_count": 0})
+        group["count"] += 1
+        if item.get("price"):
+            group["price_sum"] += item["price"]
+            group["price_count"] += 1
+    return groups
 
 def build_opportunities(
     clusters_path: Optional[Path], 
@@ -111,7 +125,7 @@ def build_opportunities(
 
     # 1. Load Intent Clusters (The Foundation)
     if clusters_path and clusters_path.exists():
-        clusters = _load_json(clusters_path)
+        clusters = read_records(clusters_path)
         print(f"[info] Loading {len(clusters)} intent clusters from {clusters_path.name}...")
         
         for cluster in clusters:
@@ -148,111 +162,84 @@ def build_opportunities(
                 opp.signals["signal_diversity_count"] = len(source_signals)
                 opp.meta.update(metadata)
 
+    # Substring matches for scraped keywords without an exact key
+    index = KeywordIndex(opps)
+
     # 2. Enrich with Mercado Livre Data (Validation)
     if ml_path and ml_path.exists():
-        ml_data = _load_json(ml_path)
-        # Handle dict wrapper if present
-        if isinstance(ml_data, dict):
-            # Try to find the list of items
-            if "opportunities" in ml_data: ml_data = ml_data["opportunities"]
-            elif "products" in ml_data: ml_data = ml_data["products"]
-            elif "items" in ml_data: ml_data = ml_data["items"]
-            elif "keywords" in ml_data: ml_data = ml_data["keywords"] 
-        
-        print(f"[info] Processing Mercado Livre data for validation ({len(ml_data) if isinstance(ml_data, list) else 'unknown'} items)...")
-        
-        kw_groups = {}
-        if isinstance(ml_data, list):
-            for item in ml_data:
-                # Normalize key for matching
-                sk = item.get("search_keyword", "") or item.get("keyword", "") or item.get("title", "")
-                sk = sk.strip().lower()
-                if sk:
-                    kw_groups.setdefault(sk, []).append(item)
+        # Legacy dict wrappers ({"products": [...]}, ...) are unwrapped by iter_records
+        kw_groups = _group_items(ml_path)
+        print(f"[info] Processing Mercado Livre data for validation ({sum(g['count'] for g in kw_groups.values())} items)...")
                 
         # Update Opportunities
-        for kw, items in kw_groups.items():
-            if not items: continue
+        for kw, group in kw_groups.items():
+            best_item = group["first"]
             
             # Match Logic
             opp = opps.get(kw)
             
             # Fuzzy Logic
             if not opp:
-                for existing_kw in list(opps.keys()):
-                    if existing_kw in kw or kw in existing_kw:
-                        opp = opps[existing_kw]
-                        break
+                match = index.find(kw)
+                if match: opp = opps[match]
             
             # Unclustered Logic
             if not opp:
-                opp = Opportunity(keyword=items[0].get("search_keyword", kw), intent_cluster="Unclustered Signal")
+                opp = Opportunity(keyword=best_item.get("search_keyword", kw), intent_cluster="Unclustered Signal")
                 opp.signals["intent_confidence"] = 0.2
                 opps[kw] = opp
+                index.add(kw)
             
             # Validation Logic
-            validation_score = min(len(items) / 5.0, 1.0)
+            validation_score = min(group["count"] / 5.0, 1.0)
             opp.signals["market_validation"] = max(opp.signals.get("market_validation", 0), validation_score)
             
             # Metadata Update
-            best_item = items[0]
             if not opp.meta.get("url"): opp.meta["url"] = best_item.get("permalink", "") or best_item.get("url", "")
             if not opp.meta.get("thumbnail"): opp.meta["thumbnail"] = best_item.get("thumbnail", "")
             
-            valid_prices = [i.get("price", 0) for i in items if i.get("price")]
-            if valid_prices:
-                avg_price = sum(valid_prices) / len(valid_prices)
+            if group["price_count"]:
+                avg_price = group["price_sum"] / group["price_count"]
                 if "price" not in opp.meta: opp.meta["price"] = f"R$ {avg_price:.2f}"
                 opp.meta["ml_avg_price"] = f"R$ {avg_price:.2f}"
             
-            opp.meta["ml_count"] = len(items)
+            opp.meta["ml_count"] = group["count"]
             opp.meta["marketplace"] = "Mercado Livre" # default primary
 
     # 3. Enrich with Amazon Data (Optional)
     if amazon_path and amazon_path.exists():
-        amz_data = _load_json(amazon_path)
-        if isinstance(amz_data, dict):
-             if "items" in amz_data: amz_data = amz_data["items"]
-             elif "products" in amz_data: amz_data = amz_data["products"]
-
-        kw_groups = {}
-        if isinstance(amz_data, list):
-            for item in amz_data:
-                sk = item.get("search_keyword", "") or item.get("keyword", "") or item.get("title", "")
-                sk = sk.strip().lower()
-                if sk: kw_groups.setdefault(sk, []).append(item)
+        kw_groups = _group_items(amazon_path)
         
-        for kw, items in kw_groups.items():
+        for kw, group in kw_groups.items():
+            first = group["first"]
             # Match Logic
             opp = opps.get(kw)
             if not opp: 
-                for existing_kw in list(opps.keys()):
-                    if existing_kw in kw or kw in existing_kw:
-                        opp = opps[existing_kw]
-                        break
+                match = index.find(kw)
+                if match: opp = opps[match]
             
             # Unclustered Logic for Amazon
-            if not opp and items:
-                opp = Opportunity(keyword=items[0].get("search_keyword", kw), intent_cluster="Amazon Only Signal")
+            if not opp:
+                opp = Opportunity(keyword=first.get("search_keyword", kw), intent_cluster="Amazon Only Signal")
                 opp.signals["intent_confidence"] = 0.2
                 opps[kw] = opp
+                index.add(kw)
             
-            if opp and items:
+            if opp:
                 current = opp.signals.get("market_validation", 0)
                 # Boost if Amazon also confirms
                 opp.signals["market_validation"] = min(current + 0.3, 1.0) 
                 opp.meta["amazon_validation"] = True
                 
                 # Metadata fallback
-                if not opp.meta.get("thumbnail") and items[0].get("thumbnail"):
-                     opp.meta["thumbnail"] = items[0]["thumbnail"]
-                if not opp.meta.get("url") and items[0].get("permalink"):
-                     opp.meta["url"] = items[0].get("permalink")
+                if not opp.meta.get("thumbnail") and first.get("thumbnail"):
+                     opp.meta["thumbnail"] = first["thumbnail"]
+                if not opp.meta.get("url") and first.get("permalink"):
+                     opp.meta["url"] = first.get("permalink")
                      
                 # Amazon Prices
-                valid_prices = [i.get("price", 0) for i in items if i.get("price")]
-                if valid_prices:
-                    avg_price = sum(valid_prices) / len(valid_prices)
+                if group["price_count"]:
+                    avg_price = group["price_sum"] / group["price_count"]
                     opp.meta["amz_avg_price"] = f"R$ {avg_price:.2f}"
                     # If this opp was Amazon Only, set main price
                     if opp.intent_cluster == "Amazon Only Signal":
@@ -288,16 +275,15 @@ def main() -> None:
     parser.add_argument("--max-items", type=int, default=50)
     
     # Defaults to latest available files
-    clusters_file = DATA_DIR / "raw" / "intent_clusters_latest.json"
+    clusters_file = _latest("intent_clusters")
     mercado_file = _latest("mercado_livre") # Scraped data
     
     # Validation
-    if not clusters_file.exists():
-        # Try to find any clusters file
-        found = _latest("intent_clusters")
-        if found: 
-            clusters_file = found
-            print(f"[info] Using fallback cluster file: {found.name}")
+    if not clusters_file:
+        # Fallback to the legacy pointer file
+        clusters_file = RAW_DIR / "intent_clusters_latest.json"
+        if clusters_file.exists():
+            print(f"[info] Using fallback cluster file: {clusters_file.name}")
         else:
             print("[warn] No intent clusters found. Run ai_processor.py first.")
 
@@ -0,0 +1,115 @@
+"""Benchmark the HTML parser backends on saved search pages.
+
+Usage:
+    python scripts/bench_html_parser.py [--fixtures DIR] [--repeat N]
+
+Pages come from ``DIR/*.html``; by default, from the HTML responses in the HTTP
+cache (data/cache/http). Without any, synthetic pages shaped like Amazon/ML
+search results are generated.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from src.utils.html_parser import BACKENDS, JSON_LD, parse_html
+from src.utils.http_cache import CACHE_DIR
+
+AMAZON_CARD = 'div[data-component-type="s-search-result"]'
+ML_CARDS = [".ui-search-result__wrapper", ".andes-card"]
+ONLY = [AMAZON_CARD, *ML_CARDS, JSON_LD]
+
+
+def cached_pages(cache_dir: Path) -> List[str]:
+    pages = []
+    for meta_path in sorted(cache_dir.glob("*.meta.json")):
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except ValueError:
+            continue
+        content_type = str(meta.get("headers", {}).get("Content-Type", ""))
+        body = meta_path.with_name(meta_path.name.replace(".meta.json", ".body"))
+        if "html" in content_type and body.exists():
+            pages.append(body.read_bytes().decode("utf-8", "replace"))
+    return pages
+
+
+def synthetic_page(kind: str, cards: int = 48) -> str:
+    """Search-result page with realistic bulk around the cards (nav, inline JS, footer)."""
+    noise = "".join(f'<li class="nav-item"><a href="/c/{i}">Categoria {i}</a></li>' for i in range(300))
+    script = "<script>window.__STATE__=" + json.dumps({"k": ["x" * 40] * 2000}) + "</script>"
+    if kind == "amazon":
+        body = "".join(
+            f'<div data-component-type="s-search-result" class="s-result-item"><div class="a-section">'
+            f'<h2 class="a-size-base s-line-clamp-2"><span>Produto {i} com nome comprido</span></h2>'
+            f'<span class="a-price"><span class="a-price-whole">1.{i:03d}</span></span>'
+            f'<a class="a-link-normal s-no-outline" href="/dp/B0{i:08d}">link</a>'
+            f'<img class="s-image" src="https://m.media-amazon.com/{i}.jpg"/>'
+            f'<span class="a-icon-alt">4,{i % 10} de 5 estrelas</span><i class="a-icon-prime"></i></div></div>'
+            for i in range(cards)
+        )
+    else:
+        body = "".join(
+            f'<li class="ui-search-layout__item"><div class="ui-search-result__wrapper"><div class="andes-card">'
+            f'<a class="poly-component__title" href="https://produto.mercadolivre.com.br/MLB-{i}">Produto {i}</a>'
+            f'<div class="poly-price__current"><span class="andes-money-amount__fraction">{i + 10}</span></div>'
+            f'<img data-src="https://http2.mlstatic.com/{i}.webp"/><span>Frete grátis</span></div></div></li>'
+            for i in range(cards)
+        )
+    ld = '<script type="application/ld+json">' + json.dumps(
+        {"@type": "ItemList", "itemListElement": [{"name": f"Produto {i}"} for i in range(cards)]}) + "</script>"
+    return f"<html><head>{script}{ld}</head><body><header><ul>{noise}</ul></header><main>{body}</main><footer>{noise}</footer></body></html>"
+
+
+def extract(html: str, backend: str) -> int:
+    """What the collectors do with a page: parse, find cards, read a few fields."""
+    doc = parse_html(html, only=ONLY, backend=backend)
+    fields = 0
+    for card in doc.select(AMAZON_CARD) or doc.select(ML_CARDS[0]) or doc.select(ML_CARDS[1]):
+        title = card.first("h2.s-line-clamp-2", "a.poly-component__title", ".ui-search-item__title", "h2")
+        price = card.first("span.a-price-whole", ".andes-money-amount__fraction")
+        link = card.first("a.a-link-normal", "a.poly-component__title", "a[href]")
+        fields += bool(title and title.text()) + bool(price and price.text()) + bool(link and link.get("href"))
+    return fields + len(doc.json_ld())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends")
+    parser.add_argument("--fixtures", type=Path, help="Directory of saved .html pages")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.fixtures:
+        pages = [p.read_text(encoding="utf-8", errors="replace") for p in sorted(args.fixtures.glob("*.html"))]
+        origin = str(args.fixtures)
+    else:
+        pages, origin = cached_pages(CACHE_DIR), f"HTTP cache ({CACHE_DIR})"
+    if not pages:
+        pages, origin = [synthetic_page("amazon"), synthetic_page("ml")], "synthetic Amazon/ML pages"
+    size = sum(len(p) for p in pages) / 1024
+    print(f"📄 {len(pages)} page(s) from {origin}, {size:.0f} KiB total\n")
+
+    timings: Dict[str, float] = {}
+    results = {}
+    for backend in reversed(BACKENDS):  # html.parser first: the baseline
+        runs = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            results[backend] = [extract(page, backend) for page in pages]
+            runs.append(time.perf_counter() - t0)
+        timings[backend] = statistics.median(runs)
+
+    baseline = timings["html.parser"]
+    for backend, seconds in timings.items():
+        same = "" if results[backend] == results["html.parser"] else "  ⚠️ different extraction"
+        print(f"  {backend:<12} {seconds * 1000 / len(pages):8.1f} ms/page  {baseline / seconds:5.1f}x{same}")
+
+
+if __name__ == "__main__":
+    main()
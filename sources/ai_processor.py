@@ -1,19 +1,23 @@
 """AI-powered Market Signal Analyst using OpenAI REST API."""
 from __future__ import annotations
 
+import argparse
 import json
 import os
 import sys
-from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict, Any
-
-import requests
+from typing import Any, Callable, Dict, Iterator, List
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 from env_loader import load_env
-from database import save_cluster, init_db
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from src.utils.jsonl import read_records, write_snapshot
+from src.utils.llm_client import ChatClient
+from src.services.llm_clustering import incremental_clusters, stream_clusters
+from src.services.preclustering import bucket_signals, offline_clusters
+from src.database import get_latest_clusters, init_db, save_cluster, update_cluster
+from src.utils.raw_manifest import get_manifest
 
 # Load environment variables
 load_env()
@@ -24,12 +28,11 @@ DATA_DIR = Path(__file__).resolve().parents[1] / "data" / "raw"
 def load_latest_signals() -> List[Dict[str, Any]]:
     """Carregar os sinais de intenção mais recentes (Marketplace Intent Signals)."""
     # Prioriza os sinais de intenção direta (intent_signals-*.json)
-    signal_files = sorted(DATA_DIR.glob("intent_signals-*.json"), reverse=True)
+    signal_file = get_manifest(DATA_DIR).latest("intent_signals")
     
-    if signal_files:
-        print(f"[info] 📡 Carregando sinais de intenção de: {signal_files[0].name}")
-        with signal_files[0].open("r", encoding="utf-8") as f:
-            return json.load(f)
+    if signal_file:
+        print(f"[info] 📡 Carregando sinais de intenção de: {signal_file.name}")
+        return read_records(signal_file)
             
     print("[error] ⛔ CRITICAL: Nenhum arquivo de Marketplace Intent Signals encontrado!")
     print("        Execute 'python sources/intent_signals.py' primeiro.")
@@ -50,57 +53,54 @@ def load_context_signals() -> str:
     return ""
 
 
-def call_openai_api(prompt: str, api_key: str) -> str | None:
-    """Chamar OpenAI API (gpt-4o-mini) para análise de mercado."""
-    url = "https://api.openai.com/v1/chat/completions"
-    
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
-    }
-    
-    payload = {
-        "model": "gpt-4o-mini",
-        "messages": [
-            {
-                "role": "system",
-                "content": (
-                    "You are a Senior Market Signal Analyst. "
-                    "You analyze raw marketplace data to detect REAL BUYING INTENT. "
-                    "You DO NOT guess. You DO NOT invent products. "
-                    "You return 'NO ACTIONABLE SIGNAL DETECTED' if the data is weak."
-                )
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        "temperature": 0.3, # Lower temperature for analytical precision
-        "max_tokens": 2500
-    }
-    
+def _messages(prompt: str) -> List[Dict[str, str]]:
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are a Senior Market Signal Analyst. "
+                "You analyze raw marketplace data to detect REAL BUYING INTENT. "
+                "You DO NOT guess. You DO NOT invent products. "
+                "You return 'NO ACTIONABLE SIGNAL DETECTED' if the data is weak."
+            )
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+
+
+def stream_openai_clusters(prompt: str, api_key: str) -> Iterator[Dict[str, Any]]:
+    """Chamar OpenAI API (gpt-4o-mini) em streaming: cada cluster sai assim que o objeto
+    JSON fecha. Se a resposta for cortada, os clusters já completos são mantidos."""
+    client = ChatClient(api_key)
+    received = 0
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=90)
-        response.raise_for_status()
-        
-        data = response.json()
-        content = data["choices"][0]["message"]["content"]
-        return content.strip()
-        
+        # Lower temperature for analytical precision
+        for cluster in stream_clusters(client, _messages(prompt), temperature=0.3, max_tokens=2500):
+            received += 1
+            yield cluster
     except Exception as e:
-        print(f"[error] Erro ao chamar OpenAI: {e}")
-        return None
+        print(f"[error] Erro ao chamar OpenAI (após {received} cluster(s)): {e}")
+    if client.cache:
+        print(f"[info] 💾 {client.cache.summary()}")
 
 
-def analyze_market_signals(signals: List[Dict[str, Any]], context: str, max_clusters: int = 20) -> List[Dict]:
+def analyze_market_signals(signals: List[Dict[str, Any]], context: str, max_clusters: int = 20,
+                           on_cluster: Callable[[Dict], None] = None) -> List[Dict]:
     """
     USAR IA PARA CONSTRUIR CLUSTERS DE INTENÇÃO DE COMPRA.
+    ``on_cluster`` recebe cada cluster assim que ele chega (antes do fim da resposta).
     """
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
-        print("[warn] ⚠️  OPENAI_API_KEY não configurada. Impossível analisar sinais.")
-        return []
+        print("[warn] ⚠️  OPENAI_API_KEY não configurada. Usando só a pré-clusterização local (sem IA).")
+        clusters = offline_clusters(bucket_signals(s.get("term", "") for s in signals), max_clusters=max_clusters)
+        if on_cluster:
+            for cluster in clusters:
+                on_cluster(cluster)
+        return clusters
     
     # Preparar resumo dos sinais
     # Agrupar por fonte para dar contexto à IA
@@ -113,10 +113,10 @@ def analyze_market_signals(signals: List[Dict[str, Any]], context: str, max_clus
     
     signal_summary = ""
     for src, terms in by_source.items():
-        # Amostra de até 50 termos por fonte para não estourar contexto
-        # unique terms only
-        unique = list(set(terms))[:50]
-        signal_summary += f"\nSOURCE [{src.upper()}]:\n" + ", ".join(unique) + "\n"
+        # Um representante por grupo de termos parecidos (pré-clusterização local),
+        # maiores grupos primeiro; até 50 por fonte para não estourar contexto
+        representatives = [b.representative for b in bucket_signals(terms)][:50]
+        signal_summary += f"\nSOURCE [{src.upper()}]:\n" + ", ".join(representatives) + "\n"
 
     prompt = f"""
 ACT AS: Senior Market Signal Analyst.
@@ -148,7 +148,7 @@ Return a JSON Array of objects. Each object MUST strictly follow this schema:
     "price_range_brl": {{"min": 50.0, "max": 200.0}},
     "negative_keywords": ["case", "capa", "usado", "pilha"],
     "why_trending": "Specific reason based on signals (e.g., 'High volume of 'dor pulso' queries combined with 'mouse vertical' autocomplete')",
-    "source_signals_used": ["autocomplete", "internal_trends"],
+    "source_signals_used": ["mouse vertical", "mouse ergonomico dor pulso"],
     "competition_level": "Low/Medium/High",
     "risk_factors": "e.g., 'Niche too small', 'Seasonality', 'Big brand dominance'",
     "confidence_score": 85
@@ -158,7 +158,8 @@ Return a JSON Array of objects. Each object MUST strictly follow this schema:
 CRITICAL:
 1. **price_range_brl**: Estimate a reasonable price range in BRL (Brazilian Reais) for the MAIN product. This helps filtering out accessories.
 2. **negative_keywords**: List 3-5 keywords that often appear in search results but are NOT the product (e.g. for a phone, exclude 'capa', 'película', 'cabo').
-3. If the signals are too weak, generic, or conflicting to form a solid hypothesis, return EXACTLY:
+3. **source_signals_used**: Copy the exact RAW SIGNALS (search terms) that support the cluster. NOT source names.
+4. If the signals are too weak, generic, or conflicting to form a solid hypothesis, return EXACTLY:
 []
 (Empty JSON Array)
 
@@ -167,28 +168,57 @@ DO NOT RETURN MARKDOWN. RETURN ONLY THE JSON.
 
     print("[info] 🧠 Analisando sinais de mercado com IA (Market Signal Analyst)...")
     
-    content = call_openai_api(prompt, api_key)
-    
-    if not content:
-        return []
-        
-    if "NO ACTIONABLE SIGNAL DETECTED" in content:
-        print("[info] IA: Nenhum sinal acionável detectado.")
+    clusters = []
+    # Consome o stream até o fim (mesmo após max_clusters) para a resposta entrar no cache
+    for cluster in stream_openai_clusters(prompt, api_key):
+        if len(clusters) >= max_clusters:
+            continue
+        clusters.append(cluster)
+        if on_cluster:
+            on_cluster(cluster)
+
+    if not clusters:
+        print("[info] IA: Nenhum sinal acionável detectado (ou resposta inválida).")
         return []
 
-    # Limpar markdown se houver
-    content = content.replace("```json", "").replace("```", "").strip()
-    
+    print(f"[success] ✅ {len(clusters)} Clusters de Intenção Identificados.")
+    return clusters
+
+
+def analyze_incrementally(signals: List[Dict[str, Any]], context: str) -> tuple:
+    """Só os termos que nenhum cluster salvo cobre vão para a IA; o resto é atribuído
+    localmente e os clusters novos parecidos com os existentes são fundidos neles.
+    Retorna (clusters desta execução, clusters novos a inserir)."""
+    terms = [s.get("term") for s in signals if s.get("term")]
+
+    def cluster_novel(novel: List[str]) -> List[Dict]:
+        wanted = set(novel)
+        return analyze_market_signals([s for s in signals if s.get("term") in wanted], context)
+
+    # Clusters salvos por versões antigas do prompt têm nomes de fontes ("autocomplete",
+    # "internal_trends") em source_signals_used: só nome e produtos contam como termos
+    clusters, updated, created = incremental_clusters(terms, get_latest_clusters(), cluster_novel,
+                                                      index_fields=("cluster_name", "validated_products"))
+    for cluster in updated:
+        update_cluster(cluster["db_id"], cluster)
+    return clusters, created
+
+
+def save_cluster_safely(cluster: Dict) -> None:
+    """Persistir um cluster (Phase 1: Persistence) sem derrubar a análise em caso de erro."""
     try:
-        clusters = json.loads(content)
-        print(f"[success] ✅ {len(clusters)} Clusters de Intenção Identificados.")
-        return clusters[:max_clusters]
-    except json.JSONDecodeError:
-        print(f"[error] Falha ao decodificar JSON da IA. Resposta bruta: {content[:100]}...")
-        return []
+        # Helper: Add ID to cluster object for immediate use if needed (e.g. by ranker if we passed memory objects)
+        cluster["db_id"] = save_cluster(cluster)
+    except Exception as e:
+        print(f"[warn] Failed to save cluster '{cluster.get('cluster_name')}': {e}")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Keyword Intelligence Agent (IA)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Enviar à IA apenas sinais novos e fundir com os clusters existentes")
+    args = parser.parse_args()
+
     print("🤖 Keyword Intelligence Agent - Initializing...\n")
     
     # 1. Carregar Sinais (Marketplace Intent Signals ONLY)
@@ -201,40 +231,26 @@ def main():
     if context:
         print(f"[info] Contexto carregado: {len(context.split(','))} tópicos de news.")
 
-    # 3. Analisar com IA
-    clusters = analyze_market_signals(signals, context)
-    
-    if not clusters:
-        print("⚠️  Nenhum cluster identificado. Tente: 1) Mais seeds na coleta 2) Aguardar acumulação de dados.")
-        return
-        
-    # 4. Salvar Resultados (Clusters)
-    timestamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
-    output_path = DATA_DIR / f"intent_clusters-{timestamp}.json"
-    latest_path = DATA_DIR / "intent_clusters_latest.json"
-    
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(clusters, f, ensure_ascii=False, indent=2)
-        
-    # 4b. Salvar no Banco de Dados (Phase 1: Persistence)
+    # 3. Analisar com IA; no modo completo cada cluster é salvo assim que chega do stream
     try:
         init_db() # Ensure tables exist
-        print(f"[info] 💾 Saving {len(clusters)} clusters into SQLite database...")
-        for cluster in clusters:
-            try:
-                cid = save_cluster(cluster)
-                # Helper: Add ID to cluster object for immediate use if needed (e.g. by ranker if we passed memory objects)
-                cluster["db_id"] = cid
-            except Exception as e:
-                print(f"[warn] Failed to save cluster '{cluster.get('cluster_name')}': {e}")
-                
     except Exception as e:
         print(f"[error] Database error: {e}")
+
+    if args.incremental:
+        clusters, new_clusters = analyze_incrementally(signals, context)
+        print(f"[info] 💾 Saving {len(new_clusters)} clusters into SQLite database...")
+        for cluster in new_clusters:
+            save_cluster_safely(cluster)
+    else:
+        clusters = analyze_market_signals(signals, context, on_cluster=save_cluster_safely)
+    
+    if not clusters:
+        print("⚠️  Nenhum cluster identificado. Tente: 1) Mais seeds na coleta 2) Aguardar acumulação de dados.")
+        return
         
-    # Salvar 'latest' apenas se tiver sucesso
-    if clusters:
-        with latest_path.open("w", encoding="utf-8") as f:
-            json.dump(clusters, f, ensure_ascii=False, indent=2)
+    # 4. Salvar Resultados (Clusters) uma vez; intent_clusters-latest.jsonl aponta para o arquivo
+    output_path = write_snapshot("intent_clusters", clusters, raw_dir=DATA_DIR)
         
     print(f"\n✅ Clusters salvos em: {output_path}")
     print("📋 Amostra de Oportunidades Identificadas:")
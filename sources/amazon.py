@@ -2,19 +2,23 @@
 from __future__ import annotations
 
 import argparse
-import json
 import re
 import time
-from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict
 import urllib.parse
+import sys
 
 import requests
-from bs4 import BeautifulSoup
 
 from keyword_utils import load_keywords
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from src.utils.http_cache import cached_get
+from src.utils.html_parser import parse_html
+from src.utils.jsonl import write_records, write_snapshot
+from src.utils.product_record import ProductRecord
+
 DATA_DIR = Path(__file__).resolve().parents[1] / "data" / "raw"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -32,6 +36,9 @@ HEADERS = {
     "Sec-Fetch-Site": "none",
 }
 
+# Container de cada resultado da busca
+RESULT_CARD = 'div[data-component-type="s-search-result"]'
+
 
 def get_keywords(max_keywords: int) -> List[Dict]:
     """Carregar keywords priorizando tendências Mercado Livre."""
@@ -46,7 +53,7 @@ def get_keywords(max_keywords: int) -> List[Dict]:
     return keywords[:max_keywords]
 
 
-def scrape_amazon(keyword_obj: Dict, limit: int = 10) -> List[Dict[str, Any]]:
+def scrape_amazon(keyword_obj: Dict, limit: int = 10) -> List[ProductRecord]:
     """Fazer scraping da Amazon BR com filtragem."""
     keyword = keyword_obj.get("term", "")
     min_price = keyword_obj.get("price_min", 0)
@@ -57,17 +64,17 @@ def scrape_amazon(keyword_obj: Dict, limit: int = 10) -> List[Dict[str, Any]]:
     url = f"https://www.amazon.com.br/s?k={encoded_keyword}&s=relevanceblender"
     
     try:
-        session = requests.Session()
-        resp = session.get(url, headers=HEADERS, timeout=15)
+        resp = cached_get(requests, url, "amazon", headers=HEADERS, timeout=15)
         
         if resp.status_code != 200:
             print(f"[warn] Amazon status {resp.status_code} para '{keyword}'")
             return []
         
-        soup = BeautifulSoup(resp.text, 'html.parser')
+        # Só os cards de resultado são montados (parse parcial)
+        soup = parse_html(resp.text, only=[RESULT_CARD])
         
         # Buscar produtos
-        items = soup.find_all('div', {'data-component-type': 's-search-result'})
+        items = soup.select(RESULT_CARD)
         
         results = []
         
@@ -81,17 +88,15 @@ def scrape_amazon(keyword_obj: Dict, limit: int = 10) -> List[Dict[str, Any]]:
                 
             try:
                 # Título
-                title_elem = item.find('h2', class_='s-line-clamp-2')
-                if not title_elem:
-                    title_elem = item.find('span', class_='a-text-normal')
+                title_elem = item.first('h2.s-line-clamp-2', 'span.a-text-normal')
                 
-                title = title_elem.get_text(strip=True) if title_elem else "Sem título"
+                title = title_elem.text() if title_elem else "Sem título"
                 
                 # Preço
                 price = 0
-                price_whole = item.find('span', class_='a-price-whole')
+                price_whole = item.select_one('span.a-price-whole')
                 if price_whole:
-                    price_text = price_whole.get_text(strip=True).replace('.', '').replace(',', '.')
+                    price_text = price_whole.text().replace('.', '').replace(',', '.')
                     try:
                         price = float(price_text)
                     except:
@@ -113,20 +118,20 @@ def scrape_amazon(keyword_obj: Dict, limit: int = 10) -> List[Dict[str, Any]]:
                          continue
 
                 # Link
-                link_elem = item.find('a', class_='a-link-normal')
+                link_elem = item.select_one('a.a-link-normal')
                 link = ""
-                if link_elem and 'href' in link_elem.attrs:
-                    link = "https://www.amazon.com.br" + link_elem['href']
+                if link_elem and link_elem.get('href') is not None:
+                    link = "https://www.amazon.com.br" + link_elem.get('href')
                 
                 # Thumbnail
-                img_elem = item.find('img', class_='s-image')
+                img_elem = item.select_one('img.s-image')
                 thumbnail = img_elem.get('src', '') if img_elem else ""
                 
                 # Rating
                 rating = 0
-                rating_elem = item.find('span', class_='a-icon-alt')
+                rating_elem = item.select_one('span.a-icon-alt')
                 if rating_elem:
-                    rating_text = rating_elem.get_text(strip=True)
+                    rating_text = rating_elem.text()
                     match = re.search(r'([\d,]+)', rating_text)
                     if match:
                         try:
@@ -135,19 +140,18 @@ def scrape_amazon(keyword_obj: Dict, limit: int = 10) -> List[Dict[str, Any]]:
                             rating = 0
                 
                 # Prime
-                is_prime = bool(item.find('i', class_='a-icon-prime'))
+                is_prime = item.select_one('i.a-icon-prime') is not None
                 
-                results.append({
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "source": "amazon_br_scraping",
-                    "search_keyword": keyword,
-                    "title": title,
-                    "price": price,
-                    "permalink": link,
-                    "thumbnail": thumbnail,
-                    "rating": rating,
-                    "is_prime": is_prime,
-                })
+                results.append(ProductRecord(
+                    source="amazon_br_scraping",
+                    search_keyword=keyword,
+                    title=title,
+                    price=price,
+                    permalink=link,
+                    thumbnail=thumbnail,
+                    rating=rating,
+                    is_prime=is_prime,
+                ))
                 
             except Exception as e:
                 continue
@@ -159,7 +163,7 @@ def scrape_amazon(keyword_obj: Dict, limit: int = 10) -> List[Dict[str, Any]]:
         return []
 
 
-def fetch_products(max_keywords: int = 15, products_per_keyword: int = 10) -> List[Dict[str, Any]]:
+def fetch_products(max_keywords: int = 15, products_per_keyword: int = 10) -> List[ProductRecord]:
     """Buscar produtos da Amazon."""
     print(f"[info] 🛒 Buscando produtos na Amazon BR (web scraping)...\n")
     
@@ -192,12 +196,11 @@ def fetch_products(max_keywords: int = 15, products_per_keyword: int = 10) -> Li
     return all_products
 
 
-def save_payload(payload: List[Dict[str, Any]], output: Path | None = None) -> Path:
+def save_payload(payload: List[ProductRecord], output: Path | None = None) -> Path:
     """Salvar dados em JSON."""
     if output is None:
-        output = DATA_DIR / f"amazon-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
-    with output.open("w", encoding="utf-8") as fp:
-        json.dump(payload, fp, ensure_ascii=False, indent=2)
+        return write_snapshot("amazon", payload, raw_dir=DATA_DIR)
+    write_records(output, payload)
     return output
 
 
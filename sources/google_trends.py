@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import argparse
 import json
+import sys
 import time
 from datetime import datetime, timezone
 from pathlib import Path
@@ -11,6 +12,9 @@ import xml.etree.ElementTree as ET
 
 import requests
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from src.utils.http_cache import cached_get
+
 DATA_DIR = Path(__file__).resolve().parents[1] / "data" / "raw"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -25,7 +29,7 @@ def fetch_trending(limit: int = 20) -> List[Dict[str, Any]]:
     
     try:
         print(f"[info] Buscando notícias do Google News RSS...")
-        resp = requests.get(FEED_URL, headers=HEADERS, timeout=20)
+        resp = cached_get(requests, FEED_URL, "google_news", headers=HEADERS, timeout=20)
         resp.raise_for_status()
         
         root = ET.fromstring(resp.text)
@@ -7,11 +7,10 @@ Aggregates keywords ONLY from:
 4) Recent Reviews Analysis (Problem Identification)
 """
 import argparse
-import json
+import threading
 import time
 import re
-import requests
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Set, Any
@@ -21,6 +20,12 @@ import random
 import sys
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 from keyword_utils import save_keywords
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from src.utils.embedded_json import embedded_titles
+from src.utils.http_cache import cached_get
+from src.utils.http_client import HostRateLimiter, build_session
+from src.utils.html_parser import parse_html
+from src.utils.jsonl import write_snapshot
 
 DATA_DIR = Path(__file__).resolve().parents[1] / "data" / "raw"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -42,48 +47,94 @@ INTENT_SEEDS = [
     "ferramentas", "moda", "bebe", "esporte", "pet", "acessorios"
 ]
 
+# Autocomplete fan-out: workers share one keep-alive session; the limiter paces each host
+DEFAULT_CONCURRENCY = 8
+DEFAULT_REQUESTS_PER_SECOND = 5.0
+
+# Seed expansion ("fone" -> "fone a", "fone b", ...) for the long tail
+ALPHABET = "abcdefghijklmnopqrstuvwxyz"
+EXPANSIONS = {
+    "none": [],
+    "sampled": list(ALPHABET[::4]),  # a, e, i, m, q, u, y
+    "alphabet": list(ALPHABET),
+    "pairs": [a + b for a in ALPHABET for b in ALPHABET],  # 676 per seed
+}
+DEFAULT_EXPANSION = "sampled"
+DEFAULT_EXPANDED_SEEDS = 3
+
+
+def autocomplete_queries(seeds: List[str], expansion: str = DEFAULT_EXPANSION,
+                         expanded_seeds: int = DEFAULT_EXPANDED_SEEDS) -> List[str]:
+    """Every seed, followed by its expansions for the first ``expanded_seeds`` seeds."""
+    suffixes = EXPANSIONS[expansion]
+    queries = []
+    for i, seed in enumerate(seeds):
+        queries.append(seed)
+        if i < expanded_seeds:
+            queries.extend(f"{seed} {suffix}" for suffix in suffixes)
+    return queries
+
 class MarketplaceSignals:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update(HEADERS)
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY,
+                 requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                 expansion: str = DEFAULT_EXPANSION, expanded_seeds: int = DEFAULT_EXPANDED_SEEDS):
+        self.concurrency = max(1, concurrency)
+        self.session = build_session(pool_size=self.concurrency, headers=HEADERS)
+        self.limiter = HostRateLimiter(default_rate=requests_per_second)
+        self.expansion = expansion
+        self.expanded_seeds = expanded_seeds
         self.signals = []
         self.seen_terms = set()
+        self._lock = threading.Lock()
 
     def add_signal(self, term: str, source: str, meta: Dict[str, Any] = None):
-        """Add a unique validated signal."""
+        """Add a unique validated signal (safe to call from worker threads)."""
         clean_term = term.strip().lower()
         if not clean_term or len(clean_term) < 3:
             return
         
         # Deduplication strategy
-        if clean_term in self.seen_terms:
-            return
-        
-        self.seen_terms.add(clean_term)
-        self.signals.append({
-            "term": term.strip(), # Keep original case for display
-            "source": source,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "meta": meta or {}
-        })
+        with self._lock:
+            if clean_term in self.seen_terms:
+                return
+
+            self.seen_terms.add(clean_term)
+            self.signals.append({
+                "term": term.strip(), # Keep original case for display
+                "source": source,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "meta": meta or {}
+            })
 
     # --- SOURCE 1: Autocomplete (Direct Intent) ---
-    def fetch_autocomplete(self, seed: str):
-        """Fetch real-time autocomplete suggestions."""
+    def autocomplete(self, seed: str) -> List[str]:
+        """Real-time autocomplete suggestions for ``seed`` ([] on failure)."""
         url = "https://http2.mlstatic.com/resources/sites/MLB/autosuggest"
         params = {"show_category": "true", "q": seed, "limit": 10}
         
         try:
-            resp = self.session.get(url, params=params, timeout=5)
+            resp = cached_get(self.session, url, "ml_autosuggest", params=params, limiter=self.limiter, timeout=5)
             if resp.status_code == 200:
-                data = resp.json()
-                items = data.get("suggested_queries", [])
-                for item in items:
-                    q = item.get("q")
-                    if q:
-                        self.add_signal(q, "autocomplete", {"seed": seed})
+                items = resp.json().get("suggested_queries", [])
+                return [item["q"] for item in items if item.get("q")]
         except Exception as e:
             print(f"[warn] Autocomplete failed for '{seed}': {e}")
+        return []
+
+    def fetch_autocomplete(self, seed: str):
+        """Fetch real-time autocomplete suggestions."""
+        for q in self.autocomplete(seed):
+            self.add_signal(q, "autocomplete", {"seed": seed})
+
+    def fetch_autocomplete_many(self, seeds: List[str]):
+        """``fetch_autocomplete`` for every seed on a bounded thread pool. Signals are
+        added in seed order, so the output does not depend on response timing."""
+        if not seeds:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(seeds))) as pool:
+            for seed, suggestions in zip(seeds, pool.map(self.autocomplete, seeds)):
+                for q in suggestions:
+                    self.add_signal(q, "autocomplete", {"seed": seed})
 
     # --- SOURCE 2: Internal Trends (Confirmed Demand) ---
     def fetch_internal_trends(self):
@@ -100,16 +151,18 @@ class MarketplaceSignals:
         
         for url in urls:
             try:
-                resp = self.session.get(url, timeout=10)
+                resp = cached_get(self.session, url, "ml_pages", timeout=10)
                 if resp.status_code == 200:
-                    soup = BeautifulSoup(resp.text, 'html.parser')
-                    # Updated selectors for new ML layout
-                    items = soup.select('a.ui-recommendations-card__link') or \
-                            soup.select('p.ui-recommendations-card__title')
+                    # Embedded JSON first; the DOM is only built when the page has none
+                    texts = embedded_titles(resp.content)
+                    if not texts:
+                        # Updated selectors for new ML layout
+                        cards = ['a.ui-recommendations-card__link', 'p.ui-recommendations-card__title']
+                        soup = parse_html(resp.text, only=cards)
+                        texts = [item.text() for item in soup.select(cards[0]) or soup.select(cards[1])]
                     
                     count = 0
-                    for item in items[:15]:
-                        text = item.get_text(strip=True)
+                    for text in texts[:15]:
                         if text:
                             self.add_signal(text, "internal_trends", {"url": url})
                             count += 1
@@ -129,8 +182,8 @@ class MarketplaceSignals:
         url = f"https://lista.mercadolivre.com.br/{query}_NoIndex_True" 
         
         try:
-            resp = self.session.get(url, timeout=10)
-            soup = BeautifulSoup(resp.text, 'html.parser')
+            resp = cached_get(self.session, url, "ml_pages", timeout=10)
+            soup = parse_html(resp.text, only=['.ui-search-layout__item'])
             
             # Look for items with "Novo" status logic if possible (usually hidden in ML now)
             # Instead, we look for items that are distinct in specific niches
@@ -140,17 +193,17 @@ class MarketplaceSignals:
             for item in items[:15]:
                 title_el = item.select_one('.ui-search-item__title')
                 if not title_el: continue
-                title = title_el.get_text(strip=True)
+                title = title_el.text()
                 
                 # Check for "Novo" condition if visible
                 condition = item.select_one('.ui-search-item__group__element--condition')
-                is_new = condition and "novo" in condition.get_text().lower()
+                is_new = condition and "novo" in condition.text(strip=False).lower()
                 
                 # We interpret "New Listing" signals as items that appear in "lancamento" searches
                 # and explicitly look "New" (no reviews/sold count low but nice presentation).
                 
                 sold_el = item.select_one('.ui-search-item__group__element--quantity')
-                sold_text = sold_el.get_text() if sold_el else ""
+                sold_text = sold_el.text(strip=False) if sold_el else ""
                 
                 # Use simplified heuristic: Title + "Novo" is a signal of seller intent
                 self.add_signal(title, "new_listing", {"query": query, "is_new_condition": is_new})
@@ -175,22 +228,18 @@ class MarketplaceSignals:
         # Real review scraping is heavy (IP blocks). 
         # Strategy: Use autocomplete for negative intents.
         negative_seeds = ["reclame aqui", "defeito", "problema", "nao funciona", "ruim"]
-        for seed in negative_seeds:
-            self.fetch_autocomplete(seed)
+        self.fetch_autocomplete_many(negative_seeds)
             
     def run(self, seeds: List[str] = None):
         print("🚀 Starting Marketplace Intent Signal Layer...")
         
         # 1. Autocomplete (The broadest net)
         target_seeds = seeds or INTENT_SEEDS
-        print(f"   Step 1: Autocomplete ({len(target_seeds)} seeds)...")
-        for seed in target_seeds:
-            self.fetch_autocomplete(seed)
-            # Add a-z expansion for the first few seeds to get 'long tail'
-            if seed in target_seeds[:3]:
-                for char in "abcdefghijklmnopqrstuvwxyz"[::4]: # skip some for speed
-                    self.fetch_autocomplete(f"{seed} {char}")
-            time.sleep(0.2)
+        # Add a-z expansion for the first few seeds to get 'long tail'
+        queries = autocomplete_queries(target_seeds, self.expansion, self.expanded_seeds)
+        print(f"   Step 1: Autocomplete ({len(target_seeds)} seeds, {len(queries)} queries, "
+              f"{self.concurrency} workers)...")
+        self.fetch_autocomplete_many(queries)
             
         # 2. Internal Trends
         print(f"   Step 2: Internal Trends...")
@@ -210,20 +259,23 @@ class MarketplaceSignals:
 def main():
     parser = argparse.ArgumentParser(description="Collect Marketplace Intent Signals")
     parser.add_argument("--seeds", type=str, help="Comma-separated seed terms")
+    parser.add_argument("--expansion", choices=sorted(EXPANSIONS), default=DEFAULT_EXPANSION,
+                        help="Autocomplete expansion per seed: sampled letters, full a-z or two-letter pairs")
+    parser.add_argument("--expand-seeds", type=int, default=DEFAULT_EXPANDED_SEEDS,
+                        help="How many of the first seeds get expanded")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rps", type=float, default=DEFAULT_REQUESTS_PER_SECOND, help="Requests per second per host")
     args = parser.parse_args()
     
     seeds = [s.strip() for s in args.seeds.split(",") if s.strip()] if args.seeds else None
     
-    miner = MarketplaceSignals()
+    miner = MarketplaceSignals(concurrency=args.concurrency, requests_per_second=args.rps,
+                               expansion=args.expansion, expanded_seeds=args.expand_seeds)
     signals = miner.run(seeds)
     
     # Save Report
-    timestamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
-    output_path = DATA_DIR / f"intent_signals-{timestamp}.json"
-    
     try:
-        with output_path.open("w", encoding="utf-8") as f:
-            json.dump(signals, f, ensure_ascii=False, indent=2)
+        output_path = write_snapshot("intent_signals", signals, raw_dir=DATA_DIR)
         print(f"\n✅ Captured {len(signals)} VALIDATED Intent Signals.")
         print(f"📁 Saved to: {output_path}")
     except Exception as e:
@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 import argparse
-import json
+import sys
 import time
 import urllib.parse
 from datetime import datetime, timezone
@@ -10,7 +10,6 @@ from pathlib import Path
 from typing import Dict, List
 
 import requests
-from bs4 import BeautifulSoup
 
 from keyword_utils import load_keywords
 
@@ -18,6 +17,10 @@ from keyword_utils import load_keywords
 import database_patch
 import database
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from src.utils.html_parser import parse_html
+from src.utils.jsonl import write_records, write_snapshot
+
 DATA_DIR = Path(__file__).resolve().parents[1] / "data" / "raw"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -29,6 +32,9 @@ HEADERS = {
     "Cache-Control": "max-age=0",
 }
 
+# Result containers, newest layout first (only these subtrees are parsed)
+RESULT_CARDS = [".ui-search-result__wrapper", ".andes-card"]
+
 REQUEST_TIMEOUT = 15
 PAUSE_BETWEEN_KEYWORDS = 1.0
 
@@ -73,8 +79,8 @@ def scrape_keyword(keyword_obj: Dict, limit: int) -> List[Dict]:
                 print(f"[error] Request '{keyword}' failed after {max_retries} attempts: {exc}")
                 return []
 
-    soup = BeautifulSoup(resp.text, "html.parser")
-    items = soup.select(".ui-search-result__wrapper") or soup.select(".andes-card")
+    soup = parse_html(resp.text, only=RESULT_CARDS)
+    items = soup.select(RESULT_CARDS[0]) or soup.select(RESULT_CARDS[1])
 
     results: List[Dict] = []
     
@@ -87,29 +93,21 @@ def scrape_keyword(keyword_obj: Dict, limit: int) -> List[Dict]:
         if len(results) >= limit:
             break
             
-        title_elem = (
-            item.select_one(".ui-search-item__title")
-            or item.select_one("a.poly-component__title")
-            or item.find("h2")
-        )
-        link_elem = (
-            item.select_one("a.ui-search-link")
-            or item.select_one("a.poly-component__title")
-            or item.find("a", href=True)
-        )
-        price_elem = (
-            item.select_one(".andes-money-amount__fraction")
-            or item.select_one(".price-tag-fraction")
-            or item.select_one(".poly-price__current .andes-money-amount__fraction")
+        title_elem = item.first(".ui-search-item__title", "a.poly-component__title", "h2")
+        link_elem = item.first("a.ui-search-link", "a.poly-component__title", "a[href]")
+        price_elem = item.first(
+            ".andes-money-amount__fraction",
+            ".price-tag-fraction",
+            ".poly-price__current .andes-money-amount__fraction",
         )
         thumb_elem = item.select_one("img")
-        shipping_elem = item.find(string=lambda t: isinstance(t, str) and "frete" in t.lower())
+        shipping_elem = next((t for t in item.strings() if "frete" in t.lower()), None)
 
-        title = title_elem.get_text(strip=True) if title_elem else None
-        link = link_elem["href"] if link_elem and link_elem.has_attr("href") else None
+        title = title_elem.text() if title_elem else None
+        link = link_elem.get("href") if link_elem else None
         price = None
         if price_elem:
-            price_text = price_elem.get_text(strip=True).replace(".", "").replace(",", ".")
+            price_text = price_elem.text().replace(".", "").replace(",", ".")
             try:
                 price = float(price_text)
             except ValueError:
@@ -181,9 +179,8 @@ def fetch_products(max_keywords: int = 8, products_per_keyword: int = 6) -> List
 
 def save_payload(payload: List[Dict], output: Path | None = None) -> Path:
     if output is None:
-        output = DATA_DIR / f"mercado_livre-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
-    with output.open("w", encoding="utf-8") as fp:
-        json.dump(payload, fp, ensure_ascii=False, indent=2)
+        return write_snapshot("mercado_livre", payload, raw_dir=DATA_DIR)
+    write_records(output, payload)
     return output
 
 
@@ -4,14 +4,19 @@ from __future__ import annotations
 import argparse
 import json
 import re
+import sys
 from typing import Dict, List
 
 import requests
-from bs4 import BeautifulSoup
 
 from keyword_utils import save_keywords
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from src.utils.embedded_json import embedded_titles
+from src.utils.http_cache import cached_get
+from src.utils.html_parser import parse_html
+
 DATA_DIR = Path(__file__).resolve().parents[1] / "data" / "raw"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -25,7 +30,7 @@ DEFAULT_DEPARTMENT_COUNT = 6
 
 
 def fetch_departments() -> List[dict]:
-    resp = requests.get(MENU_ENDPOINT, headers=HEADERS, timeout=15)
+    resp = cached_get(requests, MENU_ENDPOINT, "ml_trends", headers=HEADERS, timeout=15)
     resp.raise_for_status()
     return resp.json().get("departments", [])
 
@@ -57,20 +62,19 @@ def clean_keyword(title: str) -> str:
 
 
 def scrape_listing(permalink: str, limit: int) -> List[str]:
-    resp = requests.get(permalink, headers=HEADERS, timeout=15)
+    resp = cached_get(requests, permalink, "ml_pages", headers=HEADERS, timeout=15)
     resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
+    titles = embedded_titles(resp.content)
+    if titles:
+        return [clean_keyword(title) for title in titles[:limit]]
+    soup = parse_html(resp.text, only=[".ui-search-result__wrapper"])
     items = soup.select(".ui-search-result__wrapper")
     keywords: List[str] = []
     for item in items[:limit]:
-        title_elem = (
-            item.select_one(".ui-search-item__title")
-            or item.select_one("a.poly-component__title")
-            or item.find("h2")
-        )
+        title_elem = item.first(".ui-search-item__title", "a.poly-component__title", "h2")
         if not title_elem:
             continue
-        title = title_elem.get_text(strip=True)
+        title = title_elem.text()
         if title:
             keywords.append(clean_keyword(title))
     return keywords
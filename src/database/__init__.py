@@ -1,10 +1,19 @@
 from .database import (
     init_db,
     get_connection,
+    connection,
+    transaction,
+    get_pool,
+    close_pool,
     upsert_product,
+    upsert_products_bulk,
     save_cluster,
     get_cluster_id_by_name,
+    get_cluster_ids_by_names,
+    get_latest_clusters,
+    update_cluster,
     save_opportunity,
+    save_opportunities_bulk,
     get_latest_ranking,
     get_db_stats,
     create_user,
@@ -17,7 +26,9 @@ from .database import (
     create_project,
     # V2
     add_term_history_snapshot,
+    add_term_history_snapshots,
     get_term_history,
+    get_term_histories,
     get_config,
     set_config
 )
@@ -1,8 +1,11 @@
+import os
 import sqlite3
 import json
+import atexit
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from werkzeug.security import generate_password_hash, check_password_hash
 
 # IMPORTANT: Auto-apply patches (Postgres for production)
@@ -11,21 +14,53 @@ try:
 except ImportError:
     pass
 
+from .pool import ConnectionPool
+
 # Path adjustment: src/database/database.py -> parents[2] is root
 DB_PATH = Path(__file__).resolve().parents[2] / "data" / "market_radar.db"
 
+# Pool sizing (override via env on constrained hosts, e.g. Supabase pooler limits)
+POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "5"))
+POOL_IDLE_TIMEOUT = float(os.environ.get("DB_POOL_IDLE_TIMEOUT", "300"))
+
 def get_connection():
-    """Get a connection to the SQLite database."""
+    """Open a new raw connection. Prefer ``connection()``/``transaction()`` (pooled)."""
     # Ensure directory exists
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+    # Pooled connections may be borrowed by different threads (one at a time)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row  # Access columns by name
     return conn
 
+_pool = ConnectionPool(get_connection, max_size=POOL_MAX_SIZE, idle_timeout=POOL_IDLE_TIMEOUT)
+atexit.register(_pool.close)
+
+def get_pool() -> ConnectionPool:
+    return _pool
+
+def close_pool():
+    """Close idle pooled connections (e.g. after changing DB_PATH in tests)."""
+    _pool.close()
+
+def connection():
+    """Borrow a pooled connection: ``with connection() as conn: ...``.
+    Uncommitted work is rolled back when the block exits."""
+    return _pool.connection()
+
+@contextmanager
+def transaction():
+    """Borrow a pooled connection and commit once the whole block succeeds."""
+    with _pool.connection() as conn:
+        yield conn
+        conn.commit()
+
 def init_db():
-    from datetime import timezone
     """Initialize the database schema."""
-    conn = get_connection()
+    with connection() as conn:
+        _create_schema(conn)
+    print(f"[database] ✅ Banco de dados inicializado em: {DB_PATH}")
+
+def _create_schema(conn):
     cursor = conn.cursor()
     
     # 1. Products Table
@@ -184,16 +219,7 @@ def init_db():
     """)
     
     # 8. Search Term History (V2)
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS search_term_history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        term TEXT NOT NULL,
-        source TEXT,
-        metric_value REAL,
-        metric_type TEXT DEFAULT 'occurrence_rank',
-        captured_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
+    _ensure_term_history(cursor)
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_term_time ON search_term_history(term, captured_at)")
     
     # 9. System Configs (For persistent tokens)
@@ -206,177 +232,372 @@ def init_db():
     """)
 
     conn.commit()
-    conn.close()
-    print(f"[database] ✅ Banco de dados inicializado em: {DB_PATH}")
 
 def upsert_product(product_data: Dict[str, Any], keyword: str = "") -> int:
-    conn = get_connection()
-    cursor = conn.cursor()
+    with connection() as conn:
+        cursor = conn.cursor()
     
-    marketplace = product_data.get("marketplace", "Unknown")
-    url = product_data.get("permalink") or product_data.get("url")
-    title = product_data.get("title")
-    price = product_data.get("price")
-    thumbnail = product_data.get("thumbnail")
+        marketplace = product_data.get("marketplace", "Unknown")
+        url = product_data.get("permalink") or product_data.get("url")
+        title = product_data.get("title")
+        price = product_data.get("price")
+        thumbnail = product_data.get("thumbnail")
     
-    if not url or not title:
-        conn.close()
-        return 0
+        if not url or not title:
+            return 0
         
-    try:
-        cursor.execute("""
-            INSERT INTO products (marketplace, title, url, thumbnail, current_price, last_updated)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ON CONFLICT(marketplace, url) DO UPDATE SET
-                current_price = excluded.current_price,
-                last_updated = excluded.last_updated,
-                thumbnail = excluded.thumbnail
-            RETURNING id
-        """, (marketplace, title, url, thumbnail, price, datetime.now()))
-        product_id = cursor.fetchone()[0]
+        try:
+            cursor.execute("""
+                INSERT INTO products (marketplace, title, url, thumbnail, current_price, last_updated)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(marketplace, url) DO UPDATE SET
+                    current_price = excluded.current_price,
+                    last_updated = excluded.last_updated,
+                    thumbnail = excluded.thumbnail
+                RETURNING id
+            """, (marketplace, title, url, thumbnail, price, datetime.now()))
+            product_id = cursor.fetchone()[0]
+        
+            if price is not None:
+                cursor.execute("""
+                    INSERT INTO price_history (product_id, price, search_keyword, recorded_at)
+                    VALUES (?, ?, ?, ?)
+                """, (product_id, price, keyword, datetime.now()))
         
-        if price is not None:
             cursor.execute("""
+                INSERT INTO scan_logs (product_id, search_keyword, scanned_at)
+                VALUES (?, ?, ?)
+            """, (product_id, keyword, datetime.now()))
+            conn.commit()
+            return product_id
+        except Exception as e:
+            print(f"[db_error] Upsert product failed: {e}")
+            return 0
+
+# Rows per multi-row statement (keeps Postgres statements / SQLite host params bounded)
+BULK_CHUNK_SIZE = 500
+# Host parameters per statement on SQLite builds older than 3.32
+SQLITE_MAX_VARIABLES = 999
+
+def _is_postgres(conn) -> bool:
+    return conn.__class__.__name__ == "PostgreSQLAdapter"
+
+def _chunks(rows: List, size: int = BULK_CHUNK_SIZE):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def _insert_many(conn, cursor, sql: str, rows: List[tuple]):
+    """INSERT many rows: executemany on SQLite, multi-row VALUES on Postgres.
+    ``sql`` must end with a single ``VALUES (?, ...)`` group."""
+    if not rows:
+        return
+    if not _is_postgres(conn):
+        cursor.executemany(sql, rows)
+        return
+    head, group = sql.rsplit("VALUES", 1)
+    group = group.strip()
+    for chunk in _chunks(rows):
+        params = [v for row in chunk for v in row]
+        cursor.execute(f"{head}VALUES {', '.join([group] * len(chunk))}", params)
+
+def _copy_rows(conn, cursor, table: str, columns: List[str], rows: List[tuple]):
+    """Bulk load plain rows: COPY on Postgres, executemany on SQLite."""
+    if _is_postgres(conn):
+        cursor.copy_rows(table, columns, rows)
+        return
+    marks = ", ".join(["?"] * len(columns))
+    _insert_many(conn, cursor, f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({marks})", rows)
+
+def _upsert_returning_ids(conn, cursor, upsert_sql: str, rows: List[tuple], table: str, key_columns: List[str]) -> Dict[tuple, int]:
+    """Run a bulk ``INSERT ... ON CONFLICT`` and map each conflict key to its row id.
+    ``rows`` must already be unique per key (Postgres rejects touching a row twice)."""
+    ids: Dict[tuple, int] = {}
+    cols = ", ".join(key_columns)
+    if _is_postgres(conn):
+        head, tail = upsert_sql.split("VALUES", 1)
+        group = tail[:tail.index(")") + 1].strip()
+        rest = tail[tail.index(")") + 1:]
+        for chunk in _chunks(rows):
+            cursor.execute(f"{head}VALUES {', '.join([group] * len(chunk))}{rest} RETURNING id, {cols}",
+                           [v for row in chunk for v in row])
+            for r in cursor.fetchall():
+                ids[tuple(r[c] for c in key_columns)] = r["id"]
+        return ids
+
+    # SQLite can't fetch RETURNING rows from executemany: resolve ids afterwards
+    cursor.executemany(upsert_sql, rows)
+    insert_cols = [c.strip() for c in upsert_sql[upsert_sql.index("(") + 1:upsert_sql.index(")")].split(",")]
+    key_idx = [insert_cols.index(c) for c in key_columns]
+    keys = list(dict.fromkeys(tuple(row[i] for i in key_idx) for row in rows))
+    marks = "(" + ", ".join(["?"] * len(key_columns)) + ")"
+    for chunk in _chunks(keys, min(BULK_CHUNK_SIZE, SQLITE_MAX_VARIABLES // len(key_columns))):
+        cursor.execute(f"SELECT id, {cols} FROM {table} WHERE ({cols}) IN (VALUES {', '.join([marks] * len(chunk))})",
+                       [v for key in chunk for v in key])
+        for r in cursor.fetchall():
+            ids[tuple(r[c] for c in key_columns)] = r["id"]
+    return ids
+
+def upsert_products_bulk(items: List[Dict[str, Any]], keyword: str = "") -> List[int]:
+    """Bulk version of ``upsert_product`` for a whole search page (one transaction).
+    Returns product ids aligned with ``items`` (0 for items without url/title)."""
+    now = datetime.now()
+
+    keyed = []  # (key, row) per valid item, None for skipped ones
+    for p in items:
+        url = p.get("permalink") or p.get("url")
+        title = p.get("title")
+        if not url or not title:
+            keyed.append(None)
+            continue
+        marketplace = p.get("marketplace", "Unknown")
+        keyed.append(((marketplace, url), (marketplace, title, url, p.get("thumbnail"), p.get("price"), now)))
+
+    # ON CONFLICT cannot touch the same row twice in one statement: last occurrence wins
+    unique = {k[0]: k[1] for k in keyed if k}
+    if not unique:
+        return [0] * len(items)
+
+    upsert_sql = """
+        INSERT INTO products (marketplace, title, url, thumbnail, current_price, last_updated)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(marketplace, url) DO UPDATE SET
+            current_price = excluded.current_price,
+            last_updated = excluded.last_updated,
+            thumbnail = excluded.thumbnail
+    """
+
+    try:
+        with transaction() as conn:
+            cursor = conn.cursor()
+            ids = _upsert_returning_ids(conn, cursor, upsert_sql, list(unique.values()), "products", ["marketplace", "url"])
+            product_ids = [ids.get(k[0], 0) if k else 0 for k in keyed]
+
+            history, scans = [], []
+            for p, pid in zip(items, product_ids):
+                if not pid:
+                    continue
+                if p.get("price") is not None:
+                    history.append((pid, p.get("price"), keyword, now))
+                scans.append((pid, keyword, now))
+
+            _insert_many(conn, cursor, """
                 INSERT INTO price_history (product_id, price, search_keyword, recorded_at)
-                VALUES (?, ?, ?, ?)
-            """, (product_id, price, keyword, datetime.now()))
-        
-        cursor.execute("""
-            INSERT INTO scan_logs (product_id, search_keyword, scanned_at)
-            VALUES (?, ?, ?)
-        """, (product_id, keyword, datetime.now()))
-        conn.commit()
-        return product_id
+                VALUES (?, ?, ?, ?)""", history)
+            _insert_many(conn, cursor, """
+                INSERT INTO scan_logs (product_id, search_keyword, scanned_at)
+                VALUES (?, ?, ?)""", scans)
+        return product_ids
     except Exception as e:
-        print(f"[db_error] Upsert product failed: {e}")
-        return 0
-    finally:
-        conn.close()
+        print(f"[db_error] Bulk upsert failed ({len(items)} items): {e}")
+        return [0] * len(items)
 
 def save_cluster(cluster_data: Dict[str, Any]) -> int:
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    validated = json.dumps(cluster_data.get("validated_products", []))
-    negatives = json.dumps(cluster_data.get("negative_keywords", []))
-    sources = json.dumps(cluster_data.get("source_signals_used", []))
-    price_range = cluster_data.get("price_range_brl", {})
-
-    try:
-        cursor.execute("""
-            INSERT INTO intent_clusters (
-                cluster_name, buying_intent, validated_products, 
-                price_range_min, price_range_max, negative_keywords,
-                why_trending, source_signals, competition_level,
-                risk_factors, confidence_score, created_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            RETURNING id
-        """, (
-            cluster_data.get("cluster_name"), cluster_data.get("buying_intent"), validated,
-            price_range.get("min", 0), price_range.get("max", 0), negatives,
-            cluster_data.get("why_trending"), sources, cluster_data.get("competition_level"),
-            cluster_data.get("risk_factors"), cluster_data.get("confidence_score"), datetime.now()
-        ))
-        cluster_id = cursor.fetchone()[0]
-        conn.commit()
-        return cluster_id
-    except Exception:
-        return 0 # Duplicate probably
-    finally:
-        conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
 
-def save_opportunity(opp_data: Dict[str, Any], cluster_id: Optional[int] = None) -> int:
-    conn = get_connection()
-    cursor = conn.cursor()
+        validated = json.dumps(cluster_data.get("validated_products", []))
+        negatives = json.dumps(cluster_data.get("negative_keywords", []))
+        sources = json.dumps(cluster_data.get("source_signals_used", []))
+        price_range = cluster_data.get("price_range_brl", {})
 
+        try:
+            cursor.execute("""
+                INSERT INTO intent_clusters (
+                    cluster_name, buying_intent, validated_products, 
+                    price_range_min, price_range_max, negative_keywords,
+                    why_trending, source_signals, competition_level,
+                    risk_factors, confidence_score, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                RETURNING id
+            """, (
+                cluster_data.get("cluster_name"), cluster_data.get("buying_intent"), validated,
+                price_range.get("min", 0), price_range.get("max", 0), negatives,
+                cluster_data.get("why_trending"), sources, cluster_data.get("competition_level"),
+                cluster_data.get("risk_factors"), cluster_data.get("confidence_score"), datetime.now()
+            ))
+            cluster_id = cursor.fetchone()[0]
+            conn.commit()
+            return cluster_id
+        except Exception:
+            return 0 # Duplicate probably
+
+_OPPORTUNITY_UPSERT_SQL = """
+    INSERT INTO opportunities (
+        keyword, cluster_id, score, 
+        intent_confidence, market_validation, signal_diversity, 
+        marketplace, url, thumbnail, price, analysis, scoring_breakdown,
+        created_at, last_updated
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(keyword) DO UPDATE SET
+        cluster_id=excluded.cluster_id,
+        score=excluded.score,
+        intent_confidence=excluded.intent_confidence,
+        marketplace=excluded.marketplace,
+        url=excluded.url,
+        thumbnail=excluded.thumbnail,
+        price=excluded.price,
+        scoring_breakdown=excluded.scoring_breakdown,
+        last_updated=excluded.last_updated
+"""
+
+def _opportunity_row(opp_data: Dict[str, Any], cluster_id: Optional[int], now: datetime) -> tuple:
     signals = opp_data.get("signals", {})
     meta = opp_data.get("meta", {})
     analysis = opp_data.get("analysis", {})
     scoring_breakdown = opp_data.get("scoring_breakdown", {})
-    
+
     # If signals is just metrics, use directly
     conf = signals.get("intent_confidence", signals.get("v2_score", 0))
 
+    return (
+        opp_data.get("keyword"),
+        cluster_id,
+        opp_data.get("score"),
+        conf,
+        signals.get("market_validation", 0),
+        signals.get("signal_diversity", 0),
+        meta.get("marketplace"),
+        meta.get("url"),
+        meta.get("thumbnail"),
+        meta.get("price"),
+        json.dumps(analysis),
+        json.dumps(scoring_breakdown),
+        now,
+        now
+    )
+
+def save_opportunity(opp_data: Dict[str, Any], cluster_id: Optional[int] = None) -> int:
+    with connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(_OPPORTUNITY_UPSERT_SQL + " RETURNING id", _opportunity_row(opp_data, cluster_id, datetime.now()))
+            row = cursor.fetchone()
+            if row:
+                opp_id = row[0] if isinstance(row, tuple) else row['id']
+            else:
+                # Fallback: INSERT failed to return, try SELECT
+                cursor.execute("SELECT id FROM opportunities WHERE keyword = ?", (opp_data.get("keyword"),))
+                select_row = cursor.fetchone()
+                if select_row:
+                     opp_id = select_row[0] if isinstance(select_row, tuple) else select_row['id']
+                else:
+                     # Should not happen after insert
+                     print(f"[db_error] Could not retrieve ID for {opp_data.get('keyword')}")
+                     return 0
+            conn.commit()
+            return opp_id
+        except Exception as e:
+            import traceback
+            print(f"[db_error] Save opportunity failed: {e}")
+            traceback.print_exc() # Uncomment for deep debug
+            return 0
+
+def get_cluster_id_by_name(cluster_name: str) -> Optional[int]:
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM intent_clusters WHERE cluster_name = ? ORDER BY created_at DESC LIMIT 1", (cluster_name,))
+        row = cursor.fetchone()
+        return row["id"] if row else None
+
+def get_cluster_ids_by_names(cluster_names: List[str]) -> Dict[str, int]:
+    """Resolve many cluster names in one ``IN (...)`` lookup (latest cluster per name)."""
+    names = list(dict.fromkeys(n for n in cluster_names if n))
+    result: Dict[str, int] = {}
+    if not names:
+        return result
+    with connection() as conn:
+        cursor = conn.cursor()
+        for chunk in _chunks(names):
+            marks = ", ".join(["?"] * len(chunk))
+            # Ascending order: the newest row per name overwrites older ones
+            cursor.execute(f"SELECT id, cluster_name FROM intent_clusters WHERE cluster_name IN ({marks}) ORDER BY created_at, id", chunk)
+            for r in cursor.fetchall():
+                result[r["cluster_name"]] = r["id"]
+    return result
+
+def _json_list(value) -> List[Any]:
     try:
+        parsed = json.loads(value) if value else []
+    except (TypeError, ValueError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+def get_latest_clusters() -> List[Dict[str, Any]]:
+    """Newest ``intent_clusters`` row per name, shaped like the AI output (plus ``db_id``)."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        # Ascending order: the newest row per name overwrites older ones
+        cursor.execute("SELECT * FROM intent_clusters ORDER BY created_at, id")
+        rows = cursor.fetchall()
+
+    latest: Dict[str, Dict[str, Any]] = {}
+    for r in rows:
+        d = dict(r)
+        latest[d["cluster_name"]] = {
+            "db_id": d["id"],
+            "cluster_name": d["cluster_name"],
+            "buying_intent": d["buying_intent"],
+            "validated_products": _json_list(d["validated_products"]),
+            # save_cluster stores a missing bound as 0
+            "price_range_brl": {"min": d["price_range_min"] or None, "max": d["price_range_max"] or None},
+            "negative_keywords": _json_list(d["negative_keywords"]),
+            "why_trending": d["why_trending"],
+            "source_signals_used": _json_list(d["source_signals"]),
+            "competition_level": d["competition_level"],
+            "risk_factors": d["risk_factors"],
+            "confidence_score": d["confidence_score"],
+        }
+    return list(latest.values())
+
+def update_cluster(cluster_id: int, cluster_data: Dict[str, Any]):
+    """Rewrite the term lists and price range of an existing cluster (incremental runs)."""
+    price_range = cluster_data.get("price_range_brl") or {}
+    with transaction() as conn:
+        cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO opportunities (
-                keyword, cluster_id, score, 
-                intent_confidence, market_validation, signal_diversity, 
-                marketplace, url, thumbnail, price, analysis, scoring_breakdown,
-                created_at, last_updated
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(keyword) DO UPDATE SET
-                cluster_id=excluded.cluster_id,
-                score=excluded.score,
-                intent_confidence=excluded.intent_confidence,
-                marketplace=excluded.marketplace,
-                url=excluded.url,
-                thumbnail=excluded.thumbnail,
-                price=excluded.price,
-                scoring_breakdown=excluded.scoring_breakdown,
-                last_updated=excluded.last_updated
-            RETURNING id
+            UPDATE intent_clusters
+            SET validated_products = ?, negative_keywords = ?, source_signals = ?,
+                price_range_min = ?, price_range_max = ?, confidence_score = ?
+            WHERE id = ?
         """, (
-            opp_data.get("keyword"),
-            cluster_id,
-            opp_data.get("score"),
-            conf,
-            signals.get("market_validation", 0),
-            signals.get("signal_diversity", 0),
-            meta.get("marketplace"),
-            meta.get("url"),
-            meta.get("thumbnail"),
-            meta.get("price"),
-            json.dumps(analysis),
-            json.dumps(scoring_breakdown),
-            datetime.now(),
-            datetime.now()
+            json.dumps(cluster_data.get("validated_products", [])),
+            json.dumps(cluster_data.get("negative_keywords", [])),
+            json.dumps(cluster_data.get("source_signals_used", [])),
+            price_range.get("min") or 0, price_range.get("max") or 0,
+            cluster_data.get("confidence_score"), cluster_id,
         ))
-        row = cursor.fetchone()
-        if row:
-            opp_id = row[0] if isinstance(row, tuple) else row['id']
-        else:
-            # Fallback: INSERT failed to return, try SELECT
-            cursor.execute("SELECT id FROM opportunities WHERE keyword = ?", (opp_data.get("keyword"),))
-            select_row = cursor.fetchone()
-            if select_row:
-                 opp_id = select_row[0] if isinstance(select_row, tuple) else select_row['id']
-            else:
-                 # Should not happen after insert
-                 print(f"[db_error] Could not retrieve ID for {opp_data.get('keyword')}")
-                 return 0
-        conn.commit()
-        return opp_id
-    except Exception as e:
-        import traceback
-        print(f"[db_error] Save opportunity failed: {e}")
-        traceback.print_exc() # Uncomment for deep debug
-        return 0
-    finally:
-        conn.close()
 
-def get_cluster_id_by_name(cluster_name: str) -> Optional[int]:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM intent_clusters WHERE cluster_name = ? ORDER BY created_at DESC LIMIT 1", (cluster_name,))
-    row = cursor.fetchone()
-    conn.close()
-    return row[0] if row else None
+def save_opportunities_bulk(entries: List[Tuple[Dict[str, Any], Optional[int]]]) -> Dict[str, int]:
+    """Bulk version of ``save_opportunity``: upsert ``(opp_data, cluster_id)`` pairs in
+    one transaction. Returns ``{keyword: opportunity_id}``."""
+    now = datetime.now()
+    # ON CONFLICT(keyword): last occurrence wins, like sequential save_opportunity calls
+    rows = {opp.get("keyword"): _opportunity_row(opp, cid, now) for opp, cid in entries if opp.get("keyword")}
+    if not rows:
+        return {}
+    try:
+        with transaction() as conn:
+            cursor = conn.cursor()
+            ids = _upsert_returning_ids(conn, cursor, _OPPORTUNITY_UPSERT_SQL, list(rows.values()), "opportunities", ["keyword"])
+        return {key[0]: opp_id for key, opp_id in ids.items()}
+    except Exception as e:
+        print(f"[db_error] Bulk save opportunities failed ({len(rows)} items): {e}")
+        return {}
 
 def get_latest_ranking(limit: int = 50) -> List[Dict]:
-    conn = get_connection()
-    cursor = conn.cursor()
-    # Find latest ranked items (by score desc)
-    cursor.execute("""
-        SELECT o.*, c.cluster_name
-        FROM opportunities o
-        LEFT JOIN intent_clusters c ON o.cluster_id = c.id
-        ORDER BY o.score DESC, o.last_updated DESC
-        LIMIT ?
-    """, (limit,))
+    with connection() as conn:
+        cursor = conn.cursor()
+        # Find latest ranked items (by score desc)
+        cursor.execute("""
+            SELECT o.*, c.cluster_name
+            FROM opportunities o
+            LEFT JOIN intent_clusters c ON o.cluster_id = c.id
+            ORDER BY o.score DESC, o.last_updated DESC
+            LIMIT ?
+        """, (limit,))
     
-    rows = cursor.fetchall()
-    conn.close()
+        rows = cursor.fetchall()
     
     results = []
     for r in rows:
@@ -385,7 +606,7 @@ def get_latest_ranking(limit: int = 50) -> List[Dict]:
         except: d["analysis"] = {}
         try: d["breakdown"] = json.loads(d["scoring_breakdown"]) if d.get("scoring_breakdown") else {}
         except: d["breakdown"] = {}
-        
+    
         d["meta"] = {
             "marketplace": d["marketplace"],
             "url": d["url"],
@@ -397,165 +618,208 @@ def get_latest_ranking(limit: int = 50) -> List[Dict]:
     return results
 
 def get_db_stats() -> Dict[str, Any]:
-    conn = get_connection()
-    cursor = conn.cursor()
-    stats = {}
-    try:
-        cursor.execute("SELECT COUNT(*) FROM opportunities")
-        stats["total_opportunities"] = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM products")
-        stats["total_products"] = cursor.fetchone()[0]
-        cursor.execute("SELECT AVG(score) FROM opportunities")
-        avg = cursor.fetchone()[0]
-        stats["avg_score"] = round(avg, 1) if avg else 0
-        cursor.execute("SELECT MAX(score) FROM opportunities")
-        top = cursor.fetchone()[0]
-        stats["top_score"] = round(top, 1) if top else 0
-    except: pass
-    conn.close()
-    return stats
+    with connection() as conn:
+        cursor = conn.cursor()
+        stats = {}
+        try:
+            cursor.execute("SELECT COUNT(*) FROM opportunities")
+            stats["total_opportunities"] = cursor.fetchone()[0]
+            cursor.execute("SELECT COUNT(*) FROM products")
+            stats["total_products"] = cursor.fetchone()[0]
+            cursor.execute("SELECT AVG(score) FROM opportunities")
+            avg = cursor.fetchone()[0]
+            stats["avg_score"] = round(avg, 1) if avg else 0
+            cursor.execute("SELECT MAX(score) FROM opportunities")
+            top = cursor.fetchone()[0]
+            stats["top_score"] = round(top, 1) if top else 0
+        except: pass
+        return stats
 
 
 # --- USER MANAGEMENT ---
 
 def create_user(email: str, password: str, name: str = "", role: str = "free") -> Optional[int]:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM users WHERE email = ?", (email,))
-    if cursor.fetchone():
-        conn.close()
-        return None
-    password_hash = generate_password_hash(password)
-    try:
-        cursor.execute("INSERT INTO users (email, password_hash, name, role, credits) VALUES (?, ?, ?, ?, ?) RETURNING id",
-                      (email, password_hash, name, role, 10))
-        user_id = cursor.fetchone()[0]
-        conn.commit()
-        return user_id
-    except: return None
-    finally: conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM users WHERE email = ?", (email,))
+        if cursor.fetchone():
+            return None
+        password_hash = generate_password_hash(password)
+        try:
+            cursor.execute("INSERT INTO users (email, password_hash, name, role, credits) VALUES (?, ?, ?, ?, ?) RETURNING id",
+                          (email, password_hash, name, role, 10))
+            user_id = cursor.fetchone()[0]
+            conn.commit()
+            return user_id
+        except: return None
 
 def get_user_by_email(email: str) -> Optional[Dict]:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
-    row = cursor.fetchone()
-    conn.close()
-    return dict(row) if row else None
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
 
 def get_user_by_id(user_id: int) -> Optional[Dict]:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-    row = cursor.fetchone()
-    conn.close()
-    return dict(row) if row else None
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
 
 def verify_password(user: Dict, password: str) -> bool:
     return check_password_hash(user["password_hash"], password)
 
 def save_opportunity_for_user(user_id: int, opportunity_id: int, project_id: Optional[int] = None, notes: str = "") -> int:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO saved_opportunities (user_id, opportunity_id, project_id, notes) VALUES (?, ?, ?, ?) RETURNING id",
-                  (user_id, opportunity_id, project_id, notes))
-    saved_id = cursor.fetchone()[0]
-    conn.commit()
-    conn.close()
-    return saved_id
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO saved_opportunities (user_id, opportunity_id, project_id, notes) VALUES (?, ?, ?, ?) RETURNING id",
+                      (user_id, opportunity_id, project_id, notes))
+        saved_id = cursor.fetchone()[0]
+        conn.commit()
+        return saved_id
 
 def get_user_saved_opportunities(user_id: int) -> List[Dict]:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT s.*, o.keyword, o.score, o.marketplace, o.url
-        FROM saved_opportunities s JOIN opportunities o ON s.opportunity_id = o.id
-        WHERE s.user_id = ? ORDER BY s.saved_at DESC
-    """, (user_id,))
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT s.*, o.keyword, o.score, o.marketplace, o.url
+            FROM saved_opportunities s JOIN opportunities o ON s.opportunity_id = o.id
+            WHERE s.user_id = ? ORDER BY s.saved_at DESC
+        """, (user_id,))
+        rows = cursor.fetchall()
+        return [dict(r) for r in rows]
 
 def create_project(user_id: int, name: str, description: str = "") -> int:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO user_projects (user_id, name, description) VALUES (?, ?, ?) RETURNING id", (user_id, name, description))
-    pid = cursor.fetchone()[0]
-    conn.commit()
-    conn.close()
-    return pid
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO user_projects (user_id, name, description) VALUES (?, ?, ?) RETURNING id", (user_id, name, description))
+        pid = cursor.fetchone()[0]
+        conn.commit()
+        return pid
 
 def get_user_projects(user_id: int) -> List[Dict]:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM user_projects WHERE user_id = ? ORDER BY created_at DESC", (user_id,))
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM user_projects WHERE user_id = ? ORDER BY created_at DESC", (user_id,))
+        rows = cursor.fetchall()
+        return [dict(r) for r in rows]
 
 
 # --- SEARCH HISTORY V2 ---
 
+_TERM_HISTORY_COLUMNS = ["term", "source", "metric_value", "metric_type", "captured_at"]
+_term_history_ready = set()  # DB paths whose search_term_history table already exists
+
+def _ensure_term_history(cursor):
+    """Create search_term_history once per process and DB (lazy init for pre-V2 DBs),
+    instead of re-running the DDL on every snapshot."""
+    if str(DB_PATH) in _term_history_ready:
+        return
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS search_term_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        term TEXT NOT NULL,
+        source TEXT,
+        metric_value REAL,
+        metric_type TEXT DEFAULT 'occurrence_rank',
+        captured_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    _term_history_ready.add(str(DB_PATH))
+
 def add_term_history_snapshot(term: str, metric_value: float, source: str = "pipeline", metric_type: str = "occurrence_rank"):
-    conn = get_connection()
+    add_term_history_snapshots([(term, metric_value)], source=source, metric_type=metric_type)
+
+def add_term_history_snapshots(snapshots: List[Tuple[str, float]], source: str = "pipeline", metric_type: str = "occurrence_rank") -> int:
+    """Write many ``(term, metric_value)`` snapshots in one transaction (COPY on Postgres).
+    All rows share one ``captured_at``. Returns the number of rows written."""
+    from datetime import timezone
+    captured_at = datetime.now(timezone.utc)
+    rows = [(term, source, value, metric_type, captured_at) for term, value in snapshots]
+    if not rows:
+        return 0
     try:
-        from datetime import timezone
-        cursor = conn.cursor()
-        # Lazy init table
-        cursor.execute('''CREATE TABLE IF NOT EXISTS search_term_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, term TEXT NOT NULL, source TEXT,
-            metric_value REAL, metric_type TEXT DEFAULT 'occurrence_rank', captured_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-        cursor.execute("INSERT INTO search_term_history (term, source, metric_value, metric_type, captured_at) VALUES (?, ?, ?, ?, ?)",
-                      (term, source, metric_value, metric_type, datetime.now(timezone.utc)))
-        conn.commit()
-    except Exception as e: print(f"[db_error] History snapshot failed: {e}")
-    finally: conn.close()
+        with transaction() as conn:
+            cursor = conn.cursor()
+            _ensure_term_history(cursor)
+            _copy_rows(conn, cursor, "search_term_history", _TERM_HISTORY_COLUMNS, rows)
+        return len(rows)
+    except Exception as e:
+        _term_history_ready.discard(str(DB_PATH))  # The DDL may have been rolled back too
+        print(f"[db_error] History snapshot failed: {e}")
+        return 0
 
 def get_term_history(term: str, metric_type: str = "occurrence_rank", limit: int = 14) -> List[Dict]:
-    conn = get_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT metric_value, captured_at FROM search_term_history WHERE term = ? AND metric_type = ? ORDER BY captured_at DESC LIMIT ?", 
-                      (term, metric_type, limit))
-        return [dict(row) for row in cursor.fetchall()]
-    except: return []
-    finally: conn.close()
+    with connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT metric_value, captured_at FROM search_term_history WHERE term = ? AND metric_type = ? ORDER BY captured_at DESC LIMIT ?", 
+                          (term, metric_type, limit))
+            return [dict(row) for row in cursor.fetchall()]
+        except: return []
+
+def get_term_histories(terms: List[str], metric_type: str = "occurrence_rank", limit: int = 14) -> Dict[str, List[Dict]]:
+    """Batch ``get_term_history``: last ``limit`` snapshots per term via one windowed query
+    per chunk. Returns ``{term: rows}`` (newest first); terms without history are omitted."""
+    unique = list(dict.fromkeys(t for t in terms if t))
+    result: Dict[str, List[Dict]] = {}
+    if not unique:
+        return result
+    with connection() as conn:
+        try:
+            cursor = conn.cursor()
+            for chunk in _chunks(unique):
+                marks = ", ".join(["?"] * len(chunk))
+                cursor.execute(f"""
+                    SELECT term, metric_value, captured_at FROM (
+                        SELECT term, metric_value, captured_at,
+                               ROW_NUMBER() OVER (PARTITION BY term ORDER BY captured_at DESC) AS rn
+                        FROM search_term_history
+                        WHERE metric_type = ? AND term IN ({marks})
+                    ) ranked
+                    WHERE rn <= ?
+                    ORDER BY term, rn
+                """, [metric_type, *chunk, limit])
+                for row in cursor.fetchall():
+                    row = dict(row)
+                    result.setdefault(row.pop("term"), []).append(row)
+        except Exception as e:
+            print(f"[db_error] get_term_histories: {e}")
+    return result
 
 # --- SYSTEM CONFIGS (TOKEN PERSISTENCE) ---
 
 def get_config(key: str) -> Optional[str]:
-    conn = get_connection()
-    try:
-        cursor = conn.cursor()
-        # Ensure table (lazy init for existing DBs)
-        cursor.execute("CREATE TABLE IF NOT EXISTS system_configs (key TEXT PRIMARY KEY, value TEXT, updated_at DATETIME)")
-        cursor.execute("SELECT value FROM system_configs WHERE key = ?", (key,))
-        row = cursor.fetchone()
-        return row[0] if row else None
-    except Exception as e:
-        print(f"[db_error] get_config {key}: {e}")
-        return None
-    finally:
-        conn.close()
+    with connection() as conn:
+        try:
+            cursor = conn.cursor()
+            # Ensure table (lazy init for existing DBs)
+            cursor.execute("CREATE TABLE IF NOT EXISTS system_configs (key TEXT PRIMARY KEY, value TEXT, updated_at DATETIME)")
+            cursor.execute("SELECT value FROM system_configs WHERE key = ?", (key,))
+            row = cursor.fetchone()
+            # By name: sqlite3.Row and Postgres RealDictRow both support it
+            return row["value"] if row else None
+        except Exception as e:
+            print(f"[db_error] get_config {key}: {e}")
+            return None
 
 def set_config(key: str, value: str):
-    conn = get_connection()
-    try:
-        from datetime import datetime
-        cursor = conn.cursor()
-        cursor.execute("CREATE TABLE IF NOT EXISTS system_configs (key TEXT PRIMARY KEY, value TEXT, updated_at DATETIME)")
-        cursor.execute("""
-            INSERT INTO system_configs (key, value, updated_at) 
-            VALUES (?, ?, ?)
-            ON CONFLICT(key) DO UPDATE SET 
-                value = excluded.value, 
-                updated_at = excluded.updated_at
-        """, (key, value, datetime.now()))
-        conn.commit()
-    except Exception as e:
-        print(f"[db_error] set_config {key}: {e}")
-    finally:
-        conn.close()
+    with connection() as conn:
+        try:
+            from datetime import datetime
+            cursor = conn.cursor()
+            cursor.execute("CREATE TABLE IF NOT EXISTS system_configs (key TEXT PRIMARY KEY, value TEXT, updated_at DATETIME)")
+            cursor.execute("""
+                INSERT INTO system_configs (key, value, updated_at) 
+                VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET 
+                    value = excluded.value, 
+                    updated_at = excluded.updated_at
+            """, (key, value, datetime.now()))
+            conn.commit()
+        except Exception as e:
+            print(f"[db_error] set_config {key}: {e}")
 
 if __name__ == "__main__":
     init_db()
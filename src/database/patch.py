@@ -1,6 +1,7 @@
 import sqlite3
 import os
 import io
+import csv
 
 class PostgreSQLAdapter:
     def __init__(self, conn):
@@ -32,6 +33,27 @@ class PostgreSQLCursor:
         self.cursor = cursor
 
     def execute(self, sql, parameters=()):
+        sql = self._translate(sql)
+        # Handle "ON CONFLICT" syntax (SQLite is similar to Postgres, but not identical)
+        # We rely on psycopg2 to handle %s parameter binding
+        try:
+            return self.cursor.execute(sql, parameters)
+        except Exception as e:
+            # Fallback or logging could go here
+            raise e
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor.executemany(self._translate(sql), seq_of_parameters)
+
+    def copy_rows(self, table, columns, rows):
+        """Bulk load rows with COPY ... FROM STDIN (CSV). None becomes NULL."""
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        buf.seek(0)
+        self.cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+    @staticmethod
+    def _translate(sql):
         # Translate SQLite-specific syntax to PostgreSQL
         sql = sql.replace("INTEGER PRIMARY KEY AUTOINCREMENT", "SERIAL PRIMARY KEY")
         sql = sql.replace("DATETIME DEFAULT CURRENT_TIMESTAMP", "TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
@@ -44,15 +66,7 @@ class PostgreSQLCursor:
         sql = sql.replace("?","%s")
         sql = sql.replace("INSERT OR IGNORE", "INSERT") # Rough approx
         sql = sql.replace("RETURNING id", "RETURNING id") 
-
-        
-        # Handle "ON CONFLICT" syntax (SQLite is similar to Postgres, but not identical)
-        # We rely on psycopg2 to handle %s parameter binding
-        try:
-            return self.cursor.execute(sql, parameters)
-        except Exception as e:
-            # Fallback or logging could go here
-            raise e
+        return sql
 
     def fetchone(self):
         return self.cursor.fetchone()
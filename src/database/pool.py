@@ -0,0 +1,153 @@
+"""Thread-safe connection pool shared by the src.database helpers."""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class PoolExhaustedError(RuntimeError):
+    """Raised when no connection frees up within the acquire timeout."""
+
+
+class ConnectionPool:
+    """Bounded pool of DB-API connections (SQLite or the patched Postgres adapter).
+
+    - At most ``max_size`` connections exist at once; callers block until one is released.
+    - Connections idle for more than ``idle_timeout`` seconds are closed instead of reused.
+    - Connections idle for more than ``health_check_after`` seconds are pinged before reuse.
+    - Released connections are rolled back, so nobody inherits a half-open transaction.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        max_size: int = 5,
+        idle_timeout: float = 300.0,
+        health_check_after: float = 30.0,
+        acquire_timeout: float = 30.0,
+    ):
+        self._factory = factory
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.acquire_timeout = acquire_timeout
+
+        self._idle: List[Tuple[Any, float]] = []  # (conn, released_at), newest last
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+    # --- Borrow / Return ---
+
+    def acquire(self):
+        """Borrow a connection, opening a new one if the pool is below max_size."""
+        deadline = time.monotonic() + self.acquire_timeout
+        conn, released_at = None, None
+        expired: List[Any] = []
+
+        try:
+            with self._cond:
+                while True:
+                    expired.extend(self._pop_expired())
+                    if self._idle:
+                        conn, released_at = self._idle.pop()
+                        self._in_use += 1
+                        break
+                    if self._in_use < self.max_size:
+                        self._in_use += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolExhaustedError(
+                            f"No connection available after {self.acquire_timeout}s (max_size={self.max_size})"
+                        )
+                    self._cond.wait(remaining)
+        finally:
+            # Closing happens outside the lock so slow teardowns don't block other threads
+            for stale in expired:
+                self._close(stale)
+
+        try:
+            if conn is not None and time.monotonic() - released_at > self.health_check_after:
+                if not self._is_healthy(conn):
+                    self._close(conn)
+                    conn = None
+            if conn is None:
+                conn = self._factory()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def release(self, conn, discard: bool = False):
+        """Return a connection to the pool (or close it when ``discard`` is set)."""
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True  # Broken connection, don't recycle it
+
+        with self._cond:
+            self._in_use -= 1
+            if not discard:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+        if discard:
+            self._close(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager: borrow a connection and always give it back."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    # --- Maintenance ---
+
+    def close(self):
+        """Close every idle connection. Borrowed ones are recycled normally on release."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "max_size": self.max_size,
+            }
+
+    # --- Internals ---
+
+    def _pop_expired(self) -> List[Any]:
+        """Remove idle connections older than idle_timeout (caller holds the lock)."""
+        now = time.monotonic()
+        expired = []
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            expired.append(self._idle.pop(0)[0])
+        return expired
+
+    @staticmethod
+    def _is_healthy(conn) -> bool:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
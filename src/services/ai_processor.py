@@ -1,15 +1,17 @@
 """Market Radar AI Processor (Intent Clusterization)."""
+import argparse
 import json
 import os
-import requests
-import sys
 from pathlib import Path
-from datetime import datetime, timezone
 
 # Imports
+from src.services.llm_clustering import DEFAULT_WINDOW_TOKENS, cluster_signals, incremental_clusters
+from src.services.preclustering import bucket_signals, expand_representatives, offline_clusters
 from src.utils.env_loader import load_env
+from src.utils.llm_client import CHAT_ENDPOINT, DEFAULT_CONCURRENCY, ChatClient
 from src.utils.keyword_utils import load_keywords, save_keywords
-from src.database import save_cluster
+from src.utils.jsonl import write_snapshot
+from src.database import get_latest_clusters, save_cluster, update_cluster
 
 load_env()
 
@@ -18,28 +20,21 @@ DATA_DIR.mkdir(parents=True, exist_ok=True)
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 
 class AIProcessor:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, endpoint: str = CHAT_ENDPOINT, concurrency: int = DEFAULT_CONCURRENCY,
+                 window_tokens: int = DEFAULT_WINDOW_TOKENS):
         self.api_key = api_key
-        self.headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        self.endpoint = "https://api.openai.com/v1/chat/completions"
+        self.endpoint = endpoint
+        self.window_tokens = window_tokens
+        self.client = ChatClient(api_key, endpoint, concurrency=concurrency) if api_key else None
 
-    def analyze_signals(self, signals: list[str]) -> list[dict]:
-        """Convert raw signals into Intent Clusters."""
-        if not self.api_key:
-            print("❌ OPENAI_API_KEY missing. Skipping AI step.")
-            return []
-            
-        print(f"🧠 Processing {len(signals)} signals with GPT-4o-mini...")
-        
+    def build_messages(self, window: list[str]) -> list[dict]:
+        """Chat messages asking the model to cluster one window of signals."""
         prompt = f"""
         Analyze these search queries from Mercado Livre/Amazon:
-        {json.dumps(signals[:50])} ...
+        {json.dumps(window, ensure_ascii=False)}
         
         Group them into highly specific INTENT CLUSTERS.
-        For each cluster, return JSON:
+        Return a JSON object {{"clusters": [...]}} where each cluster is:
         [
           {{
             "cluster_name": "Specific Buying Desire (e.g. 'Fone Bluetooth Corrida')",
@@ -54,34 +49,41 @@ class AIProcessor:
           }}
         ]
         """
-        
-        payload = {
-            "model": "gpt-4o-mini",
-            "messages": [
-                {"role": "system", "content": "You are a Senior E-commerce Strategist specialized in identifying under-served market gaps."},
-                {"role": "user", "content": prompt}
-            ],
-            "response_format": {"type": "json_object"},
-            "temperature": 0.2
-        }
+        return [
+            {"role": "system", "content": "You are a Senior E-commerce Strategist specialized in identifying under-served market gaps."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def analyze_signals(self, signals: list[str], incremental: bool = False) -> list[dict]:
+        """Convert raw signals into Intent Clusters. ``incremental`` only sends signals no
+        stored cluster covers yet, and folds the results into the existing rows.
+        Without an API key the local pre-clustering buckets are used as clusters."""
+        if self.api_key:
+            cluster_fn = self._cluster
+            print(f"🧠 Processing {len(signals)} signals with GPT-4o-mini...")
+        else:
+            cluster_fn = self._cluster_offline
+            print("⚠️  OPENAI_API_KEY missing. Using local pre-clustering only (no AI validation).")
         
         try:
-            resp = requests.post(self.endpoint, json=payload, headers=self.headers, timeout=60)
-            if resp.status_code != 200:
-                print(f"❌ OpenAI Error: {resp.text}")
+            if incremental:
+                clusters, updated, created = incremental_clusters(signals, get_latest_clusters(), cluster_fn)
+            else:
+                clusters = cluster_fn(signals)
+                updated, created = [], clusters
+            if self.client and self.client.cache:
+                print(f"💾 {self.client.cache.summary()}")
+            if not clusters:
                 return []
-                
-            content = resp.json()['choices'][0]['message']['content']
-            parsed = json.loads(content)
-            clusters = parsed.get("clusters", parsed.get("intent_clusters", []))
             
             # Save raw output
             self._save_raw_output(clusters)
             
             # Save to DB
-            for c in clusters:
-                c["source_signals_used"] = signals[:5] # Approximation
-                save_cluster(c)
+            for c in updated:
+                update_cluster(c["db_id"], c)
+            for c in created:
+                c["db_id"] = save_cluster(c)
                 
             return clusters
             
@@ -89,18 +91,28 @@ class AIProcessor:
             print(f"❌ Automation Error: {e}")
             return []
 
+    def _cluster(self, signals: list[str]) -> list[dict]:
+        # Near-duplicate signals are bucketed locally; only one representative per bucket
+        # goes to the model. Windows run in parallel and their clusters are merged.
+        buckets = bucket_signals(signals)
+        print(f"🪣 {len(signals)} signals -> {len(buckets)} local bucket(s)")
+        clusters = cluster_signals([b.representative for b in buckets], self.client, self.build_messages,
+                                   window_tokens=self.window_tokens,
+                                   response_format={"type": "json_object"})
+        return expand_representatives(clusters, buckets)
+
+    def _cluster_offline(self, signals: list[str]) -> list[dict]:
+        return offline_clusters(bucket_signals(signals))
+
     def _save_raw_output(self, clusters):
-        fname = f"intent_clusters-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
-        with (DATA_DIR / fname).open("w", encoding="utf-8") as f:
-            json.dump(clusters, f, indent=2, ensure_ascii=False)
-        # Update latest pointer for pipeline
-        with (DATA_DIR / "intent_clusters_latest.json").open("w", encoding="utf-8") as f:
-             json.dump(clusters, f, indent=2, ensure_ascii=False)
+        # Written once; intent_clusters-latest.jsonl points at it for the pipeline
+        write_snapshot("intent_clusters", clusters, raw_dir=DATA_DIR)
 
 def main():
-    if not OPENAI_API_KEY:
-        print("❌ Cannot run AI Processor: No API Key.")
-        return
+    parser = argparse.ArgumentParser(description="Cluster intent signals with the LLM")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only send signals no stored cluster covers; merge into existing clusters")
+    args = parser.parse_args()
 
     # Load from Intent Signals step
     signals, source = load_keywords(preferred_sources=("intent_signals", "mercadolivre_trends"), return_rich_objects=False)
@@ -110,7 +122,7 @@ def main():
         return
         
     ai_bot = AIProcessor(OPENAI_API_KEY)
-    ai_bot.analyze_signals(signals)
+    ai_bot.analyze_signals(signals, incremental=args.incremental)
     print("✅ AI Processing Complete.")
 
 if __name__ == "__main__":
@@ -0,0 +1,201 @@
+"""Columnar archive of historical product scrapes (longitudinal analytics).
+
+``compact()`` folds raw ``mercado_livre-*`` / ``amazon-*`` snapshots into
+``data/archive/source=<prefix>/date=<YYYY-MM-DD>/<snapshot>.<part>``: Parquet when
+pyarrow is installed, otherwise a directory with one gzipped JSON array per column.
+``scan()`` reads only the requested columns of the partitions that match.
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import shutil
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:  # Optional dependency
+    pa = pq = None
+    HAS_PYARROW = False
+
+from src.utils.jsonl import iter_records
+from src.utils.raw_manifest import DATA_DIR as RAW_DIR, get_manifest
+
+ARCHIVE_DIR = RAW_DIR.parent / "archive"
+SOURCES = ("mercado_livre", "amazon")
+DEFAULT_FORMAT = "parquet" if HAS_PYARROW else "columns"
+PART_SUFFIXES = {"parquet": ".parquet", "columns": ".cols"}
+
+
+def _text(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _integer(value) -> Optional[int]:
+    number = _number(value)
+    return None if number is None else int(number)
+
+
+def _flag(value) -> Optional[bool]:
+    return None if value is None else bool(value)
+
+
+# Archived columns: name -> (item field, coercion). Partition keys (source, date) are
+# not stored in the parts; scan() fills them in from the directory names.
+COLUMNS: Dict[str, tuple] = {
+    "snapshot": (None, _text),
+    "captured_at": ("timestamp", _text),
+    "collector": ("source", _text),
+    "search_keyword": ("search_keyword", _text),
+    "title": ("title", _text),
+    "price": ("price", _number),
+    "rating": ("rating", _number),
+    "reviews_count": ("reviews_count", _integer),
+    "seller_name": ("seller_name", _text),
+    "free_shipping": ("free_shipping", _flag),
+    "is_prime": ("is_prime", _flag),
+    "permalink": ("permalink", _text),
+}
+PARTITION_COLUMNS = ("source", "date")
+
+if HAS_PYARROW:
+    _ARROW_TYPES = {_text: pa.string(), _number: pa.float64(), _integer: pa.int64(), _flag: pa.bool_()}
+    SCHEMA = pa.schema([(name, _ARROW_TYPES[coerce]) for name, (_, coerce) in COLUMNS.items()])
+
+
+def to_columns(records: Iterable[Dict[str, Any]], snapshot: str) -> Dict[str, list]:
+    """Pivot scraped items into the archive's typed columns."""
+    columns: Dict[str, list] = {name: [] for name in COLUMNS}
+    for item in records:
+        if not hasattr(item, "get"):
+            continue
+        for name, (field, coerce) in COLUMNS.items():
+            columns[name].append(snapshot if field is None else coerce(item.get(field)))
+    return columns
+
+
+# --- Part files ---
+
+def _write_part(path: Path, columns: Dict[str, list], fmt: str):
+    tmp = path.with_name(f".{path.name}.tmp")
+    if fmt == "parquet":
+        if not HAS_PYARROW:
+            raise RuntimeError("Parquet parts require the 'pyarrow' package")
+        pq.write_table(pa.Table.from_pydict(columns, schema=SCHEMA), tmp, compression="zstd")
+    else:
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for name, values in columns.items():
+            with gzip.open(tmp / f"{name}.json.gz", "wt", encoding="utf-8") as fp:
+                json.dump(values, fp, ensure_ascii=False, separators=(",", ":"))
+    tmp.rename(path)
+
+
+def _read_part(path: Path, columns: List[str]) -> Dict[str, list]:
+    if path.suffix == ".parquet":
+        if not HAS_PYARROW:
+            raise RuntimeError(f"{path.name} is Parquet: install 'pyarrow' to read it")
+        return pq.read_table(path, columns=columns).to_pydict()
+    out = {}
+    for name in columns:
+        with gzip.open(path / f"{name}.json.gz", "rt", encoding="utf-8") as fp:
+            out[name] = json.load(fp)
+    return out
+
+
+def _part_path(archive_dir: Path, source: str, timestamp: str, fmt: str) -> Path:
+    date = f"{timestamp[:4]}-{timestamp[4:6]}-{timestamp[6:8]}"
+    return archive_dir / f"source={source}" / f"date={date}" / f"{timestamp}{PART_SUFFIXES[fmt]}"
+
+
+# --- Compaction ---
+
+def compact(raw_dir: Path = RAW_DIR, archive_dir: Path = ARCHIVE_DIR,
+            sources: Iterable[str] = SOURCES, fmt: str = DEFAULT_FORMAT) -> List[Path]:
+    """Archive every raw snapshot of ``sources`` not archived yet. Returns the new parts."""
+    archive_dir = Path(archive_dir)
+    manifest = get_manifest(raw_dir)
+    written = []
+    for source in sources:
+        for entry in manifest.entries(source):
+            timestamp = entry["timestamp"]
+            if any(_part_path(archive_dir, source, timestamp, f).exists() for f in PART_SUFFIXES):
+                continue
+            columns = to_columns(iter_records(Path(raw_dir) / entry["file"]), snapshot=timestamp)
+            if not columns["snapshot"]:
+                continue
+            path = _part_path(archive_dir, source, timestamp, fmt)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _write_part(path, columns, fmt)
+            written.append(path)
+    return written
+
+
+# --- Queries ---
+
+def _partitions(archive_dir: Path, sources, start, end) -> Iterator[tuple]:
+    """(source, date, part) of the parts matching the filters, by directory name only."""
+    for source_dir in sorted(Path(archive_dir).glob("source=*")):
+        source = source_dir.name.split("=", 1)[1]
+        if sources is not None and source not in sources:
+            continue
+        for date_dir in sorted(source_dir.glob("date=*")):
+            date = date_dir.name.split("=", 1)[1]
+            if (start and date < start) or (end and date > end):
+                continue
+            for part in sorted(date_dir.iterdir()):
+                if not part.name.startswith(".") and part.suffix in PART_SUFFIXES.values():
+                    yield source, date, part
+
+
+def scan(columns: Iterable[str], sources: Optional[Iterable[str]] = None,
+         start: Optional[str] = None, end: Optional[str] = None,
+         where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+         archive_dir: Path = ARCHIVE_DIR) -> Dict[str, list]:
+    """Read ``columns`` (archived columns plus ``source``/``date``) from the partitions
+    within ``sources`` and the ISO date range [start, end]. ``where`` filters rows and
+    may only look at the requested columns."""
+    columns = list(dict.fromkeys(columns))
+    unknown = set(columns) - set(COLUMNS) - set(PARTITION_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown archive columns: {sorted(unknown)}")
+    stored = [c for c in columns if c in COLUMNS]
+    sources = set(sources) if sources is not None else None
+
+    out: Dict[str, list] = {name: [] for name in columns}
+    for source, date, part in _partitions(archive_dir, sources, start, end):
+        data = _read_part(part, stored or ["snapshot"])
+        rows = len(next(iter(data.values())))
+        data.update({"source": [source] * rows, "date": [date] * rows})
+        keep = range(rows)
+        if where is not None:
+            keep = [i for i in keep if where({name: data[name][i] for name in columns})]
+        for name in columns:
+            values = data[name]
+            out[name].extend(values if where is None else [values[i] for i in keep])
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact raw scrapes into the columnar archive")
+    parser.add_argument("--source", action="append", choices=SOURCES, help="Only these sources (repeatable)")
+    parser.add_argument("--format", choices=sorted(PART_SUFFIXES), default=DEFAULT_FORMAT)
+    args = parser.parse_args()
+
+    parts = compact(sources=args.source or SOURCES, fmt=args.format)
+    print(f"🗄️  {len(parts)} snapshot(s) archived into {ARCHIVE_DIR} ({args.format})")
+
+
+if __name__ == "__main__":
+    main()
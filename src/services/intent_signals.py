@@ -1,13 +1,13 @@
 """Collect real-time market signals from Mercado Livre Offers & Trends."""
-import json
 import requests
 import random
 import time
 from datetime import datetime
 from pathlib import Path
 from typing import List
-from bs4 import BeautifulSoup
 
+from src.utils.embedded_json import embedded_titles, json_ld_titles
+from src.utils.html_parser import JSON_LD, Node, parse_html
 from src.utils.keyword_utils import save_keywords
 
 # Path adjustment
@@ -27,26 +27,9 @@ HEADERS = {
     "Referer": "https://www.mercadolivre.com.br/",
 }
 
-def extract_json_ld(soup) -> List[str]:
+def extract_json_ld(soup: Node) -> List[str]:
     """Extract product names from JSON-LD structured data (Hidden Gold Mine)."""
-    titles = []
-    scripts = soup.find_all('script', type='application/ld+json')
-    for script in scripts:
-        try:
-            data = json.loads(script.string)
-            # Schema.org/ItemList
-            if data.get('@type') == 'ItemList':
-                items = data.get('itemListElement', [])
-                for item in items:
-                    name = item.get('name') or item.get('item', {}).get('name')
-                    if name: titles.append(name)
-            
-            # Schema.org/Product
-            if data.get('@type') == 'Product':
-                if data.get('name'): titles.append(data['name'])
-                
-        except: continue
-    return titles
+    return json_ld_titles(soup.json_ld())
 
 def scrape_real_signals() -> List[str]:
     """Scrape real offers and trends using robust headers and JSON-LD."""
@@ -57,17 +40,23 @@ def scrape_real_signals() -> List[str]:
     try:
         resp = requests.get(URL_OFFERS, headers=HEADERS, timeout=15)
         if resp.status_code == 200:
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            
-            # 1. Try JSON-LD first (Most reliable)
-            ld_titles = extract_json_ld(soup)
-            signals.extend(ld_titles)
-            
-            # 2. Try CSS Selectors for Offer Cards
-            # Targets: promotion-item__title, poly-component__title
-            for cls in ["promotion-item__title", "poly-component__title", "ui-search-item__title"]:
-                for el in soup.select(f".{cls}"):
-                    signals.append(el.get_text(strip=True))
+            # 0. Fast path: JSON-LD / preloaded state straight from the bytes (no DOM)
+            fast = embedded_titles(resp.content)
+            if fast:
+                signals.extend(fast)
+            else:
+                offer_titles = [".promotion-item__title", ".poly-component__title", ".ui-search-item__title"]
+                soup = parse_html(resp.text, only=[JSON_LD] + offer_titles)
+
+                # 1. Try JSON-LD first (Most reliable)
+                ld_titles = extract_json_ld(soup)
+                signals.extend(ld_titles)
+
+                # 2. Try CSS Selectors for Offer Cards
+                # Targets: promotion-item__title, poly-component__title
+                for css in offer_titles:
+                    for el in soup.select(css):
+                        signals.append(el.text())
                     
     except Exception as e:
         print(f"❌ Error fetching offers: {e}")
@@ -77,18 +66,22 @@ def scrape_real_signals() -> List[str]:
     try:
         resp = requests.get(URL_TRENDS, headers=HEADERS, timeout=15)
         if resp.status_code == 200:
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            
-            # JSON-LD
-            signals.extend(extract_json_ld(soup))
-            
-            # Carousel Titles
-            for el in soup.select(".ui-recommendations-card__title"):
-                signals.extend([el.get_text(strip=True)])
-                
-            # Links inside carousels (often just the text)
-            for link in soup.select("a.ui-recommendations-card__link"):
-                signals.append(link.get_text(strip=True))
+            fast = embedded_titles(resp.content)
+            if fast:
+                signals.extend(fast)
+            else:
+                soup = parse_html(resp.text, only=[JSON_LD, ".ui-recommendations-card__title", "a.ui-recommendations-card__link"])
+
+                # JSON-LD
+                signals.extend(extract_json_ld(soup))
+
+                # Carousel Titles
+                for el in soup.select(".ui-recommendations-card__title"):
+                    signals.extend([el.text()])
+
+                # Links inside carousels (often just the text)
+                for link in soup.select("a.ui-recommendations-card__link"):
+                    signals.append(link.text())
                 
     except Exception as e:
         print(f"❌ Error fetching trends: {e}")
@@ -0,0 +1,282 @@
+"""Chunked, parallel intent clustering.
+
+The whole signal set is split into token-budgeted windows; each window is clustered
+by one chat call (run concurrently, paced by the ChatClient limits) and
+``merge_clusters`` folds the clusters that different windows found for the same
+intent. The result does not depend on which call finishes first. Replies are
+streamed and parsed cluster by cluster, so a window cut short still keeps the
+clusters it completed.
+"""
+from __future__ import annotations
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.services.preclustering import normalize_tokens
+from src.utils.json_stream import iter_array_items
+from src.utils.llm_client import ChatClient, estimate_tokens
+
+# Signal tokens per window (the prompt template comes on top)
+DEFAULT_WINDOW_TOKENS = 1200
+# Clusters sharing this fraction of the smaller product list are the same intent
+MERGE_OVERLAP = 0.5
+# Token Jaccard for a window signal to count as the source of a (paraphrased) product
+SOURCE_OVERLAP = 0.5
+
+Messages = List[Dict[str, str]]
+
+
+def normalize(term: str) -> str:
+    return " ".join(str(term).lower().split())
+
+
+def signal_windows(signals: Iterable[str], max_tokens: int = DEFAULT_WINDOW_TOKENS) -> List[List[str]]:
+    """Unique signals (case/space-insensitive), sorted so related terms share a window,
+    packed into windows of at most ``max_tokens`` estimated tokens."""
+    unique: Dict[str, str] = {}
+    for signal in signals:
+        key = normalize(signal)
+        if key and key not in unique:
+            unique[key] = str(signal).strip()
+
+    windows: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for key in sorted(unique):
+        cost = estimate_tokens(json.dumps(unique[key], ensure_ascii=False)) + 1
+        if current and used + cost > max_tokens:
+            windows.append(current)
+            current, used = [], 0
+        current.append(unique[key])
+        used += cost
+    if current:
+        windows.append(current)
+    return windows
+
+
+# Keys of a json_object reply that hold the cluster list
+CLUSTER_KEYS = ("clusters", "intent_clusters")
+
+
+def parse_clusters(content: str) -> List[Dict[str, Any]]:
+    """Clusters from a model reply: a JSON array, ``{"clusters": [...]}`` (json_object
+    mode) or a single cluster object. Markdown fences are ignored."""
+    content = content.replace("```json", "").replace("```", "").strip()
+    parsed = json.loads(content)
+    if isinstance(parsed, dict):
+        if "cluster_name" in parsed:
+            parsed = [parsed]
+        else:
+            parsed = next((parsed[k] for k in CLUSTER_KEYS if k in parsed), [])
+    return [c for c in parsed if isinstance(c, dict)] if isinstance(parsed, list) else []
+
+
+def stream_clusters(client: ChatClient, messages: Messages, **kwargs) -> Iterator[Dict[str, Any]]:
+    """Clusters of a streamed reply (array or ``{"clusters": [...]}``), each one as soon as
+    its object closes. A complete reply of another shape (e.g. a single cluster object)
+    goes through ``parse_clusters`` at the end. Errors propagate after the clusters
+    already yielded."""
+    text: List[str] = []
+
+    def chunks():
+        for chunk in client.stream(messages, **kwargs):
+            text.append(chunk)
+            yield chunk
+
+    found = 0
+    for item in iter_array_items(chunks(), CLUSTER_KEYS):
+        if isinstance(item, dict):
+            found += 1
+            yield item
+    if not found:
+        try:
+            yield from parse_clusters("".join(text))
+        except ValueError:
+            pass
+
+
+def _union(lists: Iterable[Any]) -> List[Any]:
+    seen = set()
+    out = []
+    for values in lists:
+        for value in values or []:
+            key = normalize(value) if isinstance(value, str) else json.dumps(value, sort_keys=True)
+            if key not in seen:
+                seen.add(key)
+                out.append(value)
+    return out
+
+
+def _confidence(cluster: Dict[str, Any]) -> float:
+    try:
+        return float(cluster.get("confidence_score") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _products(cluster: Dict[str, Any]) -> set:
+    return {normalize(p) for p in cluster.get("validated_products") or [] if isinstance(p, str)}
+
+
+def same_intent(a: Dict[str, Any], b: Dict[str, Any], overlap: float = MERGE_OVERLAP) -> bool:
+    """Same normalized name, or ``validated_products`` sharing ``overlap`` of the smaller list."""
+    name_a, name_b = normalize(a.get("cluster_name") or ""), normalize(b.get("cluster_name") or "")
+    if name_a and name_a == name_b:
+        return True
+    products_a, products_b = _products(a), _products(b)
+    shared = len(products_a & products_b)
+    return bool(shared) and shared / min(len(products_a), len(products_b)) >= overlap
+
+
+def fold(members: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One cluster from ``members``: the first one leads (name, intent, id...), list fields
+    are unioned and the price range widened."""
+    cluster = dict(members[0])
+    for field in ("validated_products", "negative_keywords", "source_signals_used"):
+        if any(c.get(field) for c in members):
+            cluster[field] = _union(c.get(field) for c in members)
+    ranges = [c.get("price_range_brl") for c in members if isinstance(c.get("price_range_brl"), dict)]
+    mins = [r["min"] for r in ranges if isinstance(r.get("min"), (int, float))]
+    maxs = [r["max"] for r in ranges if isinstance(r.get("max"), (int, float))]
+    if mins or maxs:
+        cluster["price_range_brl"] = {"min": min(mins) if mins else None, "max": max(maxs) if maxs else None}
+    return cluster
+
+
+def merge_clusters(clusters: List[Dict[str, Any]], overlap: float = MERGE_OVERLAP) -> List[Dict[str, Any]]:
+    """Fold clusters that ``same_intent`` links (transitively). The most confident member
+    leads (earliest on ties). Output is sorted by confidence, then name."""
+    parent = list(range(len(clusters)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(len(clusters)):
+        for j in range(i + 1, len(clusters)):
+            if same_intent(clusters[i], clusters[j], overlap):
+                parent[find(j)] = find(i)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(clusters)):
+        groups.setdefault(find(i), []).append(i)
+
+    merged = []
+    for members in groups.values():
+        lead = max(members, key=lambda i: (_confidence(clusters[i]), -i))
+        merged.append(fold([clusters[lead]] + [clusters[i] for i in members if i != lead]))
+
+    merged.sort(key=lambda c: (-_confidence(c), normalize(c.get("cluster_name") or "")))
+    return merged
+
+
+def _same_terms(a: frozenset, b: frozenset) -> bool:
+    """One term's tokens contain the other's, or they share ``SOURCE_OVERLAP`` of the union."""
+    return bool(a and b) and (a <= b or b <= a or len(a & b) / len(a | b) >= SOURCE_OVERLAP)
+
+
+def _attach_sources(clusters: List[Dict[str, Any]], window: List[str]) -> List[Dict[str, Any]]:
+    """``source_signals_used``: the window's signals that match one of the cluster's products
+    by tokens (accents/stopwords ignored), so paraphrased products still find their signals.
+    A cluster matching none gets an empty list, never unrelated window members."""
+    signals = [(s, frozenset(normalize_tokens(s))) for s in window]
+    for cluster in clusters:
+        products = [frozenset(normalize_tokens(p)) for p in cluster.get("validated_products") or []
+                    if isinstance(p, str)]
+        used = [s for s, tokens in signals if any(_same_terms(tokens, p) for p in products)]
+        cluster["source_signals_used"] = sorted(used)
+    return clusters
+
+
+def cluster_signals(signals: Iterable[str], client: ChatClient, build_messages: Callable[[List[str]], Messages],
+                    window_tokens: int = DEFAULT_WINDOW_TOKENS, temperature: float = 0.2,
+                    response_format: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    """Cluster every signal: one concurrent chat call per window, then ``merge_clusters``.
+    A failed window is reported and keeps the clusters it streamed before failing."""
+    windows = signal_windows(signals, window_tokens)
+    if not windows:
+        return []
+
+    def run(indexed):
+        index, window = indexed
+        found: List[Dict[str, Any]] = []
+        try:
+            found.extend(stream_clusters(client, build_messages(window), temperature=temperature,
+                                         response_format=response_format))
+        except Exception as e:
+            print(f"❌ Window {index + 1}/{len(windows)} failed after {len(found)} cluster(s): {e}")
+        return _attach_sources(found, window)
+
+    print(f"🧩 {sum(map(len, windows))} signals in {len(windows)} window(s), {client.concurrency} in parallel")
+    with ThreadPoolExecutor(max_workers=min(client.concurrency, len(windows))) as pool:
+        results = list(pool.map(run, enumerate(windows)))
+    return merge_clusters([c for clusters in results for c in clusters])
+
+
+# --- Incremental runs ---
+
+# Cluster fields whose values identify the signals a cluster covers
+INDEX_FIELDS = ("cluster_name", "validated_products", "source_signals_used")
+
+
+class ClusterIndex:
+    """Normalized term -> known cluster, from each cluster's ``fields`` (name, validated
+    products and source signals by default). The first cluster listing a term owns it."""
+
+    def __init__(self, clusters: List[Dict[str, Any]], fields: Tuple[str, ...] = INDEX_FIELDS):
+        self.clusters = list(clusters)
+        self._terms: Dict[str, int] = {}
+        for i, cluster in enumerate(self.clusters):
+            terms = []
+            for field in fields:
+                value = cluster.get(field)
+                terms.extend(value if isinstance(value, list) else [value])
+            for term in terms:
+                if isinstance(term, str) and normalize(term):
+                    self._terms.setdefault(normalize(term), i)
+
+    def lookup(self, term: str) -> Optional[int]:
+        return self._terms.get(normalize(term))
+
+    def split(self, signals: Iterable[str]) -> Tuple[Dict[int, List[str]], List[str]]:
+        """(cluster index -> known signals, novel signals)."""
+        known: Dict[int, List[str]] = {}
+        novel: List[str] = []
+        for signal in signals:
+            i = self.lookup(signal)
+            if i is None:
+                novel.append(signal)
+            else:
+                known.setdefault(i, []).append(signal)
+        return known, novel
+
+
+def incremental_clusters(signals: Iterable[str], known: List[Dict[str, Any]],
+                         cluster_fn: Callable[[List[str]], List[Dict[str, Any]]],
+                         index_fields: Tuple[str, ...] = INDEX_FIELDS) -> Tuple[list, list, list]:
+    """Assign signals already covered by ``known`` clusters locally; only the novel ones go
+    to ``cluster_fn`` (the model). New clusters with the ``same_intent`` as a known one are
+    folded into it (the known cluster keeps its name and id). ``index_fields`` picks the
+    cluster fields that count as known terms (see ``ClusterIndex``).
+
+    Returns ``(active, updated, created)``: this run's clusters (known ones hit by a signal,
+    then new ones), the known clusters that grew, and the brand-new clusters."""
+    index = ClusterIndex(known, index_fields)
+    hits, novel = index.split(signals)
+    print(f"♻️  {sum(map(len, hits.values()))} known signal(s) in {len(hits)} cluster(s); "
+          f"{len(novel)} novel signal(s) for the model")
+
+    updated: Dict[int, Dict[str, Any]] = {}
+    created: List[Dict[str, Any]] = []
+    for cluster in (cluster_fn(novel) if novel else []):
+        match = next((i for i, k in enumerate(index.clusters) if same_intent(k, cluster)), None)
+        if match is None:
+            created.append(cluster)
+        else:
+            updated[match] = fold([updated.get(match, index.clusters[match]), cluster])
+
+    active = [updated.get(i, index.clusters[i]) for i in sorted(set(hits) | set(updated))] + created
+    return active, [updated[i] for i in sorted(updated)], created
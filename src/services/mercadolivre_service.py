@@ -3,18 +3,21 @@ Mercado Livre Service - Official API Implementation
 Replaces scraping with robust API calls using OAuth2 authentication.
 """
 import os
-import json
 import logging
 import requests
 import argparse
-import time
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
 # Local imports
 from src.utils.keyword_utils import load_keywords
-from src.database import init_db, upsert_product, get_config, set_config
+from src.utils.http_client import HostRateLimiter, build_session
+from src.utils.http_cache import cached_get
+from src.utils.jsonl import write_records, write_snapshot
+from src.utils.product_record import ProductRecord
+from src.database import init_db, upsert_products_bulk, get_config, set_config
+from src.services.metrics.metrics_service import RunningMarketStats
 
 # Logger configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -24,18 +27,29 @@ logger = logging.getLogger(__name__)
 DATA_DIR = Path(__file__).resolve().parents[2] / "data" / "raw"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# Concurrency defaults (Public API tolerates a few req/s per IP)
+DEFAULT_CONCURRENCY = 8
+DEFAULT_REQUESTS_PER_SECOND = 4.0
+
+# Public search refuses offsets beyond this for anonymous calls
+MAX_SEARCH_OFFSET = 1000
+
 class MercadoLivreService:
     """Service to interact with Mercado Livre using the Official API."""
     
     API_URL = "https://api.mercadolibre.com"
 
-    def __init__(self):
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND):
         # We don't need auth for public search/trends to avoid 403
         # REQUIRED: Use browser-like User-Agent to avoid WAF blocks
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
             "Accept": "application/json"
         }
+        self.concurrency = max(1, concurrency)
+        # Shared keep-alive session + per-host token bucket for every worker thread
+        self.session = build_session(pool_size=self.concurrency, headers=self.headers)
+        self.limiter = HostRateLimiter(default_rate=requests_per_second)
 
     def get_trends(self, category_id: str = "MLB1051", limit: int = 10) -> List[str]:
         """
@@ -51,7 +65,7 @@ class MercadoLivreService:
         # First try generic site trends (often returns 404 but worth checking)
         try:
             url_gen = f"{self.API_URL}/sites/MLB/trends/search"
-            resp_gen = requests.get(url_gen, headers=self.headers, timeout=5)
+            resp_gen = cached_get(self.session, url_gen, "ml_trends", limiter=self.limiter, timeout=5)
             if resp_gen.status_code == 200:
                 trends = [t.get("keyword") for t in resp_gen.json() if t.get("keyword")]
                 logger.info(f"🔥 Generic Trends found: {len(trends)}")
@@ -66,7 +80,7 @@ class MercadoLivreService:
             url = f"{self.API_URL}/sites/MLB/trends/search?category={cat}"
             try:
                 # Public API call - No Auth Header needed, but User-Agent is CRITICAL
-                response = requests.get(url, headers=self.headers, timeout=10)
+                response = cached_get(self.session, url, "ml_trends", limiter=self.limiter, timeout=10)
                 
                 if response.status_code == 200:
                     trends = [t.get("keyword") for t in response.json() if t.get("keyword")]
@@ -89,20 +103,72 @@ class MercadoLivreService:
         return final_list
 
 
-    def search_products(self, keyword_obj: Dict, limit: int = 50) -> List[Dict[str, Any]]:
+    def search_products(self, keyword_obj: Dict, limit: int = 50) -> List[ProductRecord]:
         """Search products using the PUBLIC API (Anonymous to avoid 403)."""
         term = keyword_obj.get("term", "")
         if not term: return []
         
         logger.info(f"🔎 API Search: '{term}'")
         
-        url = f"{self.API_URL}/sites/MLB/search"
+        page = self._search_page(keyword_obj, self._search_params(keyword_obj, limit))
+        return page[0] if page else []
+
+    def iter_products(
+        self,
+        keyword_obj: Dict,
+        max_results: int = 500,
+        page_size: int = 50,
+        tolerance: float = 0.02,
+        patience: int = 2,
+    ) -> Iterator[ProductRecord]:
+        """
+        Deep search: walk ``offset`` pages and yield adapted products as each page arrives.
+        Stops at ``max_results``, at the last page, or early once the sample stabilises
+        (seller concentration and price compression move < ``tolerance`` for ``patience`` pages).
+        """
+        term = keyword_obj.get("term", "")
+        if not term: return
         
+        max_results = min(max_results, MAX_SEARCH_OFFSET)
+        stats = RunningMarketStats()
+        previous = None
+        stable_pages = 0
+        offset = 0
+        
+        while offset < max_results:
+            limit = min(page_size, max_results - offset)
+            logger.info(f"🔎 API Deep Search: '{term}' (offset {offset})")
+            page = self._search_page(keyword_obj, self._search_params(keyword_obj, limit, offset))
+            if page is None:
+                return
+            
+            products, raw_count, total = page
+            for product in products:
+                stats.add(product)
+                yield product
+            
+            offset += raw_count
+            if raw_count < limit or (total is not None and offset >= total):
+                return  # Last page
+            
+            current = (stats.concentration, stats.compression)
+            if previous and all(abs(c - p) < tolerance for c, p in zip(current, previous)):
+                stable_pages += 1
+                if stable_pages >= patience:
+                    logger.info(f"📉 '{term}': sample stable after {stats.count} items, stopping early")
+                    return
+            else:
+                stable_pages = 0
+            previous = current
+
+    def _search_params(self, keyword_obj: Dict, limit: int, offset: int = 0) -> Dict[str, Any]:
         # NO AUTH HEADERS for public search to avoid 403 Forbidden on standard tokens
         params = {
-            "q": term,
+            "q": keyword_obj.get("term", ""),
             "limit": limit,
         }
+        if offset:
+            params["offset"] = offset
         
         # Apply Price Filters
         p_min = keyword_obj.get("price_min")
@@ -114,14 +180,20 @@ class MercadoLivreService:
              params["price_range"] = f"{p_min}-*"
         elif p_max is not None:
              params["price_range"] = f"*-{p_max}"
+        return params
+
+    def _search_page(self, keyword_obj: Dict, params: Dict[str, Any]) -> Optional[Tuple[List[ProductRecord], int, Optional[int]]]:
+        """Fetch one search page -> (adapted products, raw result count, paging total). None on error."""
+        term = keyword_obj.get("term", "")
+        url = f"{self.API_URL}/sites/MLB/search"
 
         try:
             # CRITICAL: Use User-Agent header and NO Authorization header
-            response = requests.get(url, headers=self.headers, params=params, timeout=15)
+            response = cached_get(self.session, url, "ml_search", params=params, limiter=self.limiter, timeout=15)
             
             if response.status_code == 403:
                 logger.error(f"❌ 403 Forbidden. The API blocked the request. Try reducing rate.")
-                return []
+                return None
                 
             response.raise_for_status()
             data = response.json()
@@ -136,14 +208,26 @@ class MercadoLivreService:
                 if adapted:
                     processed_results.append(adapted)
             
-            return processed_results
+            return processed_results, len(results), data.get("paging", {}).get("total")
 
         except requests.exceptions.RequestException as e:
             logger.error(f"❌ Search Error for '{term}': {e}")
+            return None
+
+    def search_products_many(self, keyword_objs: List[Dict], limit: int = 50, depth: int = 0) -> List[List[ProductRecord]]:
+        """Run ``search_products`` for many keywords on a thread pool (``iter_products`` when
+        ``depth`` is set). Results keep the input order; the rate limiter paces requests per host."""
+        if not keyword_objs:
             return []
+        if depth:
+            search = lambda kw: list(self.iter_products(kw, max_results=depth))
+        else:
+            search = lambda kw: self.search_products(kw, limit=limit)
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(keyword_objs))) as pool:
+            return list(pool.map(search, keyword_objs))
 
-    def _adapt_product(self, item: Dict, negatives: List[str], search_term: str) -> Optional[Dict]:
-        """Convert API response to project dictionary format."""
+    def _adapt_product(self, item: Dict, negatives: List[str], search_term: str) -> Optional[ProductRecord]:
+        """Convert API response to a (slotted) product record."""
         try:
             title = item.get("title")
             price = item.get("price")
@@ -168,28 +252,35 @@ class MercadoLivreService:
             rating = 0.0 
             reviews_count = 0
             
-            return {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "source": "mercadolivre_api",
-                "search_keyword": search_term, 
-                "marketplace": "Mercado Livre",
-                "title": title,
-                "price": float(price),
-                "permalink": permalink,
-                "thumbnail": thumbnail,
-                "free_shipping": free_shipping,
-                "rating": rating,
-                "reviews_count": reviews_count,
-                "seller_name": str(seller_name)
-            }
+            return ProductRecord(
+                source="mercadolivre_api",
+                search_keyword=search_term,
+                marketplace="Mercado Livre",
+                title=title,
+                price=float(price),
+                permalink=permalink,
+                thumbnail=thumbnail,
+                free_shipping=free_shipping,
+                rating=rating,
+                reviews_count=reviews_count,
+                seller_name=str(seller_name),
+            )
         except Exception:
             return None
 
 
-def fetch_products(max_keywords: int = 15, products_per_keyword: int = 6, output: Optional[Path] = None):
-    """Main entrypoint: Auto-discover Trends -> Fetch Products."""
+def fetch_products(
+    max_keywords: int = 15,
+    products_per_keyword: int = 6,
+    output: Optional[Path] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+    depth: int = 0,
+):
+    """Main entrypoint: Auto-discover Trends -> Fetch Products.
+    ``depth`` > 0 walks result pages up to that many products per keyword."""
     
-    service = MercadoLivreService()
+    service = MercadoLivreService(concurrency=concurrency, requests_per_second=requests_per_second)
     
     # 1. AUTONOMOUS DISCOVERY: Get Real Trends from API
     logger.info("🚀 Starting Trend Discovery (API)...")
@@ -206,36 +297,28 @@ def fetch_products(max_keywords: int = 15, products_per_keyword: int = 6, output
     
     all_products = []
     
-    for idx, kw_obj in enumerate(target_keywords, 1):
+    # 2. Concurrent search (rate limited per host, honours 429/Retry-After)
+    results = service.search_products_many(target_keywords, limit=products_per_keyword, depth=depth)
+    
+    for idx, (kw_obj, products) in enumerate(zip(target_keywords, results), 1):
         term = kw_obj.get("term")
         print(f"[{idx}/{len(target_keywords)}] API '{term}'...", end=" ", flush=True)
         
-        products = service.search_products(kw_obj, limit=products_per_keyword)
-        
         if products:
             print(f"✅ {len(products)} found")
             all_products.extend(products)
             
-            # Upsert to DB
-            for p in products:
-                upsert_product(p, term)
+            # Upsert whole page to DB (single transaction)
+            upsert_products_bulk(products, term)
         else:
             print(f"❌ 0")
-            
-        time.sleep(1.0) # Respect Public API Rate Limits
 
-    # Save results
-    if output is None:
-        output = DATA_DIR / f"mercado_livre-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
-    
-    latest = DATA_DIR / "mercado_livre-latest.json"
-    
+    # Save results (JSONL written once; mercado_livre-latest.jsonl points at it)
     try:
-        with output.open("w", encoding="utf-8") as fp:
-            json.dump(all_products, fp, ensure_ascii=False, indent=2)
-        
-        with latest.open("w", encoding="utf-8") as fp:
-            json.dump(all_products, fp, ensure_ascii=False, indent=2)
+        if output is None:
+            output = write_snapshot("mercado_livre", all_products, raw_dir=DATA_DIR)
+        else:
+            write_records(output, all_products)
             
         print(f"\n✅ Results saved to {output}")
     except Exception as e:
@@ -250,6 +333,9 @@ def main():
     parser.add_argument("--max-keywords", type=int, default=10)
     parser.add_argument("--products-per-keyword", type=int, default=6)
     parser.add_argument("--output", type=Path)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rps", type=float, default=DEFAULT_REQUESTS_PER_SECOND, help="Max requests/second per host")
+    parser.add_argument("--depth", type=int, default=0, help="Deep search: max products per keyword across pages")
     args = parser.parse_args()
 
     # Ensure DB is ready
@@ -261,7 +347,10 @@ def main():
     fetch_products(
         max_keywords=args.max_keywords,
         products_per_keyword=args.products_per_keyword,
-        output=args.output
+        output=args.output,
+        concurrency=args.concurrency,
+        requests_per_second=args.rps,
+        depth=args.depth
     )
 
 
@@ -1,17 +1,32 @@
 """Metrics Service for Market Radar V2."""
 from __future__ import annotations
 
+import heapq
 import math
+import statistics
 from datetime import datetime, timedelta
-from typing import List, Dict, Tuple
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
 
-from src.database import get_term_history
+from src.database import get_term_history, get_term_histories
+from src.services import archive_service
+
+VELOCITY_WINDOW = 7
 
 
 def calculate_search_velocity(term: str) -> Dict[str, float]:
     """Calculate velocity index (0-1) based on history."""
-    history = get_term_history(term, limit=7)
-    
+    return velocity_from_history(get_term_history(term, limit=VELOCITY_WINDOW))
+
+
+def calculate_search_velocities(terms: List[str]) -> Dict[str, Dict[str, float]]:
+    """Batch ``calculate_search_velocity``: one history query for the whole run."""
+    histories = get_term_histories(terms, limit=VELOCITY_WINDOW)
+    return {term: velocity_from_history(histories.get(term, [])) for term in dict.fromkeys(terms)}
+
+
+def velocity_from_history(history: List[Dict]) -> Dict[str, float]:
+    """Velocity / acceleration / direction from a term's snapshots (any order)."""
     if not history or len(history) < 2:
         return {
             "velocity_index": 0.5,
@@ -19,7 +34,7 @@ def calculate_search_velocity(term: str) -> Dict[str, float]:
             "trend_direction": "stable"
         }
 
-    history.sort(key=lambda x: x['captured_at'])
+    history = sorted(history, key=lambda x: x['captured_at'])
     current = history[-1]['metric_value']
     previous = history[-2]['metric_value']
     
@@ -62,6 +77,43 @@ def analyze_market_concentration(scraped_items: List[Dict]) -> float:
     return top_3 / len(scraped_items)
 
 
+class RunningMarketStats:
+    """Incremental concentration / price compression for streamed samples.
+    Matches analyze_market_concentration and analyze_price_compression on the same items,
+    but keeps O(sellers) state instead of the whole item list."""
+
+    def __init__(self):
+        self.count = 0
+        self.sellers: Dict[str, int] = {}
+        self.price_count = 0
+        self.min_price = 0.0
+        self.max_price = 0.0
+
+    def add(self, item: Dict):
+        self.count += 1
+        s = item.get('seller_name') or item.get('brand') or "Unknown"
+        self.sellers[s] = self.sellers.get(s, 0) + 1
+
+        price = item.get('price', 0)
+        if price > 0:
+            if not self.price_count:
+                self.min_price = self.max_price = price
+            self.min_price = min(self.min_price, price)
+            self.max_price = max(self.max_price, price)
+            self.price_count += 1
+
+    @property
+    def concentration(self) -> float:
+        if not self.count: return 0.0
+        return sum(heapq.nlargest(3, self.sellers.values())) / self.count
+
+    @property
+    def compression(self) -> float:
+        if self.price_count < 2 or self.max_price == 0: return 0.0
+        spread = (self.max_price - self.min_price) / self.max_price
+        return max(0.0, min(1.0, 1.0 - spread))
+
+
 def analyze_price_compression(scraped_items: List[Dict]) -> float:
     """Calculate price compression (0-1). 1.0 = Race to bottom."""
     prices = [i.get('price', 0) for i in scraped_items if i.get('price', 0) > 0]
@@ -86,3 +138,44 @@ def analyze_quality_opportunity(scraped_items: List[Dict]) -> float:
     if avg_rating < 4.0: opp_index *= 1.5
     
     return max(0.0, min(1.0, opp_index))
+
+
+def market_history(
+    keyword: Optional[str] = None,
+    sources: Optional[List[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    archive_dir: Optional[Path] = None,
+) -> List[Dict]:
+    """Price / seller concentration / rating per (date, source) from the scrape archive,
+    optionally for a single search keyword. Only the columns used here are read."""
+    where = None
+    if keyword:
+        wanted = keyword.lower().strip()
+        where = lambda row: (row["search_keyword"] or "").lower().strip() == wanted
+
+    cols = archive_service.scan(
+        ["date", "source", "search_keyword", "price", "seller_name", "rating"],
+        sources=sources, start=start, end=end, where=where,
+        archive_dir=archive_dir or archive_service.ARCHIVE_DIR,
+    )
+
+    groups: Dict[Tuple[str, str], Dict] = {}
+    for date, source, price, seller, rating in zip(cols["date"], cols["source"], cols["price"], cols["seller_name"], cols["rating"]):
+        group = groups.setdefault((date, source), {"stats": RunningMarketStats(), "prices": [], "ratings": []})
+        group["stats"].add({"seller_name": seller, "price": price or 0})
+        if price and price > 0: group["prices"].append(price)
+        if rating and rating > 0: group["ratings"].append(rating)
+
+    return [
+        {
+            "date": date,
+            "source": source,
+            "items": g["stats"].count,
+            "median_price": statistics.median(g["prices"]) if g["prices"] else None,
+            "concentration": g["stats"].concentration,
+            "price_compression": g["stats"].compression,
+            "avg_rating": sum(g["ratings"]) / len(g["ratings"]) if g["ratings"] else None,
+        }
+        for (date, source), g in sorted(groups.items())
+    ]
@@ -1,19 +1,33 @@
 """Market Radar Pipeline V2 Orchestrator."""
+import argparse
+import copy
+import hashlib
+import itertools
 import json
 import sys
 from pathlib import Path
 from datetime import datetime, timezone
 
 # Services
-from src.database import init_db, save_opportunity, get_cluster_id_by_name, add_term_history_snapshot
-from src.services.scoring.scoring_service import calculate_indice_intencao_v2
+from src.database import (
+    init_db, save_opportunities_bulk, get_cluster_ids_by_names, add_term_history_snapshots, get_config, set_config
+)
+from src.services.scoring.scoring_service import calculate_indice_intencao_v2, calculate_indice_intencao_v2_batch
+from src.services.metrics.metrics_service import calculate_search_velocities
 from src.utils.keyword_utils import load_keywords
+from src.utils.jsonl import RecordFile, read_records
+from src.utils.product_record import ProductRecord
+from src.utils.raw_manifest import get_manifest
 
 DATA_DIR = Path(__file__).resolve().parents[2] / "data"
 RAW_DIR = DATA_DIR / "raw"
 REPORT_DIR = DATA_DIR / "reports"
 REPORT_DIR.mkdir(parents=True, exist_ok=True)
 
+# Incremental runs: stage input hashes and per-term scores live in system_configs
+FINGERPRINTS_KEY = "pipeline_v2.fingerprints"
+SCORE_CACHE_KEY = "pipeline_v2.score_cache"
+
 
 def load_json(path: Path):
     if not path or not path.exists():
@@ -23,94 +37,151 @@ def load_json(path: Path):
 
 
 def get_latest_file(prefix: str) -> Path | None:
-    candidates = sorted(RAW_DIR.glob(f"{prefix}-*.json"), key=lambda p: p.stat().st_mtime)
-    return candidates[-1] if candidates else None
+    return get_manifest(RAW_DIR).latest(prefix)
+
+
+def load_artifact(path: Path | None):
+    """Scraped records of ``path``, streamed on every pass ([] if there is no file)."""
+    return RecordFile(path) if path and path.exists() else []
+
+
+def fingerprint(obj) -> str:
+    """Content hash of JSON-like data (key order independent)."""
+    encode = lambda o: o.to_dict() if isinstance(o, ProductRecord) else str(o)
+    raw = json.dumps(obj, sort_keys=True, ensure_ascii=False, default=encode)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def input_id(data) -> str:
+    """Fingerprint of a stage input: file hash for streamed artifacts, content hash otherwise."""
+    return data.sha256() if isinstance(data, RecordFile) else fingerprint(data)
+
+
+def load_state(key: str) -> dict:
+    try:
+        return json.loads(get_config(key) or "{}")
+    except ValueError:
+        return {}
 
 
 def step_1_snapshot_velocity(clusters: list):
     """Snapshot search velocity."""
     print("📸 Snapshotting Search Term History (V2)...")
-    for cluster in clusters:
-        for product in cluster.get("validated_products", []):
-            try:
-                # Add snapshot (metric_value=1.0 as occurrence proxy)
-                add_term_history_snapshot(str(product), 1.0, source="pipeline_v2", metric_type="occurrence")
-            except Exception as e:
-                print(f"[warn] Snapshot failed for {product}: {e}")
+    # Occurrence proxy (metric_value=1.0), one row per validated product, one transaction
+    snapshots = [(str(product), 1.0) for cluster in clusters for product in cluster.get("validated_products", [])]
+    add_term_history_snapshots(snapshots, source="pipeline_v2", metric_type="occurrence")
 
-def step_2_process_ranking(clusters, ml_data, amazon_data, max_items=50):
+def step_2_process_ranking(clusters, ml_data, amazon_data, max_items=50, score_cache=None):
+    """Score every cluster product. With ``score_cache`` ({evidence fingerprint: result}),
+    only terms whose evidence (scraped items, velocity, AI confidence) changed are rescored;
+    the cache is updated in place and pruned to this run's terms."""
     print("🏆 Calculating V2 Scores (Predictive Gap Analysis)...")
     
     opportunities = []
+    # Only items of cluster terms are kept, so scraped inputs can be streamed from disk
+    terms = {str(p).strip().lower() for c in clusters for p in c.get("validated_products", [])}
     scraped_map = {}
     
     # Simple indexing
     def index_data(data_list):
         if not data_list: return
-        items = data_list if isinstance(data_list, list) else data_list.get("items", [])
+        items = data_list.get("items", []) if isinstance(data_list, dict) else data_list
         for item in items:
             kw = (item.get("search_keyword") or item.get("keyword") or "").lower().strip()
-            if kw: scraped_map.setdefault(kw, []).append(item)
+            if kw in terms: scraped_map.setdefault(kw, []).append(item)
 
     index_data(ml_data)
     index_data(amazon_data)
 
+    # Gather every term first so velocity and scoring run once for the whole set
+    entries = []
     for cluster in clusters:
-        cluster_name = cluster.get("cluster_name")
         ai_connf = cluster.get("confidence_score", 50) / 100.0
-        
         for product in cluster.get("validated_products", []):
             term = str(product).strip()
-            term_lower = term.lower()
-            
-            validation_items = scraped_map.get(term_lower, [])
-            source_count = 1 + (1 if validation_items else 0)
-            
-            # SCORE V2
+            validation_items = scraped_map.get(term.lower(), [])
+            entries.append((cluster, {
+                "term": term,
+                "ai_confidence": ai_connf,
+                "source_count": 1 + (1 if validation_items else 0),
+                "scraped_data": validation_items
+            }))
+
+    # Velocity for every term of the run in one windowed query
+    velocities = calculate_search_velocities([e["term"] for _, e in entries])
+    for _, entry in entries:
+        entry["velocity_meta"] = velocities.get(entry["term"])
+
+    # Reuse scores whose evidence is unchanged since the last run
+    cache = score_cache if score_cache is not None else {}
+    fps = [fingerprint(e) for _, e in entries]
+    todo = [i for i, fp in enumerate(fps) if fp not in cache]
+    if score_cache is not None:
+        print(f"   ♻️  {len(entries) - len(todo)} scores reused, {len(todo)} terms rescored")
+
+    # SCORE V2 (vectorized; per-term fallback isolates bad rows)
+    try:
+        fresh = calculate_indice_intencao_v2_batch([entries[i][1] for i in todo])
+    except Exception as e:
+        print(f"[warn] Batch scoring failed ({e}), scoring term by term")
+        fresh = []
+        for i in todo:
+            entry = entries[i][1]
             try:
-                score_result = calculate_indice_intencao_v2(
-                    term=term,
-                    ai_confidence=ai_connf,
-                    source_count=source_count,
-                    scraped_data=validation_items
-                )
+                fresh.append(calculate_indice_intencao_v2(**entry))
             except Exception as e:
-                print(f"[err] Scoring failed for {term}: {e}")
-                continue
-            
-            # META
-            meta = {
-                "cluster": cluster_name,
-                "buying_intent": cluster.get("buying_intent"),
-                "why_trending": cluster.get("why_trending"),
-                "risk_factors": cluster.get("risk_factors"),
-                "price_estimate": cluster.get("price_range_brl"),
-                "velocity_meta": score_result["breakdown"].pop("meta_velocity", {})
+                print(f"[err] Scoring failed for {entry['term']}: {e}")
+                fresh.append(None)
+    for i, result in zip(todo, fresh):
+        if result is not None:
+            cache[fps[i]] = result
+
+    # Copies: the loop below mutates the breakdown
+    scores = [copy.deepcopy(cache.get(fp)) for fp in fps]
+    if score_cache is not None:
+        for stale in set(score_cache) - set(fps):
+            del score_cache[stale]
+
+    for (cluster, entry), score_result in zip(entries, scores):
+        if score_result is None:
+            continue
+        cluster_name = cluster.get("cluster_name")
+        validation_items = entry["scraped_data"]
+        term = entry["term"]
+
+        # META
+        meta = {
+            "cluster": cluster_name,
+            "buying_intent": cluster.get("buying_intent"),
+            "why_trending": cluster.get("why_trending"),
+            "risk_factors": cluster.get("risk_factors"),
+            "price_estimate": cluster.get("price_range_brl"),
+            "velocity_meta": score_result["breakdown"].pop("meta_velocity", {})
+        }
+        
+        if validation_items:
+            top = validation_items[0]
+            meta["thumbnail"] = top.get("thumbnail")
+            meta["url"] = top.get("permalink")
+            meta["price"] = f"R$ {top.get('price', 0)}"
+            meta["marketplace"] = top.get("source", "unknown")
+
+        opportunities.append({
+            "keyword": term,
+            "cluster_id": None, # Resolve later
+            "score": score_result["score"],
+            "signals": {
+                "v2_score": score_result["score"],
+                "v2_breakdown": score_result["breakdown"],
+                "signal_diversity_count": score_result["breakdown"]["IndiceSinalMultiplasFontes"] * 10 # Proxy
+            },
+            "meta": meta,
+            "scoring_breakdown": score_result["breakdown"], # JSON for DB
+            "analysis": {
+                "why": cluster.get("why_trending"),
+                "risk": cluster.get("risk_factors")
             }
-            
-            if validation_items:
-                top = validation_items[0]
-                meta["thumbnail"] = top.get("thumbnail")
-                meta["url"] = top.get("permalink")
-                meta["price"] = f"R$ {top.get('price', 0)}"
-                meta["marketplace"] = top.get("source", "unknown")
-
-            opportunities.append({
-                "keyword": term,
-                "cluster_id": None, # Resolve later
-                "score": score_result["score"],
-                "signals": {
-                    "v2_score": score_result["score"],
-                    "v2_breakdown": score_result["breakdown"],
-                    "signal_diversity_count": score_result["breakdown"]["IndiceSinalMultiplasFontes"] * 10 # Proxy
-                },
-                "meta": meta,
-                "scoring_breakdown": score_result["breakdown"], # JSON for DB
-                "analysis": {
-                    "why": cluster.get("why_trending"),
-                    "risk": cluster.get("risk_factors")
-                }
-            })
+        })
 
     opportunities.sort(key=lambda x: x["score"], reverse=True)
     return opportunities[:max_items]
@@ -135,52 +206,55 @@ def step_3_persistence(opportunities):
     with latest_path.open("w", encoding="utf-8") as f:
         json.dump(payload, f, indent=2, ensure_ascii=False)
         
-    # DB Sync
+    # DB Sync (1 lookup for all clusters + 1 transaction for all opportunities)
     init_db()
-    for opp in opportunities:
-        c_name = opp["meta"].get("cluster")
-        cid = get_cluster_id_by_name(c_name) if c_name else None
-        save_opportunity(opp, cid)
+    cluster_ids = get_cluster_ids_by_names([opp["meta"].get("cluster") for opp in opportunities])
+    id_map = save_opportunities_bulk([(opp, cluster_ids.get(opp["meta"].get("cluster"))) for opp in opportunities])
         
-    print(f"✅ Saved to {report_path}")
+    print(f"✅ Saved to {report_path} ({len(id_map)} rows synced to DB)")
+    return id_map
+
 
+def main(ml_data=None, amz_data=None, clusters=None, force=False):
+    """Run snapshot -> scoring -> persistence. Inputs not passed in memory (e.g. by
+    run_pipeline.py) are loaded from the latest files in data/raw. Returns the opportunities.
 
-def main():
+    Runs are incremental: stages whose input fingerprints match the previous run are skipped
+    and unchanged terms reuse their cached score. ``force`` recomputes everything."""
     print("🚀 Market Radar Pipeline V2 - Scoring Engine\n")
     
     # Load inputs (Latest from RAW)
-    clusters_path = get_latest_file("intent_clusters")
-    ml_path = get_latest_file("mercado_livre")
-    amz_path = get_latest_file("amazon")
+    if clusters is None:
+        clusters_path = get_latest_file("intent_clusters")
+        if not clusters_path:
+            # Fallback to hardcoded name if timestamped not found
+            clusters_path = RAW_DIR / "intent_clusters_latest.json"
+        clusters = read_records(clusters_path)
     
-    if not clusters_path:
-        # Fallback to hardcoded name if timestamped not found
-        clusters_path = RAW_DIR / "intent_clusters_latest.json"
-    
-    # Load scraped data FIRST to enable fallback
-    ml_data = load_json(ml_path)
-    amz_data = load_json(amz_path)
-    
-    clusters = load_json(clusters_path)
+    # Load scraped data FIRST to enable fallback (streamed, never loaded whole)
+    if ml_data is None:
+        ml_data = load_artifact(get_latest_file("mercado_livre"))
+    if amz_data is None:
+        amz_data = load_artifact(get_latest_file("amazon"))
     
     if not clusters:
         print("⚠️  No AI clusters found taking control: creating Virtual Clusters from raw data...")
         # Create virtual clusters (Direct Mode)
         grouped = {}
         # Iterate over scraped items to find keywords
-        source_items = (ml_data or []) + (amz_data or [])
+        source_items = itertools.chain(ml_data or [], amz_data or [])
         for item in source_items:
             kw = item.get("search_keyword") or "Trend"
             title = item.get("title", "")
             if kw not in grouped: grouped[kw] = []
-            grouped[kw].append(title)
+            if len(grouped[kw]) < 4: grouped[kw].append(title)
             
         clusters = []
         for kw, titles in grouped.items():
             clusters.append({
                 "cluster_name": kw.title(),
                 "buying_intent": "High (Direct Trend)",
-                "validated_products": list(set(titles[:4])), 
+                "validated_products": list(dict.fromkeys(titles[:4])), 
                 "price_range_brl": {"min": 0, "max": 0},
                 "why_trending": "Direct Market Signal",
                 "risk_factors": "Verified Demand",
@@ -189,14 +263,42 @@ def main():
             
     if not clusters:
         print("❌ No data to process.")
-        return
+        return []
+    
+    previous = {} if force else load_state(FINGERPRINTS_KEY)
+    current = {
+        "snapshot": fingerprint(sorted(str(p) for c in clusters for p in c.get("validated_products", []))),
+        "ranking": fingerprint([clusters, input_id(ml_data), input_id(amz_data)]),
+    }
+    
+    latest = load_json(REPORT_DIR / "ranking_latest.json")
+    unchanged = all(previous.get(stage) == fp for stage, fp in current.items())
+    if unchanged and isinstance(latest, dict) and "opportunities" in latest:
+        print("♻️  Inputs unchanged since last run: reusing ranking_latest.json")
+        return latest["opportunities"]
+    
+    if current["snapshot"] == previous.get("snapshot"):
+        print("⏭️  Cluster products unchanged: history snapshot skipped")
+    else:
+        step_1_snapshot_velocity(clusters)
+    
+    score_cache = {} if force else load_state(SCORE_CACHE_KEY)
+    opps = step_2_process_ranking(clusters, ml_data, amz_data, score_cache=score_cache)
+    
+    current["persistence"] = fingerprint(opps)
+    if current["persistence"] == previous.get("persistence"):
+        print("⏭️  Ranking unchanged: report/DB sync skipped")
+    else:
+        step_3_persistence(opps)
     
-    step_1_snapshot_velocity(clusters)
-    opps = step_2_process_ranking(clusters, ml_data, amz_data)
-    step_3_persistence(opps)
+    set_config(SCORE_CACHE_KEY, json.dumps(score_cache, ensure_ascii=False))
+    set_config(FINGERPRINTS_KEY, json.dumps(current))
     
     print("\n✅ V2 Execution Complete.")
+    return opps
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Market Radar Pipeline V2 (scoring engine)")
+    parser.add_argument("--force", action="store_true", help="Ignore fingerprints and recompute every stage")
+    main(force=parser.parse_args().force)
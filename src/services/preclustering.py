@@ -0,0 +1,186 @@
+"""Local (CPU-only) pre-clustering of intent signals.
+
+Signals are normalized (lowercase, accents folded, Portuguese stopwords dropped),
+vectorized as character 3-gram TF-IDF and grouped around "leader" signals by
+cosine similarity. Only one representative per bucket has to go to the LLM, and
+the buckets themselves double as clusters when no API key is configured.
+Similarities are a blocked matrix product with numpy, an inverted index without.
+"""
+from __future__ import annotations
+
+import math
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:  # Optional dependency
+    np = None
+    HAS_NUMPY = False
+
+# Cosine similarity (char 3-gram TF-IDF) for a signal to join a leader's bucket
+DEFAULT_THRESHOLD = 0.5
+NGRAM = 3
+# N-grams present in more than this share of the signals carry no grouping information
+MAX_DF = 0.5
+# Largest signals x n-grams matrix built for numpy (~100 MB of float64)
+DENSE_LIMIT = 12_500_000
+
+STOPWORDS = frozenset("""
+a ao aos as com como da das de do dos e em entre na nas no nos o os ou para pela pelas pelo pelos
+por pra qual que se sem sob sobre um uma umas uns melhor melhores mais barato barata comprar
+""".split())
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class Bucket:
+    representative: str
+    members: List[str] = field(default_factory=list)
+
+
+def fold_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Lowercase, accent-free tokens without stopwords ("Fone p/ Corrida" -> ["fone", "p", "corrida"])."""
+    return [t for t in _TOKEN.findall(fold_accents(str(text).lower())) if t not in STOPWORDS]
+
+
+def char_ngrams(tokens: List[str], n: int = NGRAM) -> Counter:
+    """Character n-grams inside word boundaries (" fone " -> " fo", "fon", "one", "ne ")."""
+    grams = Counter()
+    for token in tokens:
+        padded = f" {token} "
+        for i in range(max(1, len(padded) - n + 1)):
+            grams[padded[i:i + n]] += 1
+    return grams
+
+
+def tfidf_vectors(docs: List[Counter]) -> List[Dict[str, float]]:
+    """L2-normalized sparse TF-IDF vectors (smoothed idf)."""
+    df = Counter(gram for doc in docs for gram in doc)
+    total = len(docs)
+    vectors = []
+    for doc in docs:
+        vec = {g: tf * (math.log((1 + total) / (1 + df[g])) + 1) for g, tf in doc.items()}
+        norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+        vectors.append({g: w / norm for g, w in vec.items()})
+    return vectors
+
+
+def _informative(vectors: List[Dict[str, float]]) -> Dict[str, int]:
+    """N-gram -> column for the n-grams in at most ``MAX_DF`` of the signals."""
+    df = Counter(g for vec in vectors for g in vec)
+    max_df = max(2, int(MAX_DF * len(vectors)))
+    return {g: col for col, g in enumerate(sorted(g for g, n in df.items() if n <= max_df))}
+
+
+def _neighbours(vectors: List[Dict[str, float]], threshold: float) -> List[Dict[int, float]]:
+    """Pairs with cosine >= ``threshold``. Very common n-grams are skipped (see MAX_DF),
+    so near-threshold pairs sharing only those may be missed. Similarities are rounded
+    so both code paths (different summation order) give the same buckets."""
+    vocab = _informative(vectors)
+    neighbours: List[Dict[int, float]] = [dict() for _ in vectors]
+    if HAS_NUMPY and len(vectors) * len(vocab) <= DENSE_LIMIT:
+        matrix = np.zeros((len(vectors), len(vocab)))
+        for i, vec in enumerate(vectors):
+            for gram, weight in vec.items():
+                if gram in vocab:
+                    matrix[i, vocab[gram]] = weight
+        for start in range(0, len(vectors), 1024):  # blocks keep memory at 1024 x N
+            sims = np.round(matrix[start:start + 1024] @ matrix.T, 9)
+            for i, j in zip(*np.nonzero(sims >= threshold)):
+                i = int(i) + start
+                if i != j:
+                    neighbours[i][int(j)] = float(sims[i - start, j])
+        return neighbours
+
+    postings: Dict[str, List[tuple]] = {}
+    for i, vec in enumerate(vectors):
+        for gram, weight in vec.items():
+            if gram in vocab:
+                postings.setdefault(gram, []).append((i, weight))
+    dots: List[Dict[int, float]] = [dict() for _ in vectors]
+    for entries in postings.values():
+        for a in range(len(entries)):
+            i, wi = entries[a]
+            for j, wj in entries[a + 1:]:
+                dots[i][j] = dots[i].get(j, 0.0) + wi * wj
+    for i, row in enumerate(dots):
+        for j, sim in row.items():
+            sim = round(sim, 9)
+            if sim >= threshold:
+                neighbours[i][j] = neighbours[j][i] = sim
+    return neighbours
+
+
+def bucket_signals(signals: Iterable[str], threshold: float = DEFAULT_THRESHOLD) -> List[Bucket]:
+    """Group signals into buckets of near-duplicates, largest first.
+
+    Signals with the same normalized tokens collapse right away. The signal with the
+    most neighbours leads a bucket and takes every unassigned neighbour (no chaining
+    through members), then the next unassigned one leads, and so on."""
+    variants: Dict[str, List[str]] = {}
+    for signal in signals:
+        key = " ".join(normalize_tokens(signal))
+        if key:
+            variants.setdefault(key, []).append(str(signal).strip())
+    keys = sorted(variants)
+    if not keys:
+        return []
+
+    neighbours = _neighbours(tfidf_vectors([char_ngrams(k.split()) for k in keys]), threshold)
+    order = sorted(range(len(keys)), key=lambda i: (-len(neighbours[i]), keys[i]))
+
+    assigned = set()
+    buckets = []
+    for leader in order:
+        if leader in assigned:
+            continue
+        members = [leader] + sorted((j for j in neighbours[leader] if j not in assigned),
+                                    key=lambda j: (-neighbours[leader][j], keys[j]))
+        assigned.update(members)
+        buckets.append(Bucket(variants[keys[leader]][0], [v for m in members for v in variants[keys[m]]]))
+
+    buckets.sort(key=lambda b: (-len(b.members), b.representative.lower()))
+    return buckets
+
+
+def expand_representatives(clusters: List[Dict[str, Any]], buckets: List[Bucket]) -> List[Dict[str, Any]]:
+    """After clustering representatives only, credit each cluster with its buckets' members."""
+    by_rep = {b.representative.lower(): b for b in buckets}
+    for cluster in clusters:
+        used = []
+        for signal in cluster.get("source_signals_used") or []:
+            bucket = by_rep.get(str(signal).lower())
+            used.extend(bucket.members if bucket else [signal])
+        cluster["source_signals_used"] = list(dict.fromkeys(used))
+    return clusters
+
+
+def offline_clusters(buckets: List[Bucket], min_size: int = 2, max_clusters: int = 20) -> List[Dict[str, Any]]:
+    """Buckets as intent clusters (no LLM): same shape as the AI output, modest confidence."""
+    clusters = []
+    for bucket in buckets:
+        if len(bucket.members) < min_size or len(clusters) >= max_clusters:
+            continue
+        clusters.append({
+            "cluster_name": bucket.representative,
+            "buying_intent": None,
+            "validated_products": bucket.members[:10],
+            "price_range_brl": {"min": None, "max": None},
+            "negative_keywords": [],
+            "why_trending": f"{len(bucket.members)} sinais parecidos (pré-clusterização local, sem IA)",
+            "source_signals_used": bucket.members,
+            "competition_level": "Unknown",
+            "risk_factors": "Não validado por IA",
+            "confidence_score": min(70, 30 + 5 * len(bucket.members)),
+        })
+    return clusters
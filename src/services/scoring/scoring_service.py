@@ -6,22 +6,27 @@ from typing import Dict, Any, List
 # Metric Service
 from src.services.metrics.metrics_service import (
     calculate_search_velocity,
+    calculate_search_velocities,
     analyze_market_concentration,
     analyze_price_compression,
     analyze_quality_opportunity
 )
+from src.services.scoring import vectorized_scoring
 
 
 def calculate_indice_intencao_v2(
     term: str,
     ai_confidence: float = 0.5,
     source_count: int = 1,
-    scraped_data: List[Dict] = None
+    scraped_data: List[Dict] = None,
+    velocity_meta: Dict[str, Any] = None
 ) -> Dict[str, Any]:
-    """Calculate the Market Intent Score V2.0 (Predictive Gap)."""
+    """Calculate the Market Intent Score V2.0 (Predictive Gap).
+    Pass ``velocity_meta`` (from calculate_search_velocities) to skip the per-term history query."""
     
     # 1. Search Velocity (25%)
-    velocity_meta = calculate_search_velocity(term)
+    if velocity_meta is None:
+        velocity_meta = calculate_search_velocity(term)
     idx_velocidade = min(1.0, max(0.0, velocity_meta.get("velocity_index", 0.5)))
     
     # 2. Supply Gap (25%) - Inverse of Concentration
@@ -68,3 +73,50 @@ def calculate_indice_intencao_v2(
             "meta_velocity": velocity_meta
         }
     }
+
+
+def calculate_indice_intencao_v2_batch(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Score many terms at once. Each entry takes the keyword arguments of
+    ``calculate_indice_intencao_v2``; results come back in the same order and are identical.
+    Uses the NumPy kernel when available, otherwise the per-term path."""
+    missing = [e["term"] for e in entries if e.get("velocity_meta") is None]
+    velocities = calculate_search_velocities(missing) if missing else {}
+    velocity_metas = [
+        e["velocity_meta"] if e.get("velocity_meta") is not None else velocities[e["term"]]
+        for e in entries
+    ]
+
+    if not vectorized_scoring.HAS_NUMPY:
+        return [
+            calculate_indice_intencao_v2(
+                term=e["term"],
+                ai_confidence=e.get("ai_confidence", 0.5),
+                source_count=e.get("source_count", 1),
+                scraped_data=e.get("scraped_data"),
+                velocity_meta=meta
+            )
+            for e, meta in zip(entries, velocity_metas)
+        ]
+
+    columns = vectorized_scoring.build_columns([e.get("scraped_data") or [] for e in entries])
+    indices = vectorized_scoring.score_columns(
+        columns,
+        len(entries),
+        velocity_index=[m.get("velocity_index", 0.5) for m in velocity_metas],
+        ai_confidence=[e.get("ai_confidence", 0.5) for e in entries],
+        source_count=[e.get("source_count", 1) for e in entries],
+    )
+    # Rounding stays in Python: np.round differs from round() on some halfway cases
+    raw_scores = indices.pop("raw_score").tolist()
+    columns_out = {name: values.tolist() for name, values in indices.items()}
+
+    results = []
+    for i, meta in enumerate(velocity_metas):
+        breakdown = {name: round(values[i], 2) for name, values in columns_out.items()}
+        breakdown["meta_velocity"] = meta
+        results.append({
+            "score": round(raw_scores[i] * 100, 1),
+            "version": "v2.0",
+            "breakdown": breakdown
+        })
+    return results
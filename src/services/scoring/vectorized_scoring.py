@@ -0,0 +1,135 @@
+"""Columnar NumPy kernel for the V2 intent index.
+
+Computes concentration, price compression, quality opportunity and the weighted sum for
+every term of a run at once. Each operation mirrors the per-term code in metrics_service /
+scoring_service (same float64 ops, same order) so scores match exactly. NumPy is optional:
+``HAS_NUMPY`` is False when it isn't installed and callers use the per-term path instead.
+"""
+from __future__ import annotations
+
+import numbers
+from typing import Dict, List, Sequence
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+
+def _number(item: Dict, field: str):
+    """``item[field]`` (0 when missing). Anything but a real number raises TypeError, as the
+    per-term ``> 0`` comparisons do, instead of being coerced (None -> nan, "15" -> 15.0)."""
+    value = item.get(field, 0)
+    if isinstance(value, bool) or not isinstance(value, numbers.Real):
+        raise TypeError(f"{field} must be a number, got {value!r}")
+    return value
+
+
+def build_columns(scraped_by_term: Sequence[List[Dict]]) -> Dict[str, "np.ndarray"]:
+    """Flatten per-term item lists into ``term_id``/``seller_id``/``price``/``rating`` arrays.
+    Sellers are keyed like analyze_market_concentration (seller_name, brand, "Unknown").
+    Non-numeric prices/ratings raise TypeError so callers fall back to the per-term path."""
+    term_ids, seller_ids, prices, ratings = [], [], [], []
+    sellers: Dict[str, int] = {}
+    for term_id, items in enumerate(scraped_by_term):
+        for item in items:
+            s = item.get('seller_name') or item.get('brand') or "Unknown"
+            term_ids.append(term_id)
+            seller_ids.append(sellers.setdefault(s, len(sellers)))
+            prices.append(_number(item, 'price'))
+            ratings.append(_number(item, 'rating'))
+    return {
+        "term_id": np.asarray(term_ids, dtype=np.int64),
+        "seller_id": np.asarray(seller_ids, dtype=np.int64),
+        "price": np.asarray(prices, dtype=np.float64),
+        "rating": np.asarray(ratings, dtype=np.float64),
+        "n_sellers": len(sellers),
+    }
+
+
+def concentration(term_id, seller_id, n_sellers: int, n_terms: int):
+    """Top-3 seller share per term (0 for terms without items)."""
+    counts = np.bincount(term_id, minlength=n_terms)
+    if not len(term_id):
+        return np.zeros(n_terms)
+
+    pairs, pair_counts = np.unique(term_id * max(n_sellers, 1) + seller_id, return_counts=True)
+    pair_term = pairs // max(n_sellers, 1)
+    # Per term, largest seller counts first; rank = position inside the term's group
+    order = np.lexsort((-pair_counts, pair_term))
+    pair_term, pair_counts = pair_term[order], pair_counts[order]
+    rank = np.arange(len(pair_term)) - np.searchsorted(pair_term, pair_term, side="left")
+    top = rank < 3
+    top3 = np.bincount(pair_term[top], weights=pair_counts[top], minlength=n_terms)
+
+    out = np.zeros(n_terms)
+    has_items = counts > 0
+    out[has_items] = top3[has_items] / counts[has_items]
+    return out
+
+
+def price_compression(term_id, price, n_terms: int):
+    """1 - (max - min) / max over positive prices; 0 for terms with fewer than 2 prices."""
+    valid = price > 0
+    t, p = term_id[valid], price[valid]
+    n_prices = np.bincount(t, minlength=n_terms)
+    min_p = np.full(n_terms, np.inf)
+    max_p = np.zeros(n_terms)
+    np.minimum.at(min_p, t, p)
+    np.maximum.at(max_p, t, p)
+
+    out = np.zeros(n_terms)
+    ok = (n_prices >= 2) & (max_p != 0)
+    spread = (max_p[ok] - min_p[ok]) / max_p[ok]
+    out[ok] = np.clip(1.0 - spread, 0.0, 1.0)
+    return out
+
+
+def quality_opportunity(term_id, rating, n_terms: int):
+    """(5 - avg rating) / 5, boosted 1.5x below 4 stars; 0.5 for terms without ratings."""
+    valid = rating > 0
+    t, r = term_id[valid], rating[valid]
+    n_ratings = np.bincount(t, minlength=n_terms)
+    # bincount accumulates in input order, like sum() over the term's list
+    total = np.bincount(t, weights=r, minlength=n_terms)
+
+    out = np.full(n_terms, 0.5)
+    ok = n_ratings > 0
+    avg = total[ok] / n_ratings[ok]
+    opp = (5.0 - avg) / 5.0
+    opp = np.where(avg < 4.0, opp * 1.5, opp)
+    out[ok] = np.clip(opp, 0.0, 1.0)
+    return out
+
+
+def score_columns(columns: Dict, n_terms: int, velocity_index, ai_confidence, source_count) -> Dict[str, "np.ndarray"]:
+    """All six indices plus ``raw_score`` for ``n_terms`` terms (arrays aligned by term id)."""
+    term_id = columns["term_id"]
+    has_items = np.bincount(term_id, minlength=n_terms) > 0
+
+    idx_velocidade = np.clip(np.asarray(velocity_index, dtype=np.float64), 0.0, 1.0)
+    idx_lacuna = np.where(has_items, 1.0 - concentration(term_id, columns["seller_id"], columns["n_sellers"], n_terms), 1.0)
+    idx_qualidade = quality_opportunity(term_id, columns["rating"], n_terms)
+    idx_viabilidade = 1.0 - price_compression(term_id, columns["price"], n_terms)
+    idx_ia = np.clip(np.asarray(ai_confidence, dtype=np.float64), 0.0, 1.0)
+    idx_fontes = np.clip(0.4 + (np.asarray(source_count, dtype=np.float64) - 1) * 0.3, 0.0, 1.0)
+
+    raw_score = (
+        (idx_velocidade * 0.25) +
+        (idx_lacuna * 0.25) +
+        (idx_qualidade * 0.15) +
+        (idx_viabilidade * 0.15) +
+        (idx_ia * 0.10) +
+        (idx_fontes * 0.10)
+    )
+    return {
+        "IndiceVelocidadeBusca": idx_velocidade,
+        "IndiceLacunaOferta": idx_lacuna,
+        "IndiceQualidadeConcorrencia": idx_qualidade,
+        "IndiceViabilidadePreco": idx_viabilidade,
+        "IndiceConfiancaIA": idx_ia,
+        "IndiceSinalMultiplasFontes": idx_fontes,
+        "raw_score": raw_score,
+    }
@@ -0,0 +1,156 @@
+"""Declarative stage graph and a thread-pool scheduler for the ingestion pipeline."""
+from __future__ import annotations
+
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Persisted timings of every run (one JSON object per line)
+RUNS_LOG = Path(__file__).resolve().parents[2] / "data" / "reports" / "pipeline_runs.jsonl"
+
+
+@dataclass
+class Stage:
+    """A unit of work. ``run(ctx)`` returns False (or raises) on failure.
+    ``inputs``/``outputs`` are artifact names; a stage starts once every stage
+    producing one of its inputs has finished. Inputs nobody produces are assumed
+    to exist already (e.g. files from a previous run)."""
+    name: str
+    run: Callable[[Dict[str, Any]], Any]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    optional: bool = False
+    description: str = ""
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str = "pending"  # ok | failed | skipped
+    started: float = 0.0  # seconds since the run started
+    finished: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return self.finished - self.started
+
+
+class StageGraph:
+    def __init__(self, stages: List[Stage]):
+        self.stages: Dict[str, Stage] = {}
+        producers: Dict[str, str] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage '{stage.name}'")
+            self.stages[stage.name] = stage
+            for output in stage.outputs:
+                if output in producers:
+                    raise ValueError(f"'{output}' is produced by both '{producers[output]}' and '{stage.name}'")
+                producers[output] = stage.name
+
+        self.deps: Dict[str, List[str]] = {
+            name: sorted({producers[i] for i in stage.inputs if i in producers} - {name})
+            for name, stage in self.stages.items()
+        }
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        """Declaration order, constrained by dependencies. Raises on cycles."""
+        order: List[str] = []
+        done = set()
+        while len(order) < len(self.stages):
+            ready = [n for n in self.stages if n not in done and all(d in done for d in self.deps[n])]
+            if not ready:
+                raise ValueError(f"Cycle between stages: {sorted(set(self.stages) - done)}")
+            order.extend(ready)
+            done.update(ready)
+        return order
+
+
+def run_graph(graph: StageGraph, ctx: Optional[Dict[str, Any]] = None, max_workers: int = 4) -> Dict[str, StageResult]:
+    """Run every stage as soon as its dependencies are done, up to ``max_workers`` at once.
+    Dependents of a failed (non-optional) stage are skipped; independent branches keep going."""
+    ctx = {} if ctx is None else ctx
+    results = {name: StageResult(name) for name in graph.stages}
+    t0 = time.perf_counter()
+
+    def execute(name: str):
+        result = results[name]
+        result.started = time.perf_counter() - t0
+        try:
+            ok = graph.stages[name].run(ctx)
+            result.status = "failed" if ok is False else "ok"
+        except Exception as e:
+            result.status, result.error = "failed", f"{type(e).__name__}: {e}"
+        result.finished = time.perf_counter() - t0
+
+    def blocked(name: str) -> bool:
+        return any(
+            results[d].status == "skipped" or (results[d].status == "failed" and not graph.stages[d].optional)
+            for d in graph.deps[name]
+        )
+
+    pending = list(graph.order)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        while pending or running:
+            for name in list(pending):
+                deps = graph.deps[name]
+                if blocked(name):
+                    pending.remove(name)
+                    results[name].status = "skipped"
+                    results[name].started = results[name].finished = time.perf_counter() - t0
+                elif all(results[d].status in ("ok", "failed") for d in deps):
+                    pending.remove(name)
+                    running[pool.submit(execute, name)] = name
+            if not running:
+                continue  # Only skips happened; re-scan the pending list
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                running.pop(future)
+                future.result()
+    return results
+
+
+def critical_path(graph: StageGraph, results: Dict[str, StageResult]) -> List[str]:
+    """Chain of stages that determined the total wall time (last to finish, then the
+    dependency that finished last before it, and so on)."""
+    ran = [r for r in results.values() if r.status != "skipped"]
+    if not ran:
+        return []
+    path = [max(ran, key=lambda r: r.finished).name]
+    while True:
+        deps = [results[d] for d in graph.deps[path[-1]] if results[d].status != "skipped"]
+        if not deps:
+            break
+        path.append(max(deps, key=lambda r: r.finished).name)
+    return path[::-1]
+
+
+def save_run_timings(graph: StageGraph, results: Dict[str, StageResult], path: Path = RUNS_LOG) -> Dict[str, Any]:
+    """Append this run's per-stage and critical-path timings to ``path``."""
+    chain = critical_path(graph, results)
+    record = {
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "wall_time": round(max((r.finished for r in results.values()), default=0.0), 3),
+        "critical_path": chain,
+        "critical_path_time": round(sum(results[n].duration for n in chain), 3),
+        "stages": {
+            name: {
+                "status": r.status,
+                "started": round(r.started, 3),
+                "duration": round(r.duration, 3),
+                "error": r.error,
+            }
+            for name, r in results.items()
+        },
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as fp:
+        fp.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return record
@@ -0,0 +1,123 @@
+"""Structured data embedded in marketplace pages, read straight from the raw bytes.
+
+Mercado Livre pages ship their listings twice: as markup and as JSON
+(``application/ld+json`` blocks and a ``__PRELOADED_STATE__``-style app state).
+These helpers pull the JSON out with a regex/scan over the response body, so
+scrapers can skip building a DOM whenever the page carries it.
+"""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Iterable, Iterator, List, Optional, Union
+
+Raw = Union[str, bytes]
+
+_JSON_LD = re.compile(
+    rb"<script\b[^>]*\btype\s*=\s*[\"']?application/ld\+json[\"']?[^>]*>(.*?)</script\s*>",
+    re.S | re.I,
+)
+# window.__PRELOADED_STATE__ = {...}  or  <script id="__PRELOADED_STATE__" type="application/json">{...}
+STATE_MARKERS = (b"__PRELOADED_STATE__", b"__NEXT_DATA__", b"__INITIAL_STATE__")
+_SCRIPT_END = re.compile(rb"</script\s*>", re.I)
+_DECODER = json.JSONDecoder()
+# Keys that mark a state object as a listing item (its "title" is a product title).
+# Generic ones like "url" are left out: nav links, banners and category tiles have them too
+_ITEM_KEYS = ("permalink", "price", "prices", "item_id", "product_id")
+
+
+def _bytes(raw: Raw) -> bytes:
+    return raw.encode("utf-8") if isinstance(raw, str) else raw
+
+
+def _loads(chunk: bytes) -> Any:
+    return json.loads(chunk.decode("utf-8", "replace"))
+
+
+def json_ld_blocks(raw: Raw) -> List[Any]:
+    """Parsed ``application/ld+json`` blocks (invalid ones skipped, arrays flattened)."""
+    blocks = []
+    for match in _JSON_LD.finditer(_bytes(raw)):
+        try:
+            data = _loads(match.group(1))
+        except ValueError:
+            continue
+        blocks.extend(data if isinstance(data, list) else [data])
+    return blocks
+
+
+def preloaded_state(raw: Raw) -> Optional[Any]:
+    """The first app-state JSON object found after one of ``STATE_MARKERS``."""
+    raw = _bytes(raw)
+    for marker in STATE_MARKERS:
+        pos = raw.find(marker)
+        while pos != -1:
+            start = raw.find(b"{", pos, pos + 256)
+            if start != -1:
+                end = _SCRIPT_END.search(raw, start)
+                chunk = raw[start:end.start() if end else len(raw)].decode("utf-8", "replace")
+                try:
+                    return _DECODER.raw_decode(chunk)[0]
+                except ValueError:
+                    pass
+            pos = raw.find(marker, pos + len(marker))
+    return None
+
+
+def json_ld_titles(blocks: Iterable[Any]) -> List[str]:
+    """Product names from schema.org ``ItemList`` / ``Product`` blocks."""
+    titles = []
+    for data in blocks:
+        if not isinstance(data, dict):
+            continue
+        if data.get("@type") == "ItemList":
+            for item in data.get("itemListElement", []):
+                if isinstance(item, dict):
+                    inner = item.get("item")
+                    name = item.get("name") or (inner.get("name") if isinstance(inner, dict) else None)
+                    if name:
+                        titles.append(name)
+        if data.get("@type") == "Product" and data.get("name"):
+            titles.append(data["name"])
+    return titles
+
+
+def _walk(data: Any) -> Iterator[dict]:
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            yield node
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+
+def state_titles(state: Any) -> List[str]:
+    """Listing titles in an app state: objects with a ``title`` next to a price/permalink,
+    and polycard title components (``{"type": "title", "title": {"text": ...}}``)."""
+    titles = []
+    for node in _walk(state):
+        title = node.get("title")
+        if isinstance(title, str) and any(k in node for k in _ITEM_KEYS):
+            titles.append(title)
+        elif node.get("type") == "title" and isinstance(title, dict) and isinstance(title.get("text"), str):
+            titles.append(title["text"])
+    return titles
+
+
+def embedded_titles(raw: Raw) -> List[str]:
+    """Product titles from a page's JSON-LD and app state, in page order, deduplicated.
+    An empty list means the page has no usable embedded data (parse the DOM instead)."""
+    titles = json_ld_titles(json_ld_blocks(raw))
+    state = preloaded_state(raw)
+    if state is not None:
+        titles += state_titles(state)
+    seen = set()
+    out = []
+    for title in titles:
+        title = title.strip()
+        if title and title not in seen:
+            seen.add(title)
+            out.append(title)
+    return out
@@ -0,0 +1,180 @@
+"""Pluggable HTML parsing for the scrapers.
+
+``parse_html`` returns a backend-neutral ``Node`` exposing the small part of the
+BeautifulSoup API the collectors use (``select``/``select_one``/``text``/``get``).
+Backends, fastest first:
+
+- ``selectolax``: lexbor (C), parses a full page faster than bs4 can skip it;
+- ``lxml``: BeautifulSoup on the lxml tokenizer;
+- ``html.parser``: pure-Python BeautifulSoup (always available).
+
+The bs4 backends only build the subtrees matched by ``only`` (simple selectors
+such as ``div.card`` or ``script[type="application/ld+json"]``), SoupStrainer-style.
+Force a backend with ``HTML_PARSER=<name>``.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    HAS_SELECTOLAX = True
+except ImportError:  # Optional dependency
+    LexborHTMLParser = None
+    HAS_SELECTOLAX = False
+
+try:
+    import lxml  # noqa: F401 (bs4 looks it up by name)
+    HAS_LXML = True
+except ImportError:  # Optional dependency
+    HAS_LXML = False
+
+BACKENDS = [name for name, ok in (("selectolax", HAS_SELECTOLAX), ("lxml", HAS_LXML), ("html.parser", True)) if ok]
+JSON_LD = 'script[type="application/ld+json"]'
+
+_SIMPLE_SELECTOR = re.compile(
+    r"^(?P<tag>[\w-]+)?(?P<classes>(?:\.[\w-]+)*)"
+    r"(?:\[(?P<attr>[\w-]+)(?:=[\"']?(?P<value>[^\"'\]]*)[\"']?)?\])?$"
+)
+
+
+def default_backend() -> str:
+    wanted = os.getenv("HTML_PARSER")
+    return wanted if wanted in BACKENDS else BACKENDS[0]
+
+
+class Node:
+    """One element (or the document). Subclasses wrap a backend's element type."""
+    __slots__ = ("_el",)
+
+    def __init__(self, el):
+        self._el = el
+
+    def __bool__(self):
+        return True
+
+    def select(self, css: str) -> List["Node"]:
+        raise NotImplementedError
+
+    def select_one(self, css: str) -> Optional["Node"]:
+        raise NotImplementedError
+
+    def text(self, strip: bool = True) -> str:
+        raise NotImplementedError
+
+    def get(self, attr: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def strings(self) -> Iterator[str]:
+        """Every text node below this element, in document order."""
+        raise NotImplementedError
+
+    def first(self, *selectors: str) -> Optional["Node"]:
+        """``select_one`` of the first selector that matches."""
+        for css in selectors:
+            node = self.select_one(css)
+            if node is not None:
+                return node
+        return None
+
+    def json_ld(self) -> List[Any]:
+        """Parsed ``application/ld+json`` blocks (invalid ones skipped, arrays flattened)."""
+        blocks = []
+        for script in self.select(JSON_LD):
+            try:
+                data = json.loads(script.text(strip=False))
+            except ValueError:
+                continue
+            blocks.extend(data if isinstance(data, list) else [data])
+        return blocks
+
+
+class _SoupNode(Node):
+    __slots__ = ()
+
+    def select(self, css):
+        return [_SoupNode(el) for el in self._el.select(css)]
+
+    def select_one(self, css):
+        el = self._el.select_one(css)
+        return _SoupNode(el) if el is not None else None
+
+    def text(self, strip=True):
+        return self._el.get_text(strip=strip)
+
+    def get(self, attr, default=None):
+        value = self._el.get(attr, default)
+        return " ".join(value) if isinstance(value, list) else value  # bs4 splits "class"
+
+    def strings(self):
+        return iter(self._el.strings)
+
+
+class _LexborNode(Node):
+    __slots__ = ()
+
+    def select(self, css):
+        return [_LexborNode(el) for el in self._el.css(css)]
+
+    def select_one(self, css):
+        el = self._el.css_first(css)
+        return _LexborNode(el) if el is not None else None
+
+    def text(self, strip=True):
+        return self._el.text(strip=strip) or ""
+
+    def get(self, attr, default=None):
+        return self._el.attributes.get(attr, default)
+
+    def strings(self):
+        return (el.text(deep=False) for el in self._el.traverse(include_text=True) if el.tag == "-text")
+
+
+def _matcher(selector: str) -> Callable[[str, dict], bool]:
+    match = _SIMPLE_SELECTOR.match(selector.strip())
+    if not match:
+        raise ValueError(f"Unsupported partial-parse selector: {selector!r}")
+    tag, attr, value = match["tag"], match["attr"], match["value"]
+    classes = [c for c in match["classes"].split(".") if c]
+
+    def matches(name: str, attrs: dict) -> bool:
+        if tag and name != tag:
+            return False
+        if classes:
+            have = attrs.get("class") or ""
+            have = set(have.split() if isinstance(have, str) else have)
+            if not all(c in have for c in classes):
+                return False
+        if attr:
+            if attr not in attrs:
+                return False
+            if value is not None and attrs.get(attr) != value:
+                return False
+        return True
+
+    return matches
+
+
+def strainer(only: Iterable[str]) -> SoupStrainer:
+    """SoupStrainer keeping elements (and their subtrees) matching any of ``only``."""
+    matchers = [_matcher(s) for s in only]
+    return SoupStrainer(lambda name, attrs: any(m(name, attrs or {}) for m in matchers))
+
+
+def parse_html(html: str, only: Optional[Iterable[str]] = None, backend: Optional[str] = None) -> Node:
+    """Parse ``html`` with ``backend`` (default: fastest installed). ``only`` lists the
+    containers the caller will query; bs4 backends skip everything else."""
+    backend = backend or default_backend()
+    if backend == "selectolax":
+        if not HAS_SELECTOLAX:
+            raise RuntimeError("The 'selectolax' backend is not installed")
+        return _LexborNode(LexborHTMLParser(html).root)
+    if backend not in ("lxml", "html.parser"):
+        raise ValueError(f"Unknown HTML backend '{backend}' (available: {', '.join(BACKENDS)})")
+    parse_only = strainer(only) if only else None
+    return _SoupNode(BeautifulSoup(html, backend, parse_only=parse_only))
@@ -0,0 +1,272 @@
+"""On-disk HTTP response cache with TTLs, ETag/Last-Modified revalidation and LRU eviction."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from src.utils.http_client import HostRateLimiter, get_with_retry
+
+CACHE_DIR = Path(__file__).resolve().parents[2] / "data" / "cache" / "http"
+
+# Freshness per source (seconds). Stale entries are revalidated, not refetched blindly.
+SOURCE_TTLS = {
+    "ml_search": 3 * 3600,
+    "ml_trends": 6 * 3600,
+    "ml_autosuggest": 6 * 3600,
+    "ml_pages": 3 * 3600,
+    "amazon": 6 * 3600,
+    "google_news": 1800,
+    "default": 3600,
+}
+
+# Only headers needed to rebuild a usable Response are persisted
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control")
+
+# Captcha / robot-check pages come back as 200; they must never be cached.
+# Matched case-insensitively against the final URL and the start of the body.
+BLOCK_MARKERS = (
+    b"validatecaptcha",
+    b"type the characters you see",
+    b"api-services-support@amazon.com",
+    b"account-verification",
+    b"not a robot",
+)
+
+
+class HttpCache:
+    """Stores 200 responses as ``<key>.meta.json`` + ``<key>.body`` under ``cache_dir``.
+    Total size is kept under ``max_bytes`` by evicting least recently used entries."""
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, max_bytes: int = 200 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0}
+        self._index: Optional[OrderedDict] = None  # key -> size, oldest first
+        self._total = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        full_url = requests.Request("GET", url, params=params).prepare().url
+        return hashlib.sha256(full_url.encode("utf-8")).hexdigest()
+
+    # --- Entries ---
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return ``{"meta": ..., "body": bytes}`` or None. Marks the entry as recently used."""
+        with self._lock:
+            self._load_index()
+            if key not in self._index:
+                return None
+            meta_path, body_path = self._paths(key)
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                body = body_path.read_bytes()
+            except (OSError, ValueError):
+                self._drop(key)
+                return None
+            self._index.move_to_end(key)
+            try:
+                os.utime(meta_path)  # LRU order survives restarts
+            except OSError:
+                pass
+            return {"meta": meta, "body": body}
+
+    def put(self, key: str, meta: Dict[str, Any], body: bytes):
+        with self._lock:
+            self._load_index()
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            meta_path, body_path = self._paths(key)
+            self._atomic_write(body_path, body)
+            self._atomic_write(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+            size = meta_path.stat().st_size + len(body)
+            self._total += size - self._index.pop(key, 0)
+            self._index[key] = size
+            while self._total > self.max_bytes and len(self._index) > 1:
+                self._drop(next(iter(self._index)))
+
+    def touch(self, key: str, meta: Dict[str, Any]):
+        """Refresh metadata after a 304 Not Modified (body unchanged)."""
+        with self._lock:
+            meta_path, _ = self._paths(key)
+            self._atomic_write(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+            if self._index is not None and key in self._index:
+                self._index.move_to_end(key)
+
+    def count(self, outcome: str):
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def clear(self):
+        with self._lock:
+            self._load_index()
+            for key in list(self._index):
+                self._drop(key)
+
+    # --- Internals ---
+
+    def _paths(self, key: str):
+        return self.cache_dir / f"{key}.meta.json", self.cache_dir / f"{key}.body"
+
+    def _load_index(self):
+        """Build the LRU index once from the files on disk (oldest mtime first)."""
+        if self._index is not None:
+            return
+        entries = []
+        if self.cache_dir.exists():
+            for meta_path in self.cache_dir.glob("*.meta.json"):
+                key = meta_path.name[:-len(".meta.json")]
+                body_path = self.cache_dir / f"{key}.body"
+                try:
+                    st = meta_path.stat()
+                    entries.append((st.st_mtime, key, st.st_size + body_path.stat().st_size))
+                except OSError:
+                    continue
+        entries.sort()
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._total = sum(self._index.values())
+
+    def _drop(self, key: str):
+        self._total -= self._index.pop(key, 0)
+        for path in self._paths(key):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes):
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+
+_default_cache: Optional[HttpCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[HttpCache]:
+    """Process-wide cache (None when HTTP_CACHE_DISABLED=1)."""
+    global _default_cache
+    if os.environ.get("HTTP_CACHE_DISABLED") == "1":
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            max_mb = int(os.environ.get("HTTP_CACHE_MAX_MB", "200"))
+            _default_cache = HttpCache(CACHE_DIR, max_bytes=max_mb * 1024 * 1024)
+        return _default_cache
+
+
+def _build_response(url: str, meta: Dict[str, Any], body: bytes) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = meta.get("status", 200)
+    resp.reason = "OK"
+    resp.url = meta.get("url", url)
+    resp.headers = CaseInsensitiveDict(meta.get("headers", {}))
+    resp.encoding = meta.get("encoding")
+    resp._content = body
+    resp.from_cache = True
+    return resp
+
+
+def is_blocked(resp: requests.Response) -> bool:
+    """True for captcha / robot-check pages (served with status 200)."""
+    head = (resp.url or "").lower().encode("utf-8") + b" " + (resp.content or b"")[:65536].lower()
+    return any(marker in head for marker in BLOCK_MARKERS)
+
+
+def _cache_control(headers) -> Dict[str, Optional[str]]:
+    """``Cache-Control`` directives: ``{"no-store": None, "max-age": "60"}``."""
+    directives = {}
+    for part in (headers.get("Cache-Control") or "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def _freshness(meta: Dict[str, Any], ttl: float) -> float:
+    """Source TTL, capped by the response's own ``max-age`` (``no-cache`` means 0)."""
+    directives = _cache_control(meta.get("headers", {}))
+    if "no-cache" in directives:
+        return 0
+    try:
+        return min(ttl, float(directives["max-age"]))
+    except (KeyError, TypeError, ValueError):
+        return ttl
+
+
+def cached_get(
+    session,
+    url: str,
+    source: str = "default",
+    params: Optional[Dict[str, Any]] = None,
+    ttl: Optional[float] = None,
+    limiter: Optional[HostRateLimiter] = None,
+    cache: Optional[HttpCache] = None,
+    validate: Optional[Callable[[requests.Response], bool]] = None,
+    **kwargs,
+) -> requests.Response:
+    """
+    Drop-in for ``session.get(url, params=..., **kwargs)`` backed by the on-disk cache.
+    Fresh entries (younger than the source TTL and the response's ``max-age``) are served
+    without network; stale ones are revalidated with If-None-Match / If-Modified-Since.
+    A 200 is stored only if ``validate(resp)`` is true (default: not ``is_blocked``) and
+    the response doesn't say ``no-store``. ``session`` may be a Session or the
+    ``requests`` module itself.
+    """
+    cache = cache or get_default_cache()
+    if cache is None:
+        return get_with_retry(session, url, limiter, params=params, **kwargs)
+
+    validate = validate or (lambda r: not is_blocked(r))
+    ttl = SOURCE_TTLS.get(source, SOURCE_TTLS["default"]) if ttl is None else ttl
+    key = cache.make_key(url, params)
+    entry = cache.get(key)
+    now = time.time()
+
+    if entry and now - entry["meta"].get("stored_at", 0) < _freshness(entry["meta"], ttl):
+        cached = _build_response(url, entry["meta"], entry["body"])
+        if validate(cached):
+            cache.count("hits")
+            return cached
+        entry = None  # Poisoned by an older run (e.g. a captcha page): fetch again
+
+    headers = dict(kwargs.pop("headers", None) or {})
+    if entry:
+        validators = entry["meta"].get("headers", {})
+        if validators.get("ETag"):
+            headers["If-None-Match"] = validators["ETag"]
+        if validators.get("Last-Modified"):
+            headers["If-Modified-Since"] = validators["Last-Modified"]
+
+    resp = get_with_retry(session, url, limiter, params=params, headers=headers or None, **kwargs)
+
+    if entry and resp.status_code == 304:
+        cache.count("revalidated")
+        entry["meta"]["stored_at"] = now
+        cache.touch(key, entry["meta"])
+        return _build_response(url, entry["meta"], entry["body"])
+
+    cache.count("misses")
+    if resp.status_code == 200 and "no-store" not in _cache_control(resp.headers) and validate(resp):
+        meta = {
+            "url": resp.url,
+            "source": source,
+            "status": 200,
+            "stored_at": now,
+            "encoding": resp.encoding,
+            "headers": {h: resp.headers[h] for h in KEPT_HEADERS if h in resp.headers},
+        }
+        cache.put(key, meta, resp.content)
+    return resp
@@ -0,0 +1,139 @@
+"""Shared HTTP helpers: keep-alive sessions, per-host rate limiting and 429 handling."""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = (429, 503)
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until ``tokens`` are available, then consume them."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                else:
+                    wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for ``seconds`` (e.g. server sent Retry-After)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class HostRateLimiter:
+    """One TokenBucket per host, created lazily. Thread-safe."""
+
+    def __init__(self, default_rate: float = 2.0, rates: Optional[Dict[str, float]] = None):
+        self.default_rate = default_rate
+        self.rates = rates or {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rates.get(host, self.default_rate))
+            return self._buckets[host]
+
+    def wait(self, url: str):
+        self.bucket(url).acquire()
+
+    def backoff(self, url: str, seconds: float):
+        self.bucket(url).pause(seconds)
+
+
+def build_session(pool_size: int = 10, headers: Optional[Dict[str, str]] = None) -> requests.Session:
+    """Session with a connection pool large enough for ``pool_size`` concurrent workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+def parse_retry_after(value: Optional[str], default: float) -> float:
+    """Retry-After is either delta-seconds or an HTTP-date."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+
+def request_with_retry(
+    session: requests.Session,
+    method: str,
+    url: str,
+    limiter: Optional[HostRateLimiter] = None,
+    max_retries: int = 3,
+    backoff: float = 1.0,
+    **kwargs,
+) -> requests.Response:
+    """``session.<method>(url)`` through the rate limiter, retrying 429/503 after Retry-After
+    (or exponential backoff). Network errors propagate to the caller; the last throttled
+    response is returned as-is."""
+    send = getattr(session, method.lower())
+    for attempt in range(max_retries + 1):
+        if limiter:
+            limiter.wait(url)
+        resp = send(url, **kwargs)
+        if resp.status_code not in RETRY_STATUSES or attempt == max_retries:
+            return resp
+
+        delay = parse_retry_after(resp.headers.get("Retry-After"), backoff * (2 ** attempt))
+        if limiter:
+            # Every worker hitting this host backs off, not just this one
+            limiter.backoff(url, delay)
+        else:
+            time.sleep(delay)
+    return resp
+
+
+def get_with_retry(session: requests.Session, url: str, limiter: Optional[HostRateLimiter] = None,
+                   max_retries: int = 3, backoff: float = 1.0, **kwargs) -> requests.Response:
+    """GET through the rate limiter, retrying 429/503 (see ``request_with_retry``)."""
+    return request_with_retry(session, "GET", url, limiter, max_retries, backoff, **kwargs)
+
+
+def post_with_retry(session: requests.Session, url: str, limiter: Optional[HostRateLimiter] = None,
+                    max_retries: int = 3, backoff: float = 1.0, **kwargs) -> requests.Response:
+    """POST through the rate limiter, retrying 429/503 (see ``request_with_retry``)."""
+    return request_with_retry(session, "POST", url, limiter, max_retries, backoff, **kwargs)
@@ -0,0 +1,90 @@
+"""Incremental parsing of a JSON array that arrives in pieces (e.g. streamed LLM output).
+
+``ArrayItemParser.feed()`` returns each element of the target JSON array as soon as
+its closing bracket arrives, so consumers act on complete items while the
+rest is still being generated, and a truncated or malformed tail only loses the
+element it cuts.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Iterable, Iterator, List
+
+_OPEN = "{["
+_CLOSE = "}]"
+
+
+class ArrayItemParser:
+    """Yields the object/array elements of the target array: a top-level ``[...]`` (text
+    before it, such as a markdown fence, is skipped) or the array under one of ``keys``
+    in a top-level object (``{"clusters": [...]}``). Arrays nested anywhere else are
+    not targets. Scalar elements and elements that fail to parse are dropped."""
+
+    def __init__(self, keys: Iterable[str] = ()):
+        self.keys = frozenset(keys)
+        self.depth = 0  # Bracket depth of the whole text, outside strings
+        self.array_depth = None  # Depth just inside the target array, once found
+        self.done = False
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []  # Current string of the top-level object (a key?)
+        self._last_key = None
+        self._item: List[str] = []
+
+    def feed(self, chunk: str) -> List[Any]:
+        items = []
+        for ch in chunk:
+            if self.done:
+                break
+            capturing = self.array_depth is not None and self.depth > self.array_depth
+            if capturing:
+                self._item.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self.depth == 1:
+                        self._last_key = "".join(self._string)
+                if self.depth == 1 and self._in_string:
+                    self._string.append(ch)
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._string = []
+            elif ch in _OPEN:
+                if self.array_depth is not None and self.depth == self.array_depth:
+                    self._item = [ch]  # An element starts
+                if self.array_depth is None and ch == "[" and (
+                        self.depth == 0 or (self.depth == 1 and self._last_key in self.keys)):
+                    self.array_depth = self.depth + 1
+                self.depth += 1
+            elif ch in _CLOSE:
+                self.depth -= 1
+                if self.array_depth is not None:
+                    if self.depth < self.array_depth:
+                        self.done = True  # The array itself closed
+                    elif self.depth == self.array_depth and capturing:
+                        try:
+                            items.append(json.loads("".join(self._item)))
+                        except ValueError:
+                            pass
+                        self._item = []
+        return items
+
+    @property
+    def pending(self) -> str:
+        """Text of the element still being received (lost if the stream stops here)."""
+        return "".join(self._item)
+
+
+def iter_array_items(chunks: Iterable[str], keys: Iterable[str] = ()) -> Iterator[Any]:
+    """Elements of the target array (see ``ArrayItemParser``) spread over ``chunks``, as
+    each one completes. ``chunks`` is read to the end even after the array closes, so a
+    streamed reply reaches ``[DONE]`` (and the LLM cache)."""
+    parser = ArrayItemParser(keys)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
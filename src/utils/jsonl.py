@@ -0,0 +1,172 @@
+"""Record-per-line (JSONL) raw artifacts with optional gzip/zstd framing.
+
+Snapshots are written once (``<prefix>-<timestamp>.jsonl[.gz|.zst]``) and
+``<prefix>-latest.jsonl`` points at the newest one. Readers stream records, so
+consumers never hold a whole file in memory. Legacy ``.json`` files (one JSON
+document) are still readable through the same API.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:  # Optional dependency
+    zstandard = None
+    HAS_ZSTD = False
+
+from src.utils.product_record import json_default
+from src.utils.raw_manifest import DATA_DIR, get_manifest
+
+DEFAULT_CODEC = "zst" if HAS_ZSTD else "gz"
+SUFFIXES = {"": ".jsonl", "gz": ".jsonl.gz", "zst": ".jsonl.zst"}
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+# Legacy single-document files: the list of records sits under one of these keys
+_WRAPPER_KEYS = ("opportunities", "products", "items", "keywords")
+
+
+def _codec_for(path: Path) -> str:
+    suffix = Path(path).suffix
+    return {".gz": "gz", ".zst": "zst"}.get(suffix, "")
+
+
+def _open_write(path: Path, codec: str):
+    raw = open(path, "wb")
+    if codec == "gz":
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6), raw
+    if codec == "zst":
+        if not HAS_ZSTD:
+            raw.close()
+            raise RuntimeError("zstd output requires the 'zstandard' package")
+        return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=False), raw
+    return raw, raw
+
+
+def _open_read(path: Path):
+    """Binary stream of the decoded bytes (framing sniffed from the magic number)."""
+    raw = open(path, "rb")
+    magic = raw.read(4)
+    raw.seek(0)
+    if magic.startswith(_GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    if magic == _ZSTD_MAGIC:
+        if not HAS_ZSTD:
+            raw.close()
+            raise RuntimeError(f"{path.name} is zstd-compressed: install 'zstandard' to read it")
+        return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+    return raw
+
+
+def is_jsonl(path: Path) -> bool:
+    return ".jsonl" in Path(path).suffixes
+
+
+def write_records(path: Path, records: Iterable[Any], codec: Optional[str] = None) -> int:
+    """Stream ``records`` to ``path`` one JSON document per line (atomically).
+    The codec defaults to the one implied by the suffix. Returns the record count."""
+    path = Path(path)
+    codec = _codec_for(path) if codec is None else codec
+    tmp = path.with_name(f".{path.name}.tmp")
+    count = 0
+    stream, raw = _open_write(tmp, codec)
+    try:
+        with io.TextIOWrapper(stream, encoding="utf-8", newline="\n") as text:
+            for record in records:
+                text.write(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=json_default))
+                text.write("\n")
+                count += 1
+    except BaseException:
+        raw.close()
+        tmp.unlink()
+        raise
+    raw.close()
+    os.replace(tmp, path)
+    return count
+
+
+def iter_records(path: Path) -> Iterator[Any]:
+    """Yield the records of a JSONL artifact lazily (any framing). Legacy ``.json``
+    files are loaded whole and their list (or wrapped list) is yielded item by item."""
+    path = Path(path)
+    if not is_jsonl(path.resolve()):
+        with path.open(encoding="utf-8") as fp:
+            data = json.load(fp)
+        if isinstance(data, dict):
+            data = next((data[k] for k in _WRAPPER_KEYS if isinstance(data.get(k), list)), [data])
+        yield from data
+        return
+
+    with _open_read(path) as stream:
+        for line in io.TextIOWrapper(stream, encoding="utf-8"):
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_records(path: Optional[Path]) -> list:
+    """All records of ``path`` as a list ([] if there is no such file)."""
+    if not path or not Path(path).exists():
+        return []
+    return list(iter_records(path))
+
+
+class RecordFile:
+    """Re-iterable view of an artifact: every iteration streams the file again."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter_records(self.path)
+
+    def sha256(self) -> str:
+        digest = hashlib.sha256()
+        with self.path.open("rb") as fp:
+            for block in iter(lambda: fp.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def __repr__(self):
+        return f"RecordFile({self.path.name!r})"
+
+
+def latest_path(prefix: str, raw_dir: Path = DATA_DIR) -> Path:
+    return Path(raw_dir) / f"{prefix}-latest.jsonl"
+
+
+def _point_latest(link: Path, target: Path):
+    """Point ``link`` at ``target``: symlink, else hard link, else a copy."""
+    tmp = link.with_name(f".{link.name}.tmp")
+    if tmp.is_symlink() or tmp.exists():
+        tmp.unlink()
+    try:
+        os.symlink(target.name, tmp)
+    except (OSError, NotImplementedError):
+        try:
+            os.link(target, tmp)
+        except OSError:
+            tmp.write_bytes(target.read_bytes())
+    os.replace(tmp, link)
+
+
+def write_snapshot(prefix: str, records: Iterable[Any], raw_dir: Path = DATA_DIR,
+                   codec: str = DEFAULT_CODEC, timestamp: Optional[str] = None) -> Path:
+    """Write ``<prefix>-<timestamp>.jsonl[.gz|.zst]`` once, index it in the raw
+    manifest and repoint ``<prefix>-latest.jsonl`` at it."""
+    raw_dir = Path(raw_dir)
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = timestamp or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = raw_dir / f"{prefix}-{timestamp}{SUFFIXES[codec]}"
+    count = write_records(path, records, codec=codec)
+    _point_latest(latest_path(prefix, raw_dir), path)
+    get_manifest(raw_dir).record(path, count=count)
+    return path
@@ -6,6 +6,9 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import List, Tuple, Dict
 
+from src.utils.jsonl import read_records
+from src.utils.raw_manifest import get_manifest
+
 # Ajuste de path: src/utils/keyword_utils.py -> raiz é parents[2]
 DATA_DIR = Path(__file__).resolve().parents[2] / "data" / "raw"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -46,6 +49,7 @@ def save_keywords(
     path = DATA_DIR / filename
     with path.open("w", encoding="utf-8") as fp:
         json.dump(payload, fp, ensure_ascii=False, indent=2)
+    get_manifest(DATA_DIR).record(path, payload)
     return path
 
 
@@ -60,8 +64,11 @@ def load_keywords(
     Else, returns List[str].
     """
     
+    # Newest-by-prefix/source lookups come from the raw manifest (no glob + parse of every file)
+    manifest = get_manifest(DATA_DIR)
+
     # 1. Try to load newest Intent Clusters first (High Quality)
-    cluster_files = sorted(DATA_DIR.glob("intent_clusters-*.json"), reverse=True)
+    cluster_file = manifest.latest("intent_clusters")
     
     # If explicitly asked for something else, skip this unless "intent_clusters" is in preferred
     use_clusters = True
@@ -70,46 +77,45 @@ def load_keywords(
         if not any(s in ("intent_clusters", "ai_cluster") for s in preferred_sources):
              use_clusters = False
              
-    if use_clusters and cluster_files:
+    if use_clusters and cluster_file:
         try:
-            with cluster_files[0].open(encoding="utf-8") as fp:
-                clusters = json.load(fp)
-                
-                rich_keywords = []
-                plain_keywords = []
+            clusters = read_records(cluster_file)
+            
+            rich_keywords = []
+            plain_keywords = []
 
-                # Clusters is a list of Dicts
-                if isinstance(clusters, list):
-                    for c in clusters:
-                        if isinstance(c, dict):
-                            p_list = c.get("validated_products", [])
-                            # Metadata
-                            p_range = c.get("price_range_brl", {})
-                            negatives = c.get("negative_keywords", [])
-                            
-                            if isinstance(p_list, list):
-                                for p in p_list:
-                                    if p and isinstance(p, str) and p.strip():
-                                        plain_keywords.append(p.strip())
-                                        rich_keywords.append({
-                                            "term": p.strip(),
-                                            "price_min": p_range.get("min", 0),
-                                            "price_max": p_range.get("max", 0),
-                                            "negatives": negatives
-                                        })
-                
-                if plain_keywords:
-                    if return_rich_objects:
-                        return rich_keywords, "intent_clusters"
-                    else:
-                        # Deduplicate strings
-                        return list(dict.fromkeys(plain_keywords)), "intent_clusters"
+            # Clusters is a list of Dicts
+            if isinstance(clusters, list):
+                for c in clusters:
+                    if isinstance(c, dict):
+                        p_list = c.get("validated_products", [])
+                        # Metadata
+                        p_range = c.get("price_range_brl", {})
+                        negatives = c.get("negative_keywords", [])
                         
+                        if isinstance(p_list, list):
+                            for p in p_list:
+                                if p and isinstance(p, str) and p.strip():
+                                    plain_keywords.append(p.strip())
+                                    rich_keywords.append({
+                                        "term": p.strip(),
+                                        "price_min": p_range.get("min", 0),
+                                        "price_max": p_range.get("max", 0),
+                                        "negatives": negatives
+                                    })
+            
+            if plain_keywords:
+                if return_rich_objects:
+                    return rich_keywords, "intent_clusters"
+                else:
+                    # Deduplicate strings
+                    return list(dict.fromkeys(plain_keywords)), "intent_clusters"
+                    
         except Exception as e:
             print(f"[warn] Failed to load intent clusters: {e}")
 
-    # 2. Try legacy keyword files
-    files = sorted(DATA_DIR.glob("*keywords-*.json"), reverse=True)
+    # 2. Try legacy keyword files (*keywords-*.json)
+    keyword_prefixes = [p for p in manifest.prefixes() if p.endswith("keywords")]
     
     def read_keywords(path) -> Tuple[List[str], str]:
         try:
@@ -120,20 +126,13 @@ def load_keywords(
         except:
             return [], "unknown"
 
-    # Try preferred sources
-    if preferred_sources:
-        for src in preferred_sources:
-            # Check files matching source roughly by name or content
-            for path in files:
-                kws, source = read_keywords(path)
-                if kws and source == src:
-                    return kws, source
-
-    # Fallback to any file
-    for path in files:
-        kws, source = read_keywords(path)
-        if kws:
-            return kws, source
+    # Try preferred sources, then any file
+    for src in list(preferred_sources or []) + [None]:
+        entry = manifest.latest_entry(keyword_prefixes, source=src, nonempty=True)
+        if entry:
+            kws, source = read_keywords(DATA_DIR / entry["file"])
+            if kws:
+                return kws, source
 
     # Absolute fallback
     return FALLBACK_KEYWORDS[:], "fallback_manual"
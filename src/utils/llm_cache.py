@@ -0,0 +1,89 @@
+"""Content-addressed cache of chat completions.
+
+The key is a hash of (model, temperature, response format, prompt with whitespace
+normalized), so re-running the AI step on an unchanged signal set skips the model
+call. Entries live under data/cache/llm with a TTL and LRU size eviction (the
+HttpCache store); ``stats``/``hit_rate()`` report how often a run was served
+locally.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.utils.http_cache import HttpCache
+
+LLM_CACHE_DIR = Path(__file__).resolve().parents[2] / "data" / "cache" / "llm"
+DEFAULT_TTL = 24 * 3600
+
+
+def normalize_prompt(text: str) -> str:
+    """Whitespace-insensitive prompt text (template indentation doesn't change the key)."""
+    return "\n".join(" ".join(line.split()) for line in text.strip().splitlines() if line.strip())
+
+
+class LLMCache:
+    def __init__(self, cache_dir: Path = LLM_CACHE_DIR, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = 50 * 1024 * 1024):
+        self.store = HttpCache(cache_dir, max_bytes=max_bytes)
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, temperature: float, messages: List[Dict[str, str]],
+                 response_format: Optional[Dict[str, Any]] = None, max_tokens: Optional[int] = None) -> str:
+        material = {
+            "model": model,
+            "temperature": temperature,
+            "response_format": response_format,
+            "max_tokens": max_tokens,
+            "messages": [[m["role"], normalize_prompt(m["content"])] for m in messages],
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.store.get(key)
+        fresh = entry is not None and time.time() - entry["meta"].get("stored_at", 0) < self.ttl
+        self._count("hits" if fresh else "misses")
+        return entry["body"].decode("utf-8") if fresh else None
+
+    def put(self, key: str, content: str, model: str = ""):
+        self.store.put(key, {"stored_at": time.time(), "model": model}, content.encode("utf-8"))
+
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+    def summary(self) -> str:
+        return f"LLM cache: {self.stats['hits']} hit(s), {self.stats['misses']} miss(es), {self.hit_rate():.0%} hit rate"
+
+    def clear(self):
+        self.store.clear()
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self.stats[outcome] += 1
+
+
+_default_cache: Optional[LLMCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_llm_cache() -> Optional[LLMCache]:
+    """Process-wide cache (None when LLM_CACHE_DISABLED=1). TTL and size come from
+    LLM_CACHE_TTL_HOURS / LLM_CACHE_MAX_MB."""
+    global _default_cache
+    if os.environ.get("LLM_CACHE_DISABLED") == "1":
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            ttl = float(os.environ.get("LLM_CACHE_TTL_HOURS", DEFAULT_TTL / 3600)) * 3600
+            max_mb = int(os.environ.get("LLM_CACHE_MAX_MB", "50"))
+            _default_cache = LLMCache(LLM_CACHE_DIR, ttl=ttl, max_bytes=max_mb * 1024 * 1024)
+        return _default_cache
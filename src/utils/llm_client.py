@@ -0,0 +1,112 @@
+"""OpenAI-compatible chat completions client shared by the AI steps.
+
+One pooled keep-alive session per client, a per-host request limiter and a
+tokens-per-minute bucket, so several worker threads can call the model at once
+without tripping the provider's rate limits. Replies are served from the
+LLMCache when the same prompt was answered recently. ``stream()`` reads the
+server-sent events of ``"stream": true`` and yields the text as it is generated.
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.utils.http_client import HostRateLimiter, TokenBucket, build_session, post_with_retry
+from src.utils.llm_cache import LLMCache, get_default_llm_cache
+
+CHAT_ENDPOINT = os.environ.get("OPENAI_CHAT_ENDPOINT", "https://api.openai.com/v1/chat/completions")
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# gpt-4o-mini tier-1 limits are far above this; stay polite by default
+DEFAULT_CONCURRENCY = 4
+DEFAULT_REQUESTS_PER_SECOND = 2.0
+DEFAULT_TOKENS_PER_MINUTE = 150_000
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for pt/en text), no tokenizer needed."""
+    return len(text) // 4 + 1
+
+
+class ChatClient:
+    def __init__(self, api_key: str, endpoint: str = CHAT_ENDPOINT, model: str = DEFAULT_MODEL,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                 tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE, timeout: float = 90,
+                 cache: Optional[LLMCache] = None):
+        self.endpoint = endpoint
+        self.model = model
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self.session = build_session(pool_size=self.concurrency, headers={
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+        self.limiter = HostRateLimiter(default_rate=requests_per_second)
+        self.tokens = TokenBucket(tokens_per_minute / 60, capacity=tokens_per_minute)
+        self.cache = cache or get_default_llm_cache()
+
+    def _payload(self, messages, temperature, max_tokens, response_format) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"model": self.model, "messages": messages, "temperature": temperature}
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+        if response_format:
+            payload["response_format"] = response_format
+        return payload
+
+    def _post(self, payload: Dict[str, Any], **kwargs):
+        budget = sum(estimate_tokens(m["content"]) for m in payload["messages"]) + (payload.get("max_tokens") or 0)
+        self.tokens.acquire(min(budget, self.tokens.capacity))
+        resp = post_with_retry(self.session, self.endpoint, self.limiter, json=payload, timeout=self.timeout, **kwargs)
+        resp.raise_for_status()
+        return resp
+
+    def complete(self, messages: List[Dict[str, str]], temperature: float = 0.2,
+                 max_tokens: Optional[int] = None, response_format: Optional[Dict[str, Any]] = None) -> str:
+        """Content of the first choice (cached). HTTP errors raise ``requests.HTTPError``."""
+        key = None
+        if self.cache:
+            key = self.cache.make_key(self.model, temperature, messages, response_format, max_tokens)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        resp = self._post(self._payload(messages, temperature, max_tokens, response_format))
+        content = resp.json()["choices"][0]["message"]["content"]
+        if key:
+            self.cache.put(key, content, self.model)
+        return content
+
+    def stream(self, messages: List[Dict[str, str]], temperature: float = 0.2,
+               max_tokens: Optional[int] = None, response_format: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Content deltas as the model generates them (SSE). A cache hit arrives as one piece;
+        a reply is cached only once the stream reached ``[DONE]``."""
+        key = None
+        if self.cache:
+            key = self.cache.make_key(self.model, temperature, messages, response_format, max_tokens)
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        payload = self._payload(messages, temperature, max_tokens, response_format)
+        payload["stream"] = True
+        parts = []
+        finished = False
+        with self._post(payload, stream=True) as resp:
+            # chunk_size=None: each HTTP chunk as it arrives (the default waits for 512 bytes)
+            for line in resp.iter_lines(chunk_size=None):
+                if not line.startswith(b"data:"):
+                    continue  # Blank separators, ": keep-alive" comments, event names
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    finished = True
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        if key and finished:
+            self.cache.put(key, "".join(parts), self.model)
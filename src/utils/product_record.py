@@ -0,0 +1,119 @@
+"""Compact in-memory representation of a scraped product.
+
+Collectors build ``ProductRecord`` objects instead of one dict per product: no
+per-instance key table, interned marketplace/source/keyword/seller strings, a float
+price and an epoch-seconds timestamp. Records answer ``.get()``/``[]`` like the
+old dicts, so scoring and DB code read them unchanged; ``to_dict()`` (or
+``json_default`` as a ``json.dumps`` hook) converts at JSON/API boundaries.
+"""
+from __future__ import annotations
+
+import sys
+import time
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+_MISSING = object()
+
+
+@dataclass(slots=True)
+class ProductRecord:
+    source: str
+    search_keyword: str
+    title: str
+    price: float
+    permalink: str
+    thumbnail: Optional[str] = None
+    timestamp: int = 0  # Epoch seconds (UTC)
+    # Optional fields: left out of to_dict() when None, like the collectors' old dicts
+    marketplace: Optional[str] = None
+    free_shipping: Optional[bool] = None
+    rating: Optional[float] = None
+    reviews_count: Optional[int] = None
+    seller_name: Optional[str] = None
+    is_prime: Optional[bool] = None
+    extra: Optional[Dict[str, Any]] = None  # Any other key (from_dict round trips)
+
+    def __post_init__(self):
+        self.source = sys.intern(self.source)
+        self.search_keyword = sys.intern(self.search_keyword or "")
+        if self.marketplace is not None:
+            self.marketplace = sys.intern(self.marketplace)
+        if self.seller_name is not None:
+            self.seller_name = sys.intern(self.seller_name)
+        self.price = float(self.price or 0)
+        if not self.timestamp:
+            self.timestamp = int(time.time())
+
+    @property
+    def captured_at(self) -> str:
+        return datetime.fromtimestamp(self.timestamp, timezone.utc).isoformat()
+
+    # --- Mapping-style access (drop-in for the old product dicts) ---
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._lookup(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self._lookup(key) is not _MISSING
+
+    def _lookup(self, key: str) -> Any:
+        if key == "timestamp":
+            return self.captured_at
+        if key in _REQUIRED:
+            return getattr(self, key)
+        if key in _OPTIONAL:
+            value = getattr(self, key)
+            return _MISSING if value is None else value
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        return _MISSING
+
+    # --- Boundaries ---
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {
+            "timestamp": self.captured_at,
+            "source": self.source,
+            "search_keyword": self.search_keyword,
+        }
+        if self.marketplace is not None:
+            out["marketplace"] = self.marketplace
+        out.update(title=self.title, price=self.price, permalink=self.permalink, thumbnail=self.thumbnail)
+        for name in _OPTIONAL[1:]:
+            value = getattr(self, name)
+            if value is not None:
+                out[name] = value
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProductRecord":
+        known = {k: data[k] for k in _FIELDS if k in data and k not in ("timestamp", "extra")}
+        record = cls(**{"source": "", "search_keyword": "", "title": "", "price": 0, "permalink": "", **known})
+        if data.get("timestamp"):
+            record.timestamp = int(datetime.fromisoformat(data["timestamp"]).timestamp())
+        extra = {k: v for k, v in data.items() if k not in _FIELDS}
+        record.extra = extra or None
+        return record
+
+
+_FIELDS = tuple(f.name for f in fields(ProductRecord))
+_REQUIRED = ("source", "search_keyword", "title", "price", "permalink", "thumbnail")
+_OPTIONAL = ("marketplace", "free_shipping", "rating", "reviews_count", "seller_name", "is_prime")
+
+
+def json_default(obj: Any) -> Any:
+    """``json.dumps(default=...)`` hook: records serialise as their dict form."""
+    if isinstance(obj, ProductRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
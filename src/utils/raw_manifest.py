@@ -0,0 +1,209 @@
+"""Append-only index of the artifacts in data/raw (latest-by-prefix/source lookups without globbing)."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data" / "raw"
+MANIFEST_NAME = ".manifest.jsonl"
+
+_TIMESTAMP = re.compile(r"-(\d{8}T\d{6}Z)")
+ARTIFACT_SUFFIXES = (".json", ".jsonl", ".jsonl.gz", ".jsonl.zst")
+
+
+def _stem(name: str) -> str:
+    for suffix in sorted(ARTIFACT_SUFFIXES, key=len, reverse=True):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return Path(name).stem
+
+
+def _describe(payload: Any) -> Tuple[Optional[str], Optional[int]]:
+    """(source, item count) of a raw payload, when it says."""
+    if isinstance(payload, list):
+        return None, len(payload)
+    if isinstance(payload, dict):
+        for key in ("keywords", "items", "products", "opportunities"):
+            if isinstance(payload.get(key), list):
+                return payload.get("source"), len(payload[key])
+        return payload.get("source"), None
+    return None, None
+
+
+class RawManifest:
+    """One JSON line per artifact: file, prefix, source, timestamp, size, count, sha256.
+
+    Lookups are dict hits on the newest entry per (prefix, source). Files written by
+    code that doesn't call ``record`` (e.g. the legacy scripts) are picked up the next
+    time the directory's mtime changes, so the index never needs a full glob + stat.
+    """
+
+    def __init__(self, raw_dir: Path = DATA_DIR):
+        self.raw_dir = Path(raw_dir)
+        self.path = self.raw_dir / MANIFEST_NAME
+        self._entries: Dict[str, Dict[str, Any]] = {}  # file name -> entry
+        self._latest: Dict[Tuple[str, Optional[str], bool], Dict[str, Any]] = {}
+        self._prefixes: set = set()
+        self._offset = 0  # bytes of the manifest already read
+        self._dir_mtime = None
+        self._lock = threading.RLock()
+
+    # --- Lookups ---
+
+    def latest(self, prefix: str, source: Optional[str] = None, nonempty: bool = False) -> Optional[Path]:
+        """Newest artifact named ``<prefix>-<timestamp>.json[l]`` (optionally of ``source``,
+        optionally with at least one item)."""
+        entry = self.latest_entry([prefix], source, nonempty)
+        return self.raw_dir / entry["file"] if entry else None
+
+    def latest_entry(self, prefixes: Iterable[str], source: Optional[str] = None, nonempty: bool = False) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._sync()
+            found = [self._latest.get((p, source, nonempty)) for p in prefixes]
+            found = [e for e in found if e]
+            return max(found, key=self._order) if found else None
+
+    def prefixes(self) -> List[str]:
+        with self._lock:
+            self._sync()
+            return sorted(self._prefixes)
+
+    def entries(self, prefix: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._sync()
+            rows = [e for e in self._entries.values() if prefix is None or e["prefix"] == prefix]
+            return sorted(rows, key=self._order)
+
+    # --- Writes ---
+
+    def record(self, path: Path, payload: Any = None, count: Optional[int] = None) -> Dict[str, Any]:
+        """Index a file just written to raw_dir. Pass the payload (or, for JSONL
+        artifacts, the record count) to skip re-reading it."""
+        path = Path(path)
+        digest = hashlib.sha256()
+        with path.open("rb") as fp:
+            for block in iter(lambda: fp.read(1 << 20), b""):
+                digest.update(block)
+        source = None
+        if payload is not None:
+            source, count = _describe(payload)
+        elif count is None and ".jsonl" in path.suffixes:
+            from src.utils.jsonl import iter_records
+            try:
+                count = sum(1 for _ in iter_records(path))
+            except (ValueError, OSError, RuntimeError):
+                count = None
+        elif count is None:
+            try:
+                source, count = _describe(json.loads(path.read_bytes()))
+            except ValueError:
+                pass
+        st = path.stat()
+        match = _TIMESTAMP.search(path.name)
+        entry = {
+            "file": path.name,
+            "prefix": path.name[:match.start()] if match else _stem(path.name),
+            "source": source,
+            "timestamp": match.group(1) if match else
+                datetime.fromtimestamp(st.st_mtime, timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+            "size": st.st_size,
+            "count": count,
+            "sha256": digest.hexdigest(),
+        }
+        with self._lock:
+            self.raw_dir.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as fp:
+                fp.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._index(entry)
+        return entry
+
+    def rebuild(self):
+        """Drop the manifest and re-index every file (oldest first)."""
+        with self._lock:
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+            self._entries, self._latest, self._prefixes = {}, {}, set()
+            self._offset, self._dir_mtime = 0, None
+            self._sync()
+
+    # --- Internals ---
+
+    @staticmethod
+    def _order(entry: Dict[str, Any]):
+        return entry["timestamp"], entry["file"]
+
+    def _index(self, entry: Dict[str, Any]):
+        self._entries[entry["file"]] = entry
+        self._prefixes.add(entry["prefix"])
+        keys = [(entry["prefix"], None, False), (entry["prefix"], entry["source"], False)]
+        if entry.get("count"):
+            keys += [(entry["prefix"], None, True), (entry["prefix"], entry["source"], True)]
+        for key in keys:
+            best = self._latest.get(key)
+            if best is None or self._order(entry) >= self._order(best):
+                self._latest[key] = entry
+
+    def _read_new_lines(self):
+        """Pick up entries appended since the last read (possibly by other processes)."""
+        try:
+            with self.path.open("rb") as fp:
+                fp.seek(self._offset)
+                chunk = fp.read()
+        except FileNotFoundError:
+            return
+        end = chunk.rfind(b"\n") + 1  # Ignore a partially written last line
+        self._offset += end
+        for line in chunk[:end].splitlines():
+            try:
+                self._index(json.loads(line))
+            except (ValueError, KeyError):
+                continue
+
+    def _sync(self):
+        """Cheap when nothing changed: one stat of the directory."""
+        try:
+            mtime = os.stat(self.raw_dir).st_mtime_ns
+        except FileNotFoundError:
+            return
+        self._read_new_lines()
+        if mtime == self._dir_mtime:
+            return
+
+        # Symlinks are "-latest" pointers to files indexed under their own name
+        names = {e.name for e in os.scandir(self.raw_dir)
+                 if e.name.endswith(ARTIFACT_SUFFIXES) and not e.name.startswith(".")
+                 and e.is_file(follow_symlinks=False)}
+        if set(self._entries) - names:
+            # Files were deleted: rebuild the in-memory maps from what is left
+            kept = [e for name, e in self._entries.items() if name in names]
+            self._entries, self._latest, self._prefixes = {}, {}, set()
+            for entry in kept:
+                self._index(entry)
+        new = [self.raw_dir / n for n in names if n not in self._entries]
+        for path in sorted(new, key=lambda p: p.stat().st_mtime):
+            try:
+                self.record(path)
+            except OSError:
+                continue
+        self._dir_mtime = mtime
+
+
+_manifests: Dict[Path, RawManifest] = {}
+_manifests_lock = threading.Lock()
+
+
+def get_manifest(raw_dir: Path = DATA_DIR) -> RawManifest:
+    """Process-wide manifest for ``raw_dir``."""
+    raw_dir = Path(raw_dir).resolve()
+    with _manifests_lock:
+        if raw_dir not in _manifests:
+            _manifests[raw_dir] = RawManifest(raw_dir)
+        return _manifests[raw_dir]
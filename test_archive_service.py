@@ -0,0 +1,83 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.services import archive_service
+from src.services.metrics.metrics_service import market_history
+from src.utils.jsonl import write_snapshot
+
+
+def item(keyword, price, seller, rating=None):
+    return {"timestamp": "2025-01-01T10:00:00+00:00", "source": "mercadolivre_api", "search_keyword": keyword,
+            "title": f"{keyword} {seller}", "price": price, "seller_name": seller, "rating": rating}
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.raw = Path(tmp.name) / "raw"
+        self.archive = Path(tmp.name) / "archive"
+        self.raw.mkdir()
+        # Legacy pretty-printed file and a JSONL snapshot on another day
+        (self.raw / "mercado_livre-20250101T100000Z.json").write_text(json.dumps([
+            item("fone", 100, "a", 4.0), item("fone", 200, "b"), item("mouse", "n/a", "a"),
+        ]), encoding="utf-8")
+        write_snapshot("mercado_livre", [item("fone", 90, "a", 5.0), item("fone", 110, "a", 3.0)],
+                       raw_dir=self.raw, timestamp="20250202T100000Z")
+        write_snapshot("amazon", [{"search_keyword": "fone", "price": 150, "is_prime": True}],
+                       raw_dir=self.raw, timestamp="20250202T110000Z")
+
+    def compact(self, fmt="columns"):
+        return archive_service.compact(self.raw, self.archive, fmt=fmt)
+
+    def test_compaction_is_partitioned_and_incremental(self):
+        parts = self.compact()
+        self.assertEqual(sorted(p.relative_to(self.archive).as_posix() for p in parts), [
+            "source=amazon/date=2025-02-02/20250202T110000Z.cols",
+            "source=mercado_livre/date=2025-01-01/20250101T100000Z.cols",
+            "source=mercado_livre/date=2025-02-02/20250202T100000Z.cols",
+        ])
+        self.assertEqual(self.compact(), [])
+
+    def test_scan_reads_only_requested_columns_and_partitions(self):
+        self.compact()
+        opened = []
+        real_read = archive_service._read_part
+
+        def spy(path, columns):
+            opened.append((path.name, tuple(columns)))
+            return real_read(path, columns)
+
+        with mock.patch.object(archive_service, "_read_part", spy):
+            cols = archive_service.scan(["date", "price"], sources=["mercado_livre"], start="2025-01-15",
+                                        archive_dir=self.archive)
+        self.assertEqual(cols, {"date": ["2025-02-02", "2025-02-02"], "price": [90.0, 110.0]})
+        self.assertEqual(opened, [("20250202T100000Z.cols", ("price",))])
+
+        cols = archive_service.scan(["source", "price", "is_prime"], where=lambda r: r["price"] is None,
+                                    archive_dir=self.archive)
+        self.assertEqual(cols, {"source": ["mercado_livre"], "price": [None], "is_prime": [None]})
+        with self.assertRaises(ValueError):
+            archive_service.scan(["nope"], archive_dir=self.archive)
+
+    def test_market_history(self):
+        self.compact()
+        history = market_history("Fone", sources=["mercado_livre"], archive_dir=self.archive)
+        self.assertEqual([(h["date"], h["items"], h["median_price"], h["avg_rating"]) for h in history],
+                         [("2025-01-01", 2, 150.0, 4.0), ("2025-02-02", 2, 100.0, 4.0)])
+        self.assertEqual(history[1]["concentration"], 1.0)
+
+    @unittest.skipUnless(archive_service.HAS_PYARROW, "pyarrow not installed")
+    def test_parquet_parts_match_column_parts(self):
+        self.compact("parquet")
+        parquet = archive_service.scan(list(archive_service.COLUMNS), archive_dir=self.archive)
+        self.archive = self.archive.with_name("archive_cols")
+        self.compact("columns")
+        self.assertEqual(archive_service.scan(list(archive_service.COLUMNS), archive_dir=self.archive), parquet)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.database import database
+from src.database.patch import PostgreSQLAdapter
+
+
+class DatabaseTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_path = database.DB_PATH
+        database.close_pool()
+        database.DB_PATH = Path(self.tmp.name) / "radar.db"
+        database.init_db()
+
+    def tearDown(self):
+        database.close_pool()
+        database.DB_PATH = self.old_path
+        self.tmp.cleanup()
+
+    def count(self, table):
+        with database.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            return cursor.fetchone()[0]
+
+
+class TestUpsertProductsBulk(DatabaseTestCase):
+    def page(self, price=10.0):
+        return [
+            {"marketplace": "Mercado Livre", "title": f"Fone {i}", "permalink": f"https://ml/{i}", "price": price + i}
+            for i in range(5)
+        ]
+
+    def test_matches_single_row_upsert(self):
+        ids = database.upsert_products_bulk(self.page(), "fone")
+        self.assertEqual(len(set(ids)), 5)
+        self.assertEqual(self.count("products"), 5)
+        self.assertEqual(self.count("price_history"), 5)
+        self.assertEqual(self.count("scan_logs"), 5)
+
+        # Second page updates prices instead of duplicating products
+        again = database.upsert_products_bulk(self.page(price=20.0), "fone")
+        self.assertEqual(ids, again)
+        self.assertEqual(database.upsert_product(self.page(price=20.0)[0], "fone"), ids[0])
+        self.assertEqual(self.count("products"), 5)
+        self.assertEqual(self.count("price_history"), 11)
+
+        with database.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT current_price FROM products WHERE id = ?", (ids[4],))
+            self.assertEqual(cursor.fetchone()[0], 24.0)
+
+    def test_id_lookup_fits_old_sqlite_variable_limit(self):
+        with database.connection() as conn:
+            # Same cap as SQLite < 3.32; the pooled connection is reused below
+            conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, database.SQLITE_MAX_VARIABLES)
+        items = [{"marketplace": "Mercado Livre", "title": f"Fone {i}", "permalink": f"https://ml/{i}", "price": 10.0}
+                 for i in range(1200)]
+        ids = database.upsert_products_bulk(items, "fone")
+        self.assertEqual(len(set(ids)), 1200)
+
+    def test_skips_invalid_and_keeps_alignment(self):
+        items = [{"title": "Sem link"}, self.page()[0], {"permalink": "https://ml/x"}]
+        ids = database.upsert_products_bulk(items, "fone")
+        self.assertEqual(ids[0], 0)
+        self.assertGreater(ids[1], 0)
+        self.assertEqual(ids[2], 0)
+        self.assertEqual(self.count("scan_logs"), 1)
+
+    def test_duplicate_urls_in_page(self):
+        page = self.page()
+        ids = database.upsert_products_bulk(page + page[:2], "fone")
+        self.assertEqual(ids[5:], ids[:2])
+        self.assertEqual(self.count("products"), 5)
+        self.assertEqual(self.count("scan_logs"), 7)
+
+
+class TestOpportunityBulk(DatabaseTestCase):
+    def opp(self, keyword, score, cluster="Fones"):
+        return {"keyword": keyword, "score": score, "signals": {"v2_score": score},
+                "meta": {"cluster": cluster, "price": "R$ 10"}, "scoring_breakdown": {"IndiceLacunaOferta": 0.5}}
+
+    def test_cluster_lookup_picks_latest(self):
+        database.save_cluster({"cluster_name": "Fones"})
+        newest = database.save_cluster({"cluster_name": "Fones"})
+        other = database.save_cluster({"cluster_name": "Cadeiras"})
+        ids = database.get_cluster_ids_by_names(["Fones", "Cadeiras", "Missing", None])
+        self.assertEqual(ids, {"Fones": newest, "Cadeiras": other})
+        self.assertEqual(database.get_cluster_id_by_name("Fones"), newest)
+
+    def test_bulk_upsert_returns_id_map(self):
+        cid = database.save_cluster({"cluster_name": "Fones"})
+        entries = [(self.opp(f"fone {i}", i), cid) for i in range(1200)]  # Spans several chunks
+        id_map = database.save_opportunities_bulk(entries)
+        self.assertEqual(len(id_map), 1200)
+        self.assertEqual(self.count("opportunities"), 1200)
+
+        # Re-run updates in place and keeps ids stable
+        again = database.save_opportunities_bulk([(self.opp("fone 3", 99.0), cid)])
+        self.assertEqual(again, {"fone 3": id_map["fone 3"]})
+        self.assertEqual(database.save_opportunity(self.opp("fone 3", 98.0), cid), id_map["fone 3"])
+        ranking = database.get_latest_ranking(limit=1)
+        self.assertEqual(ranking[0]["keyword"], "fone 1199")
+        self.assertEqual(ranking[0]["cluster_name"], "Fones")
+
+
+
+class TestTermHistorySnapshots(DatabaseTestCase):
+    def test_bulk_snapshot_single_transaction(self):
+        written = database.add_term_history_snapshots([(f"fone {i}", 1.0) for i in range(1500)], source="test")
+        self.assertEqual(written, 1500)
+        self.assertEqual(self.count("search_term_history"), 1500)
+        self.assertEqual(database.get_term_history("fone 7", metric_type="occurrence_rank")[0]["metric_value"], 1.0)
+
+    def test_ddl_runs_once_per_db(self):
+        database.add_term_history_snapshot("fone", 1.0)
+        statements = []
+        with database.connection() as conn:
+            conn.set_trace_callback(statements.append)
+        database.add_term_history_snapshots([("fone", 2.0), ("mouse", 1.0)])
+        self.assertFalse([sql for sql in statements if "CREATE TABLE" in sql])
+        self.assertEqual(self.count("search_term_history"), 3)
+
+    def test_postgres_uses_copy(self):
+        raw = mock.MagicMock()
+        adapter = PostgreSQLAdapter(raw)
+        cursor = adapter.cursor()
+        rows = [("fone", "test", 1.0, "occurrence", None)]
+        database._copy_rows(adapter, cursor, "search_term_history", database._TERM_HISTORY_COLUMNS, rows)
+
+        sql, buf = raw.cursor.return_value.copy_expert.call_args[0]
+        self.assertTrue(sql.startswith("COPY search_term_history (term, source, metric_value, metric_type, captured_at) FROM STDIN"))
+        self.assertEqual(buf.getvalue().strip(), "fone,test,1.0,occurrence,")
+
+
+if __name__ == '__main__':
+    unittest.main()
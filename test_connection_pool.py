@@ -0,0 +1,121 @@
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from src.database import database
+from src.database.pool import ConnectionPool, PoolExhaustedError
+
+
+class FakeConn:
+    def __init__(self):
+        self.closed = False
+        self.rollbacks = 0
+        self.broken = False
+
+    def cursor(self):
+        if self.broken:
+            raise sqlite3.OperationalError("server closed the connection")
+        return sqlite3.connect(":memory:").cursor()
+
+    def rollback(self):
+        if self.broken:
+            raise sqlite3.OperationalError("server closed the connection")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPool(unittest.TestCase):
+    def test_reuses_released_connection(self):
+        created = []
+        pool = ConnectionPool(lambda: created.append(FakeConn()) or created[-1], max_size=2)
+
+        with pool.connection() as c1:
+            pass
+        with pool.connection() as c2:
+            pass
+
+        self.assertIs(c1, c2)
+        self.assertEqual(len(created), 1)
+        self.assertEqual(c1.rollbacks, 2)  # Rolled back on every release
+
+    def test_bounded_and_times_out(self):
+        pool = ConnectionPool(FakeConn, max_size=1, acquire_timeout=0.05)
+        conn = pool.acquire()
+        with self.assertRaises(PoolExhaustedError):
+            pool.acquire()
+        pool.release(conn)
+        self.assertIs(pool.acquire(), conn)
+
+    def test_waiter_gets_connection_from_other_thread(self):
+        pool = ConnectionPool(FakeConn, max_size=1, acquire_timeout=2)
+        conn = pool.acquire()
+        got = []
+        t = threading.Thread(target=lambda: got.append(pool.acquire()))
+        t.start()
+        time.sleep(0.05)
+        pool.release(conn)
+        t.join(1)
+        self.assertEqual(got, [conn])
+
+    def test_idle_eviction(self):
+        pool = ConnectionPool(FakeConn, max_size=2, idle_timeout=0.01)
+        first = pool.acquire()
+        pool.release(first)
+        time.sleep(0.03)
+        second = pool.acquire()
+        self.assertIsNot(first, second)
+        self.assertTrue(first.closed)
+
+    def test_broken_connection_replaced_after_health_check(self):
+        pool = ConnectionPool(FakeConn, max_size=1, health_check_after=0)
+        first = pool.acquire()
+        pool.release(first)
+        first.broken = True
+        second = pool.acquire()
+        self.assertIsNot(first, second)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()["in_use"], 1)
+
+
+class TestDatabaseHelpersUsePool(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_path = database.DB_PATH
+        database.close_pool()
+        database.DB_PATH = Path(self.tmp.name) / "radar.db"
+        database.init_db()
+
+    def tearDown(self):
+        database.close_pool()
+        database.DB_PATH = self.old_path
+        self.tmp.cleanup()
+
+    def test_helpers_share_one_connection(self):
+        database.set_config("ml_token", "abc")
+        self.assertEqual(database.get_config("ml_token"), "abc")
+        database.upsert_product({"marketplace": "ML", "title": "Fone", "url": "http://x/1", "price": 10.0}, "fone")
+        stats = database.get_pool().stats()
+        self.assertEqual(stats["in_use"], 0)
+        self.assertEqual(stats["idle"], 1)
+
+    def test_transaction_commits_or_rolls_back(self):
+        with database.transaction() as conn:
+            conn.cursor().execute("INSERT INTO system_configs (key, value) VALUES (?, ?)", ("a", "1"))
+            conn.cursor().execute("INSERT INTO system_configs (key, value) VALUES (?, ?)", ("b", "2"))
+
+        with self.assertRaises(RuntimeError):
+            with database.transaction() as conn:
+                conn.cursor().execute("INSERT INTO system_configs (key, value) VALUES (?, ?)", ("c", "3"))
+                raise RuntimeError("boom")
+
+        self.assertEqual(database.get_config("b"), "2")
+        self.assertIsNone(database.get_config("c"))
+
+
+if __name__ == '__main__':
+    unittest.main()
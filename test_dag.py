@@ -0,0 +1,97 @@
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from src.utils.dag import Stage, StageGraph, critical_path, run_graph, save_run_timings
+
+
+def sleeper(seconds, ok=True, log=None, name=None):
+    def run(ctx):
+        if log is not None:
+            log.append(("start", name))
+        time.sleep(seconds)
+        if log is not None:
+            log.append(("end", name))
+        return ok
+    return run
+
+
+class TestStageGraph(unittest.TestCase):
+    def test_dependencies_come_from_artifacts(self):
+        graph = StageGraph([
+            Stage("score", sleeper(0), inputs=("products", "clusters")),
+            Stage("products", sleeper(0), outputs=("products",)),
+            Stage("clusters", sleeper(0), inputs=("signals", "external"), outputs=("clusters",)),
+            Stage("signals", sleeper(0), outputs=("signals",)),
+        ])
+        self.assertEqual(graph.deps["score"], ["clusters", "products"])
+        self.assertEqual(graph.deps["clusters"], ["signals"])  # "external" has no producer
+        self.assertLess(graph.order.index("signals"), graph.order.index("clusters"))
+
+    def test_rejects_cycles_and_duplicate_producers(self):
+        with self.assertRaises(ValueError):
+            StageGraph([Stage("a", sleeper(0), inputs=("y",), outputs=("x",)),
+                        Stage("b", sleeper(0), inputs=("x",), outputs=("y",))])
+        with self.assertRaises(ValueError):
+            StageGraph([Stage("a", sleeper(0), outputs=("x",)), Stage("b", sleeper(0), outputs=("x",))])
+
+
+class TestRunGraph(unittest.TestCase):
+    def test_independent_stages_run_concurrently(self):
+        graph = StageGraph([Stage(f"s{i}", sleeper(0.2), outputs=(f"o{i}",)) for i in range(4)]
+                           + [Stage("join", sleeper(0), inputs=("o0", "o1", "o2", "o3"))])
+        start = time.perf_counter()
+        results = run_graph(graph, max_workers=4)
+        self.assertLess(time.perf_counter() - start, 0.6)
+        self.assertTrue(all(r.status == "ok" for r in results.values()))
+        self.assertGreaterEqual(results["join"].started, max(results[f"s{i}"].finished for i in range(4)))
+
+    def test_dependent_starts_when_its_inputs_are_ready(self):
+        log = []
+        graph = StageGraph([
+            Stage("slow", sleeper(0.3, log=log, name="slow"), outputs=("products",)),
+            Stage("signals", sleeper(0.05, log=log, name="signals"), outputs=("signals",)),
+            Stage("cluster", sleeper(0, log=log, name="cluster"), inputs=("signals",), outputs=("clusters",)),
+        ])
+        run_graph(graph, max_workers=3)
+        self.assertLess(log.index(("start", "cluster")), log.index(("end", "slow")))
+
+    def test_failures_skip_dependents_unless_optional(self):
+        graph = StageGraph([
+            Stage("broken", sleeper(0, ok=False), outputs=("a",)),
+            Stage("needs_a", sleeper(0), inputs=("a",), outputs=("b",)),
+            Stage("needs_b", sleeper(0), inputs=("b",)),
+            Stage("flaky", lambda ctx: 1 / 0, outputs=("c",), optional=True),
+            Stage("needs_c", sleeper(0), inputs=("c",)),
+        ])
+        results = run_graph(graph)
+        self.assertEqual({n: r.status for n, r in results.items()}, {
+            "broken": "failed", "needs_a": "skipped", "needs_b": "skipped",
+            "flaky": "failed", "needs_c": "ok",
+        })
+        self.assertIn("ZeroDivisionError", results["flaky"].error)
+
+    def test_critical_path_and_persistence(self):
+        graph = StageGraph([
+            Stage("fast", sleeper(0.01), outputs=("x",)),
+            Stage("slow", sleeper(0.15), outputs=("y",)),
+            Stage("join", sleeper(0.01), inputs=("x", "y")),
+        ])
+        results = run_graph(graph)
+        self.assertEqual(critical_path(graph, results), ["slow", "join"])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "runs.jsonl"
+            save_run_timings(graph, results, path=path)
+            save_run_timings(graph, results, path=path)
+            lines = path.read_text(encoding="utf-8").splitlines()
+        self.assertEqual(len(lines), 2)
+        record = json.loads(lines[0])
+        self.assertEqual(record["critical_path"], ["slow", "join"])
+        self.assertGreaterEqual(record["critical_path_time"], 0.15)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import json
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.utils.embedded_json import embedded_titles, json_ld_blocks, preloaded_state
+from src.utils.html_parser import parse_html
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[0] / "sources"))
+import ml_trends  # noqa: E402
+
+LD_PAGE = """<html><head>
+<script type="application/ld+json">{"@type": "ItemList", "itemListElement": [
+  {"name": "Fone X"}, {"item": {"name": "Fone Y"}}]}</script>
+<script type='application/ld+json'>[{"@type": "Product", "name": "Fone Z"}, {"@type": "BreadcrumbList"}]</script>
+<script type="application/ld+json">{broken</script>
+</head><body><div class="ui-search-result__wrapper"><h2>Fone X</h2></div></body></html>"""
+
+STATE = {"initialState": {"results": [
+    {"id": "MLB1", "title": "Air Fryer 4L", "permalink": "https://ml/1", "price": {"amount": 300}},
+    {"polycard": {"components": [{"type": "title", "title": {"text": "Cafeteira Expresso"}}]}},
+    {"title": "Só um banner"},
+    {"title": "Ofertas", "url": "/ofertas"},
+    {"breadcrumb": [{"title": "Eletrodomésticos", "url": "/c/eletro"}]},
+]}}
+STATE_PAGE = ("<html><body><script>window.__PRELOADED_STATE__ = " + json.dumps(STATE)
+              + ";\nwindow.other = 1;</script><p>é</p></body></html>").encode("utf-8")
+SCRIPT_ID_PAGE = ('<script id="__NEXT_DATA__" type="application/json">' + json.dumps(STATE) + "</script>").encode("utf-8")
+DOM_ONLY_PAGE = b'<div class="ui-search-result__wrapper"><h2 class="ui-search-item__title">Fone X</h2></div>'
+
+
+class TestEmbeddedJson(unittest.TestCase):
+    def test_json_ld_blocks_match_the_dom(self):
+        blocks = json_ld_blocks(LD_PAGE)
+        self.assertEqual(blocks, parse_html(LD_PAGE, backend="html.parser").json_ld())
+        self.assertEqual([b["@type"] for b in blocks], ["ItemList", "Product", "BreadcrumbList"])
+
+    def test_preloaded_state(self):
+        self.assertEqual(preloaded_state(STATE_PAGE), STATE)
+        self.assertEqual(preloaded_state(SCRIPT_ID_PAGE), STATE)
+        self.assertIsNone(preloaded_state(DOM_ONLY_PAGE))
+
+    def test_embedded_titles(self):
+        self.assertEqual(embedded_titles(LD_PAGE), ["Fone X", "Fone Y", "Fone Z"])
+        self.assertEqual(embedded_titles(STATE_PAGE), ["Air Fryer 4L", "Cafeteira Expresso"])
+        self.assertEqual(embedded_titles(DOM_ONLY_PAGE), [])
+
+    def test_links_with_a_title_are_not_listings(self):
+        nav = {"menu": [{"title": "Ofertas", "url": "/ofertas"}, {"title": "Moda", "url": "/moda"}]}
+        page = ("<script>window.__PRELOADED_STATE__ = " + json.dumps(nav) + ";</script>").encode("utf-8")
+        self.assertEqual(embedded_titles(page), [])  # -> the scrapers fall back to the DOM
+
+    def test_scraper_builds_a_dom_only_on_a_miss(self):
+        for body, expected, parsed in ((STATE_PAGE, ["Air Fryer 4L"], False), (DOM_ONLY_PAGE, ["Fone X"], True)):
+            resp = mock.Mock(content=body, text=body.decode("utf-8"))
+            with mock.patch.object(ml_trends, "cached_get", return_value=resp), \
+                    mock.patch.object(ml_trends, "parse_html", wraps=ml_trends.parse_html) as parse:
+                self.assertEqual(ml_trends.scrape_listing("https://lista.ml/x", limit=1), expected)
+                self.assertEqual(parse.called, parsed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+from src.utils.html_parser import BACKENDS, JSON_LD, parse_html, strainer
+
+PAGE = """<html><head>
+<script>var noise = "<div class='card'>fake</div>";</script>
+<script type="application/ld+json">{"@type": "Product", "name": "Fone X", "offers": {"price": "99.90"}}</script>
+<script type="application/ld+json">[{"@type": "BreadcrumbList"}, {"@type": "Organization"}]</script>
+<script type="application/ld+json">{invalid</script>
+</head><body>
+<nav><div class="menu"><a href="/x">Menu</a></div></nav>
+<div class="card promo" data-id="1"><h2 class="title"> Fone  X </h2><span class="price">99</span>
+  <a href="/p/1">ver</a><span>Frete grátis</span></div>
+<div class="card" data-id="2"><h3>Fone Y</h3><span class="price">120</span></div>
+</body></html>"""
+
+
+def extract(doc):
+    return [
+        {
+            "title": card.first("h2.title", "h3").text(),
+            "price": card.select_one("span.price").text(),
+            "link": (card.select_one("a[href]") or card).get("href"),
+            "id": card.get("data-id"),
+            "shipping": next((t for t in card.strings() if "frete" in t.lower()), None),
+        }
+        for card in doc.select("div.card")
+    ]
+
+
+class TestHtmlParser(unittest.TestCase):
+    def test_backends_extract_the_same(self):
+        expected = [
+            {"title": "Fone  X", "price": "99", "link": "/p/1", "id": "1", "shipping": "Frete grátis"},
+            {"title": "Fone Y", "price": "120", "link": None, "id": "2", "shipping": None},
+        ]
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                self.assertEqual(extract(parse_html(PAGE, backend=backend)), expected)
+                self.assertEqual(extract(parse_html(PAGE, only=["div.card"], backend=backend)), expected)
+
+    def test_partial_parse_drops_everything_else(self):
+        for backend in ("lxml", "html.parser"):
+            if backend not in BACKENDS:
+                continue
+            doc = parse_html(PAGE, only=["div.card"], backend=backend)
+            self.assertEqual(doc.select("nav"), [])
+            self.assertEqual(doc.select(JSON_LD), [])
+            self.assertEqual(len(doc.select("div.card")), 2)
+
+    def test_json_ld_blocks(self):
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                blocks = parse_html(PAGE, only=[JSON_LD], backend=backend).json_ld()
+                self.assertEqual([b["@type"] for b in blocks], ["Product", "BreadcrumbList", "Organization"])
+
+    def test_strainer_selectors(self):
+        match = strainer(['div[data-id="2"]', "span.price"]).name
+        self.assertTrue(match("div", {"data-id": "2"}))
+        self.assertFalse(match("div", {"data-id": "1"}))
+        self.assertTrue(match("span", {"class": ["price", "big"]}))
+        self.assertFalse(match("div", {"class": "price"}))
+        with self.assertRaises(ValueError):
+            strainer(["div > span"])
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            parse_html(PAGE, backend="html5lib")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import tempfile
+import time
+import unittest
+
+import requests
+
+from src.utils.http_cache import HttpCache, cached_get, is_blocked
+
+
+def make_response(status, body=b"", headers=None, url="https://api.test/x"):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = body
+    resp.headers = requests.structures.CaseInsensitiveDict(headers or {})
+    resp.url = url
+    resp.encoding = "utf-8"
+    return resp
+
+
+class FakeSession:
+    """Serves one body with an ETag and honours If-None-Match with a 304."""
+
+    def __init__(self, body=b'{"ok": true}', etag='"v1"', cache_control=None):
+        self.body = body
+        self.etag = etag
+        self.cache_control = cache_control
+        self.calls = []
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        self.calls.append({"url": url, "params": params, "headers": headers or {}})
+        if (headers or {}).get("If-None-Match") == self.etag:
+            return make_response(304, url=url)
+        headers = {"ETag": self.etag, "Content-Type": "application/json"}
+        if self.cache_control:
+            headers["Cache-Control"] = self.cache_control
+        return make_response(200, self.body, headers, url)
+
+
+class TestHttpCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = HttpCache(self.tmp.name)
+        self.session = FakeSession()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fresh_entry_is_served_without_network(self):
+        first = cached_get(self.session, "https://api.test/x", cache=self.cache, ttl=60)
+        second = cached_get(self.session, "https://api.test/x", cache=self.cache, ttl=60)
+
+        self.assertEqual(len(self.session.calls), 1)
+        self.assertEqual(second.json(), first.json())
+        self.assertTrue(second.from_cache)
+        self.assertEqual(self.cache.stats["hits"], 1)
+
+    def test_stale_entry_is_revalidated_with_etag(self):
+        cached_get(self.session, "https://api.test/x", cache=self.cache, ttl=0)
+        resp = cached_get(self.session, "https://api.test/x", cache=self.cache, ttl=0)
+
+        self.assertEqual(self.session.calls[1]["headers"]["If-None-Match"], '"v1"')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {"ok": True})
+        self.assertEqual(self.cache.stats["revalidated"], 1)
+
+    def test_params_are_part_of_the_key(self):
+        cached_get(self.session, "https://api.test/x", params={"q": "a"}, cache=self.cache, ttl=60)
+        cached_get(self.session, "https://api.test/x", params={"q": "b"}, cache=self.cache, ttl=60)
+        cached_get(self.session, "https://api.test/x", params={"q": "a"}, cache=self.cache, ttl=60)
+
+        self.assertEqual(len(self.session.calls), 2)
+
+    def test_errors_are_not_cached(self):
+        class FailingSession(FakeSession):
+            def get(self, url, **kwargs):
+                self.calls.append(url)
+                return make_response(404, url=url)
+
+        session = FailingSession()
+        cached_get(session, "https://api.test/missing", cache=self.cache, ttl=60)
+        cached_get(session, "https://api.test/missing", cache=self.cache, ttl=60)
+        self.assertEqual(len(session.calls), 2)
+
+    def test_captcha_pages_are_not_cached(self):
+        session = FakeSession(body=b'<html><form action="/errors/validateCaptcha">Type the characters you see')
+        cached_get(session, "https://www.amazon.test/s", cache=self.cache, ttl=60)
+        cached_get(session, "https://www.amazon.test/s", cache=self.cache, ttl=60)
+        self.assertEqual(len(session.calls), 2)
+        self.assertFalse(is_blocked(make_response(200, b"<html>Fone Bluetooth</html>")))
+
+    def test_custom_validator_rejects_responses(self):
+        session = FakeSession(body=b"[]")
+        for _ in range(2):
+            cached_get(session, "https://api.test/x", cache=self.cache, ttl=60, validate=lambda r: r.content != b"[]")
+        self.assertEqual(len(session.calls), 2)
+
+    def test_cache_control_is_honoured(self):
+        no_store = FakeSession(cache_control="private, no-store")
+        for _ in range(2):
+            cached_get(no_store, "https://api.test/private", cache=self.cache, ttl=60)
+        self.assertEqual(len(no_store.calls), 2)
+
+        short = FakeSession(cache_control="max-age=0")
+        for _ in range(2):
+            cached_get(short, "https://api.test/short", cache=self.cache, ttl=60)
+        # max-age caps the source TTL: the second call revalidates
+        self.assertEqual(len(short.calls), 2)
+        self.assertEqual(short.calls[1]["headers"].get("If-None-Match"), '"v1"')
+
+    def test_lru_eviction_respects_max_bytes(self):
+        cache = HttpCache(self.tmp.name, max_bytes=3000)
+        session = FakeSession(body=b"x" * 1000)
+        for name in ("a", "b"):
+            cached_get(session, f"https://api.test/{name}", cache=cache, ttl=60)
+        time.sleep(0.01)
+        cached_get(session, "https://api.test/a", cache=cache, ttl=60)  # a becomes most recent
+        cached_get(session, "https://api.test/c", cache=cache, ttl=60)
+
+        self.assertIsNone(cache.get(cache.make_key("https://api.test/b")))
+        self.assertIsNotNone(cache.get(cache.make_key("https://api.test/a")))
+        self.assertIsNotNone(cache.get(cache.make_key("https://api.test/c")))
+
+    def test_index_is_rebuilt_from_disk(self):
+        cached_get(self.session, "https://api.test/x", cache=self.cache, ttl=60)
+        reopened = HttpCache(self.tmp.name)
+        cached_get(self.session, "https://api.test/x", cache=reopened, ttl=60)
+        self.assertEqual(len(self.session.calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
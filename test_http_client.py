@@ -0,0 +1,64 @@
+import threading
+import time
+import unittest
+
+from src.utils.http_client import HostRateLimiter, TokenBucket, get_with_retry, parse_retry_after
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeSession:
+    def __init__(self, statuses, retry_after="0.05"):
+        self.statuses = list(statuses)
+        self.retry_after = retry_after
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(time.monotonic())
+        status = self.statuses.pop(0)
+        return FakeResponse(status, {"Retry-After": self.retry_after} if status == 429 else {})
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_rate_is_enforced_across_threads(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        threads = [threading.Thread(target=bucket.acquire) for _ in range(6)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        # First token is free, the other 5 need 5/50 = 0.1s
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_limiter_keeps_hosts_independent(self):
+        limiter = HostRateLimiter(default_rate=1)
+        self.assertIs(limiter.bucket("https://a.com/x"), limiter.bucket("https://a.com/y"))
+        self.assertIsNot(limiter.bucket("https://a.com/x"), limiter.bucket("https://b.com/x"))
+
+
+class TestRetryAfter(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_retry_after("3", 1.0), 3.0)
+        self.assertEqual(parse_retry_after(None, 1.5), 1.5)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", 1.0), 0.0)  # In the past
+        self.assertEqual(parse_retry_after("garbage", 2.0), 2.0)
+
+    def test_429_is_retried_after_delay(self):
+        session = FakeSession([429, 429, 200])
+        resp = get_with_retry(session, "https://api.test/search", HostRateLimiter(default_rate=100))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(session.calls), 3)
+        self.assertGreaterEqual(session.calls[1] - session.calls[0], 0.045)
+
+    def test_gives_up_after_max_retries(self):
+        session = FakeSession([429, 429], retry_after="0")
+        resp = get_with_retry(session, "https://api.test/search", max_retries=1)
+        self.assertEqual(resp.status_code, 429)
+        self.assertEqual(len(session.calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import unittest
+from unittest import mock
+
+from src.database import database
+from src.services.ai_processor import AIProcessor
+from src.services.llm_clustering import ClusterIndex, incremental_clusters
+from test_bulk_writes import DatabaseTestCase
+
+FONES = {"cluster_name": "Fone Corrida", "validated_products": ["fone bluetooth corrida", "fone esporte"],
+         "source_signals_used": ["fone para correr"], "confidence_score": 80,
+         "price_range_brl": {"min": 80, "max": 200}}
+GARRAFAS = {"cluster_name": "Garrafa Térmica", "validated_products": ["garrafa termica 1l"], "confidence_score": 60}
+
+
+class FakeModel:
+    """Clusters whatever it receives: fone terms extend the known cluster, the rest is new."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, terms):
+        self.calls.append(list(terms))
+        fones = [t for t in terms if t.startswith("fone")]
+        others = [t for t in terms if not t.startswith("fone")]
+        clusters = []
+        if fones:
+            clusters.append({"cluster_name": "Fone Corrida", "validated_products": fones, "confidence_score": 90,
+                             "price_range_brl": {"min": 50, "max": 150}})
+        if others:
+            clusters.append({"cluster_name": "Mochila Hidratação", "validated_products": others, "confidence_score": 70})
+        return clusters
+
+
+class TestIncrementalClusters(unittest.TestCase):
+    def test_index_splits_known_and_novel(self):
+        index = ClusterIndex([FONES, GARRAFAS])
+        known, novel = index.split(["Fone  Esporte", "fone para correr", "garrafa termica 1l", "mochila hidratação"])
+        self.assertEqual(known, {0: ["Fone  Esporte", "fone para correr"], 1: ["garrafa termica 1l"]})
+        self.assertEqual(novel, ["mochila hidratação"])
+
+    def test_index_fields_can_exclude_source_names(self):
+        legacy = dict(GARRAFAS, source_signals_used=["autocomplete", "internal_trends"])
+        self.assertEqual(ClusterIndex([legacy]).lookup("autocomplete"), 0)
+        index = ClusterIndex([legacy], fields=("cluster_name", "validated_products"))
+        self.assertIsNone(index.lookup("autocomplete"))
+        self.assertEqual(index.lookup("Garrafa Térmica"), 0)
+
+    def test_only_novel_signals_reach_the_model(self):
+        model = FakeModel()
+        signals = ["fone esporte", "garrafa termica 1l", "fone sem fio corrida", "mochila hidratação"]
+        active, updated, created = incremental_clusters(signals, [dict(FONES), dict(GARRAFAS)], model)
+
+        self.assertEqual(model.calls, [["fone sem fio corrida", "mochila hidratação"]])
+        self.assertEqual([c["cluster_name"] for c in active], ["Fone Corrida", "Garrafa Térmica", "Mochila Hidratação"])
+        self.assertEqual(len(updated), 1)
+        fone = updated[0]
+        self.assertEqual(fone["confidence_score"], 80)  # the known cluster leads
+        self.assertEqual(fone["validated_products"], ["fone bluetooth corrida", "fone esporte", "fone sem fio corrida"])
+        self.assertEqual(fone["price_range_brl"], {"min": 50, "max": 200})
+        self.assertEqual([c["cluster_name"] for c in created], ["Mochila Hidratação"])
+
+    def test_nothing_novel_means_no_call(self):
+        model = FakeModel()
+        active, updated, created = incremental_clusters(["fone esporte"], [FONES], model)
+        self.assertEqual(model.calls, [])
+        self.assertEqual((len(active), updated, created), (1, [], []))
+
+
+class TestIncrementalAIProcessor(DatabaseTestCase):
+    def test_updates_existing_rows_and_inserts_new_ones(self):
+        fone_id = database.save_cluster(FONES)
+        model = FakeModel()
+        with mock.patch.dict(os.environ, {"LLM_CACHE_DISABLED": "1"}), \
+                mock.patch.object(AIProcessor, "_cluster", side_effect=model), \
+                mock.patch.object(AIProcessor, "_save_raw_output"):
+            processor = AIProcessor("key")
+            clusters = processor.analyze_signals(["fone esporte", "fone sem fio corrida", "mochila hidratação"],
+                                                 incremental=True)
+
+        self.assertEqual(model.calls, [["fone sem fio corrida", "mochila hidratação"]])
+        self.assertEqual(self.count("intent_clusters"), 2)
+        stored = {c["cluster_name"]: c for c in database.get_latest_clusters()}
+        self.assertEqual(stored["Fone Corrida"]["db_id"], fone_id)
+        self.assertIn("fone sem fio corrida", stored["Fone Corrida"]["validated_products"])
+        self.assertEqual(stored["Fone Corrida"]["price_range_brl"], {"min": 50, "max": 200})
+        self.assertEqual(clusters[-1]["db_id"], stored["Mochila Hidratação"]["db_id"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import io
+import unittest
+from contextlib import nullcontext, redirect_stdout
+from pathlib import Path
+from unittest import mock
+
+from src.database import database
+from src.services import pipeline_v2
+from src.utils.jsonl import RecordFile, write_records
+
+from test_bulk_writes import DatabaseTestCase
+
+
+CLUSTERS = [{"cluster_name": "Audio", "confidence_score": 80, "validated_products": ["fone", "caixa de som", "microfone"]}]
+
+
+def scraped(price=100):
+    return [
+        {"keyword": "fone", "price": price, "seller_name": "a", "rating": 4.2},
+        {"keyword": "fone", "price": 120, "seller_name": "b"},
+        {"keyword": "microfone", "price": 300, "seller_name": "c"},
+    ]
+
+
+class TestIncrementalPipeline(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        reports = Path(self.tmp.name) / "reports"
+        reports.mkdir()
+        patcher = mock.patch.object(pipeline_v2, "REPORT_DIR", reports)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_pipeline(self, ml_data, force=False):
+        batch = mock.Mock(wraps=pipeline_v2.calculate_indice_intencao_v2_batch)
+        snapshot = mock.Mock(wraps=pipeline_v2.step_1_snapshot_velocity)
+        persist = mock.Mock(wraps=pipeline_v2.step_3_persistence)
+        with mock.patch.object(pipeline_v2, "calculate_indice_intencao_v2_batch", batch), \
+             mock.patch.object(pipeline_v2, "step_1_snapshot_velocity", snapshot), \
+             mock.patch.object(pipeline_v2, "step_3_persistence", persist), \
+             redirect_stdout(io.StringIO()):
+            opps = pipeline_v2.main(ml_data=ml_data, amz_data=[], clusters=CLUSTERS, force=force)
+        rescored = [e["term"] for call in batch.call_args_list for e in call.args[0]]
+        return opps, rescored, snapshot.called, persist.called
+
+    def test_unchanged_inputs_reuse_previous_run(self):
+        first, rescored, snapshotted, persisted = self.run_pipeline(scraped())
+        self.assertEqual(sorted(rescored), ["caixa de som", "fone", "microfone"])
+        self.assertTrue(snapshotted and persisted)
+
+        again, rescored, snapshotted, persisted = self.run_pipeline(scraped())
+        self.assertEqual(rescored, [])
+        self.assertFalse(snapshotted or persisted)
+        self.assertEqual(again, first)
+
+    def test_only_changed_terms_are_rescored(self):
+        first, _, _, _ = self.run_pipeline(scraped())
+        second, rescored, snapshotted, persisted = self.run_pipeline(scraped(price=50))
+
+        self.assertEqual(rescored, ["fone"])
+        self.assertFalse(snapshotted)  # Same cluster products: no new history rows
+        self.assertTrue(persisted)
+        self.assertEqual(self.count("search_term_history"), 3)
+        by_kw = lambda opps: {o["keyword"]: o["score"] for o in opps}
+        self.assertEqual(by_kw(second)["microfone"], by_kw(first)["microfone"])
+
+        # Cached scores equal a from-scratch run
+        forced, rescored, _, _ = self.run_pipeline(scraped(price=50), force=True)
+        self.assertEqual(len(rescored), 3)
+        self.assertEqual(by_kw(forced), by_kw(second))
+
+    def test_state_loads_from_dict_rows(self):
+        # Postgres (RealDictCursor) rows only support access by column name
+        conn = mock.Mock()
+        conn.cursor.return_value.fetchone.return_value = {"value": '{"fone": "abc"}'}
+        with mock.patch.object(database, "connection", lambda: nullcontext(conn)):
+            self.assertEqual(pipeline_v2.load_state(pipeline_v2.SCORE_CACHE_KEY), {"fone": "abc"})
+
+    def test_streamed_artifact_matches_in_memory_input(self):
+        in_memory, _, _, _ = self.run_pipeline(scraped(), force=True)
+        path = Path(self.tmp.name) / "mercado_livre.jsonl.gz"
+        write_records(path, scraped())
+        streamed, rescored, _, _ = self.run_pipeline(RecordFile(path))
+
+        self.assertEqual(rescored, [])  # Same evidence per term: cached scores reused
+        self.assertEqual(streamed, in_memory)
+
+
+if __name__ == "__main__":
+    unittest.main()
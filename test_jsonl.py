@@ -0,0 +1,71 @@
+import gzip
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.utils import jsonl
+from src.utils.raw_manifest import RawManifest
+from scoring import ranker
+
+PRODUCTS = [
+    {"search_keyword": "Fone Bluetooth", "title": "Fone JBL", "price": 199.9, "permalink": "u1"},
+    {"search_keyword": "fone bluetooth", "title": "Fone QCY", "price": 99.5},
+    {"search_keyword": "mouse gamer", "title": "Mouse", "price": 0},
+    {"search_keyword": "Garrafa térmica", "title": "Garrafa", "price": 59},
+]
+CLUSTERS = [{"cluster_name": "Audio", "confidence_score": 80, "validated_products": ["fone bluetooth"]}]
+
+
+class TestJsonl(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.raw = Path(tmp.name)
+
+    def test_round_trip_every_codec(self):
+        codecs = ["", "gz"] + (["zst"] if jsonl.HAS_ZSTD else [])
+        for codec in codecs:
+            path = self.raw / f"items{jsonl.SUFFIXES[codec]}"
+            self.assertEqual(jsonl.write_records(path, iter(PRODUCTS)), len(PRODUCTS))
+            self.assertEqual(list(jsonl.iter_records(path)), PRODUCTS)
+        with gzip.open(self.raw / "items.jsonl.gz", "rt", encoding="utf-8") as fp:
+            self.assertEqual(len(fp.read().splitlines()), len(PRODUCTS))
+
+    def test_legacy_json_files(self):
+        (self.raw / "a.json").write_text(json.dumps(PRODUCTS), encoding="utf-8")
+        (self.raw / "b.json").write_text(json.dumps({"products": PRODUCTS}), encoding="utf-8")
+        self.assertEqual(jsonl.read_records(self.raw / "a.json"), PRODUCTS)
+        self.assertEqual(jsonl.read_records(self.raw / "b.json"), PRODUCTS)
+        self.assertEqual(jsonl.read_records(self.raw / "missing.json"), [])
+
+    def test_snapshot_written_once_with_latest_pointer(self):
+        first = jsonl.write_snapshot("amazon", PRODUCTS[:1], raw_dir=self.raw, timestamp="20250101T000000Z")
+        second = jsonl.write_snapshot("amazon", PRODUCTS, raw_dir=self.raw, timestamp="20250102T000000Z")
+
+        latest = jsonl.latest_path("amazon", self.raw)
+        self.assertEqual(list(jsonl.iter_records(latest)), PRODUCTS)
+        self.assertEqual({p.name for p in self.raw.iterdir() if not p.name.startswith(".")},
+                         {first.name, second.name, latest.name})
+
+        manifest = RawManifest(self.raw)
+        self.assertEqual(manifest.latest("amazon"), second)
+        self.assertEqual([e["count"] for e in manifest.entries("amazon")], [1, len(PRODUCTS)])
+        self.assertEqual(jsonl.RecordFile(second).sha256(), manifest.entries("amazon")[-1]["sha256"])
+
+    def test_ranker_streams_same_result_as_legacy_json(self):
+        legacy = self.raw / "mercado_livre-20250101T000000Z.json"
+        legacy.write_text(json.dumps(PRODUCTS), encoding="utf-8")
+        streamed = jsonl.write_snapshot("mercado_livre", PRODUCTS, raw_dir=self.raw, codec="gz")
+        clusters = self.raw / "clusters.json"
+        clusters.write_text(json.dumps(CLUSTERS), encoding="utf-8")
+
+        expected = [(o.keyword, o.signals, o.meta) for o in ranker.build_opportunities(clusters, legacy, legacy)]
+        actual = [(o.keyword, o.signals, o.meta) for o in ranker.build_opportunities(clusters, streamed, streamed)]
+        self.assertEqual(actual, expected)
+        fone = next(meta for kw, _, meta in actual if kw == "fone bluetooth")
+        self.assertEqual((fone["ml_count"], fone["ml_avg_price"], fone["url"]), (2, "R$ 149.70", "u1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import random
+import unittest
+
+from scoring.keyword_index import KeywordIndex
+
+
+def brute_force(keys, term):
+    for key in keys:
+        if key in term or term in key:
+            return key
+    return None
+
+
+class TestKeywordIndex(unittest.TestCase):
+    def test_both_directions(self):
+        index = KeywordIndex(["fone bluetooth", "mouse", "tv"])
+        self.assertEqual(index.find("fone bluetooth jbl"), "fone bluetooth")  # key in term
+        self.assertEqual(index.find("bluetooth"), "fone bluetooth")  # term in key
+        self.assertEqual(index.find("smart tv 50"), "tv")  # short key
+        self.assertEqual(index.find("ou"), "mouse")  # short term
+        self.assertIsNone(index.find("teclado"))
+
+    def test_first_inserted_wins(self):
+        index = KeywordIndex(["garrafa termica inox", "garrafa"])
+        self.assertEqual(index.find("garrafa termica"), "garrafa termica inox")
+
+    def test_matches_linear_scan_with_inserts(self):
+        rng = random.Random(11)
+        words = ["fone", "de", "ouvido", "tv", "smart", "cabo", "usb", "c", "mouse", "gamer", "led", "kit"]
+
+        def phrase():
+            return " ".join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+
+        keys = list(dict.fromkeys(phrase() for _ in range(200)))
+        index = KeywordIndex(keys)
+        for _ in range(2000):
+            term = phrase()[: rng.randint(1, 30)].strip()
+            if not term:
+                continue
+            expected = brute_force(keys, term)
+            self.assertEqual(index.find(term), expected, term)
+            if expected is None:
+                keys.append(term)
+                index.add(term)
+
+
+if __name__ == "__main__":
+    unittest.main()
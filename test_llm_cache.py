@@ -0,0 +1,68 @@
+import tempfile
+import time
+import unittest
+
+import requests
+
+from src.utils.llm_cache import LLMCache
+from src.utils.llm_client import ChatClient
+
+MESSAGES = [{"role": "system", "content": "Analyst"},
+            {"role": "user", "content": "\n        Cluster these:\n        [\"fone\", \"mouse\"]\n        "}]
+
+
+class FakeChatSession:
+    def __init__(self):
+        self.calls = 0
+
+    def post(self, url, json=None, **kwargs):
+        self.calls += 1
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = ('{"choices": [{"message": {"content": "reply %d"}}]}' % self.calls).encode()
+        return resp
+
+
+class TestLlmCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = LLMCache(self.tmp.name)
+
+    def test_key_ignores_prompt_whitespace_only(self):
+        key = LLMCache.make_key("gpt-4o-mini", 0.2, MESSAGES)
+        reindented = [MESSAGES[0], {"role": "user", "content": "Cluster   these:\n[\"fone\", \"mouse\"]"}]
+        self.assertEqual(LLMCache.make_key("gpt-4o-mini", 0.2, reindented), key)
+        self.assertNotEqual(LLMCache.make_key("gpt-4o-mini", 0.3, MESSAGES), key)
+        self.assertNotEqual(LLMCache.make_key("gpt-4o", 0.2, MESSAGES), key)
+        changed = [MESSAGES[0], {"role": "user", "content": "Cluster these: [\"fone\"]"}]
+        self.assertNotEqual(LLMCache.make_key("gpt-4o-mini", 0.2, changed), key)
+
+    def test_client_skips_the_call_on_a_hit(self):
+        client = ChatClient("key", cache=self.cache)
+        client.session = FakeChatSession()
+        self.assertEqual(client.complete(MESSAGES), "reply 1")
+        self.assertEqual(client.complete(MESSAGES), "reply 1")
+        self.assertEqual(client.complete(MESSAGES, temperature=0.9), "reply 2")
+        self.assertEqual(client.session.calls, 2)
+        self.assertEqual(self.cache.stats, {"hits": 1, "misses": 2})
+        self.assertAlmostEqual(self.cache.hit_rate(), 1 / 3)
+
+        # Survives a restart (new process, same directory)
+        self.assertEqual(LLMCache(self.tmp.name).get(LLMCache.make_key(client.model, 0.2, MESSAGES)), "reply 1")
+
+    def test_ttl_and_size_eviction(self):
+        cache = LLMCache(self.tmp.name, ttl=0.05, max_bytes=600)
+        cache.put("a", "x" * 200)
+        self.assertEqual(cache.get("a"), "x" * 200)
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("a"))
+
+        for key in "bcd":
+            cache.put(key, "y" * 200)
+        self.assertLessEqual(cache.store._total, 600)
+        self.assertIsNone(cache.store.get("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from src.services import ai_processor
+from src.services.ai_processor import AIProcessor
+from src.services.llm_clustering import _attach_sources, cluster_signals, merge_clusters, parse_clusters, signal_windows
+
+CATEGORIES = ["fone", "mouse", "cadeira", "garrafa"]
+SIGNALS = [f"{cat} modelo {i:03d}" for i in range(60) for cat in CATEGORIES]
+
+
+class StubChatServer(ThreadingHTTPServer):
+    """Chat completions stub: clusters the prompt's terms by their first word."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubChatHandler)
+        self.lock = threading.Lock()
+        self.requests = self.active = self.peak = 0
+        self.throttle_first = True
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/chat/completions"
+
+
+class StubChatHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, content, size=40):
+        """Server-sent events, like ``"stream": true`` on the real API."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for i in range(0, len(content), size):
+            event = {"choices": [{"delta": {"content": content[i:i + size]}}]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests += 1
+            throttle, server.throttle_first = server.throttle_first, False
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        try:
+            if throttle:
+                return self._send(429, {"error": "slow down"}, {"Retry-After": "0"})
+            time.sleep(0.05)
+            prompt = payload["messages"][-1]["content"]
+            terms = next(json.loads(line) for line in map(str.strip, prompt.splitlines()) if line.startswith("["))
+            groups = {}
+            for term in terms:
+                groups.setdefault(term.split()[0], []).append(term)
+            clusters = [
+                {"cluster_name": word.title(), "validated_products": found, "confidence_score": len(found),
+                 "price_range_brl": {"min": 10 * len(found), "max": 100 + len(found)}}
+                for word, found in groups.items()
+            ]
+            content = json.dumps({"clusters": clusters})
+            if payload.get("stream"):
+                return self._send_stream(content)
+            self._send(200, {"choices": [{"message": {"role": "assistant", "content": content}}]})
+        finally:
+            with server.lock:
+                server.active -= 1
+
+
+class TestLlmClustering(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {"LLM_CACHE_DISABLED": "1"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.server = StubChatServer()
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.processor = AIProcessor("test-key", endpoint=self.server.endpoint, concurrency=4, window_tokens=300)
+        self.processor.client.limiter.default_rate = 1000
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_every_signal_is_clustered_in_parallel_windows(self):
+        windows = signal_windows(SIGNALS, 300)
+        self.assertGreater(len(windows), 4)
+        self.assertEqual(sorted(t for w in windows for t in w), sorted(SIGNALS))
+
+        clusters = cluster_signals(SIGNALS, self.processor.client, self.processor.build_messages, window_tokens=300)
+
+        self.assertEqual(self.server.requests, len(windows) + 1)  # + the throttled retry
+        self.assertGreater(self.server.peak, 1)
+        self.assertEqual(sorted(c["cluster_name"] for c in clusters), sorted(w.title() for w in CATEGORIES))
+        for cluster in clusters:
+            self.assertEqual(len(cluster["validated_products"]), 60)
+            self.assertEqual(len(cluster["source_signals_used"]), 60)
+
+    def test_analyze_signals_sends_bucket_representatives(self):
+        fones = ["fone bluetooth", "fone bluetooth jbl", "fones bluetooth", "fone de ouvido bluetooth"]
+        signals = fones + ["garrafa térmica", "Garrafa Termica 1L", "mouse gamer", "mouse gamer rgb", "cadeira gamer"]
+        with mock.patch.object(ai_processor, "save_cluster") as save, \
+                mock.patch.object(AIProcessor, "_save_raw_output") as raw:
+            clusters = self.processor.analyze_signals(signals)
+
+        self.assertEqual(self.server.requests, 2)  # one window (+ the throttled retry)
+        self.assertEqual(sorted(c["cluster_name"] for c in clusters), ["Cadeira", "Fone", "Garrafa", "Mouse"])
+        fone = next(c for c in clusters if c["cluster_name"] == "Fone")
+        self.assertEqual(len(fone["validated_products"]), 1)  # only the representative was sent
+        self.assertEqual(sorted(fone["source_signals_used"]), sorted(fones))
+        self.assertEqual(save.call_count, 4)
+        raw.assert_called_once_with(clusters)
+
+
+class TestMergeClusters(unittest.TestCase):
+    def test_overlapping_products_merge_deterministically(self):
+        a = {"cluster_name": "Fone Corrida", "validated_products": ["Fone A", "fone b"], "confidence_score": 70,
+             "negative_keywords": ["capa"], "price_range_brl": {"min": 50, "max": 150}}
+        b = {"cluster_name": "Fone Esporte", "validated_products": ["fone a", "Fone C"], "confidence_score": 80,
+             "negative_keywords": ["capa", "cabo"], "price_range_brl": {"min": 80, "max": 300}}
+        c = {"cluster_name": "Garrafa Térmica", "validated_products": ["garrafa"], "confidence_score": 90}
+        for order in ([a, b, c], [c, b, a]):
+            merged = merge_clusters([dict(x) for x in order])
+            self.assertEqual([m["cluster_name"] for m in merged], ["Garrafa Térmica", "Fone Esporte"])
+            fone = merged[1]
+            self.assertEqual({p.lower() for p in fone["validated_products"]}, {"fone a", "fone b", "fone c"})
+            self.assertEqual(fone["negative_keywords"], ["capa", "cabo"])
+            self.assertEqual(fone["price_range_brl"], {"min": 50, "max": 300})
+
+    def test_sources_match_paraphrased_products_only(self):
+        window = ["air fryer 4l", "cadeira gamer", "mouse ergonomico sem fio", "mouse vertical"]
+        mouse = {"cluster_name": "Mouse Ergonômico",
+                 "validated_products": ["Mouse Ergonômico Sem Fio Bluetooth", "Mouse Vertical USB"]}
+        teclado = {"cluster_name": "Teclado Mecânico", "validated_products": ["teclado mecanico abnt2"]}
+        _attach_sources([mouse, teclado], window)
+        self.assertEqual(mouse["source_signals_used"], ["mouse ergonomico sem fio", "mouse vertical"])
+        self.assertEqual(teclado["source_signals_used"], [])
+
+    def test_parse_clusters_shapes(self):
+        cluster = {"cluster_name": "X"}
+        self.assertEqual(parse_clusters(json.dumps([cluster])), [cluster])
+        self.assertEqual(parse_clusters("```json\n" + json.dumps({"clusters": [cluster]}) + "\n```"), [cluster])
+        self.assertEqual(parse_clusters(json.dumps(cluster)), [cluster])
+        self.assertEqual(parse_clusters("{}"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import json
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from src.services.llm_clustering import cluster_signals, stream_clusters
+from src.utils.json_stream import ArrayItemParser, iter_array_items
+from src.utils.llm_cache import LLMCache
+from src.utils.llm_client import ChatClient
+
+CLUSTERS = [
+    {"cluster_name": "Fone Corrida", "validated_products": ["fone corrida", "fone [esporte]"], "confidence_score": 80},
+    {"cluster_name": "Garrafa \"Térmica\"", "validated_products": ["garrafa termica"], "confidence_score": 60},
+    {"cluster_name": "Mouse Vertical", "validated_products": ["mouse vertical"], "confidence_score": 70},
+]
+CONTENT = json.dumps({"clusters": CLUSTERS}, ensure_ascii=False)
+# Fim do primeiro cluster no texto: o servidor pausa ali até o teste liberar
+FIRST_END = CONTENT.index("}") + 1
+
+
+class StubStreamServer(ThreadingHTTPServer):
+    """SSE chat completions stub: streams CONTENT in small deltas."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubStreamHandler)
+        self.requests = 0
+        self.content = CONTENT
+        self.cut_at = None  # Close the connection here, without [DONE]
+        self.release = threading.Event()
+        self.release.set()
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/chat/completions"
+
+
+class StubStreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Chunked transfer, like the real API
+
+    def log_message(self, *args):
+        pass
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _event(self, data):
+        self._chunk(f"data: {data}\n\n".encode())
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.requests += 1
+        assert payload["stream"] is True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self._chunk(b": keep-alive\n\n")
+
+        content = server.content[:server.cut_at]
+        for i in range(0, len(content), 7):
+            if i >= FIRST_END and content == CONTENT:
+                server.release.wait(5)
+            self._event(json.dumps({"choices": [{"delta": {"content": content[i:i + 7]}}]}))
+        if server.cut_at is None:
+            self._event(json.dumps({"choices": [{"delta": {}, "finish_reason": "stop"}]}))
+            self._event("[DONE]")
+            self._chunk(b"")
+
+
+class TestArrayItemParser(unittest.TestCase):
+    def test_items_are_the_same_for_any_chunking(self):
+        for size in (1, 3, 7, len(CONTENT)):
+            chunks = [CONTENT[i:i + size] for i in range(0, len(CONTENT), size)]
+            self.assertEqual(list(iter_array_items(chunks, keys=("clusters",))), CLUSTERS, size)
+
+    def test_item_is_emitted_when_its_object_closes(self):
+        parser = ArrayItemParser(keys=("clusters",))
+        self.assertEqual(parser.feed(CONTENT[:FIRST_END - 1]), [])
+        self.assertEqual(parser.feed(CONTENT[FIRST_END - 1:FIRST_END]), [CLUSTERS[0]])
+        self.assertFalse(parser.done)
+
+    def test_truncated_and_invalid_items_are_dropped(self):
+        text = '```json\n[{"a": 1}, {bad}, 5, {"b": [2]}, {"c": "cut'
+        parser = ArrayItemParser()
+        self.assertEqual(parser.feed(text), [{"a": 1}, {"b": [2]}])
+        self.assertEqual(parser.pending, '{"c": "cut')
+        self.assertEqual(parser.feed('"}] trailing [{"x": 1}]'), [{"c": "cut"}])
+        self.assertTrue(parser.done)
+
+    def test_only_top_level_or_keyed_arrays_are_targets(self):
+        wrapped = json.dumps({"notes": [{"n": 1}], "clusters": CLUSTERS[:1], "more": [{"x": 1}]})
+        self.assertEqual(list(iter_array_items(wrapped, keys=("clusters",))), CLUSTERS[:1])
+        self.assertEqual(list(iter_array_items(json.dumps(CLUSTERS[0]), keys=("clusters",))), [])
+
+
+class TestChatStreaming(unittest.TestCase):
+    def setUp(self):
+        self.server = StubStreamServer()
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.addCleanup(self.server.release.set)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = LLMCache(tmp.name)
+        self.client = ChatClient("test-key", endpoint=self.server.endpoint, cache=self.cache)
+        self.messages = [{"role": "user", "content": "cluster these"}]
+
+    def test_first_cluster_arrives_before_the_stream_ends(self):
+        self.server.release.clear()
+        clusters = stream_clusters(self.client, self.messages)
+        self.assertEqual(next(clusters), CLUSTERS[0])  # The server is still holding the rest
+        self.server.release.set()
+        self.assertEqual(list(clusters), CLUSTERS[1:])
+
+    def test_complete_stream_is_cached(self):
+        self.assertEqual(list(stream_clusters(self.client, self.messages)), CLUSTERS)
+        self.assertEqual(list(stream_clusters(self.client, self.messages)), CLUSTERS)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.cache.stats["hits"], 1)
+
+    def test_cluster_signals_reuses_the_cached_stream(self):
+        for _ in range(2):
+            cluster_signals(["fone corrida", "garrafa termica"], self.client, lambda window: self.messages)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.cache.stats["hits"], 1)
+
+    def test_single_cluster_object_is_parsed_at_the_end(self):
+        self.server.content = json.dumps(CLUSTERS[0], ensure_ascii=False)
+        self.assertEqual(list(stream_clusters(self.client, self.messages)), CLUSTERS[:1])
+
+    def test_wrapper_with_an_earlier_array(self):
+        self.server.content = json.dumps({"notes": ["a", {"b": 1}], "clusters": CLUSTERS}, ensure_ascii=False)
+        self.assertEqual(list(stream_clusters(self.client, self.messages)), CLUSTERS)
+
+    def test_truncated_stream_keeps_completed_clusters(self):
+        self.server.cut_at = CONTENT.index("Mouse")
+        received = []
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            for cluster in stream_clusters(self.client, self.messages):
+                received.append(cluster)
+        self.assertEqual(received, CLUSTERS[:2])
+        # Sem [DONE] nada vai para o cache: a próxima chamada pede de novo
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            list(stream_clusters(self.client, self.messages))
+        self.assertEqual(self.server.requests, 2)
+
+    def test_cluster_signals_keeps_clusters_of_a_cut_window(self):
+        self.server.cut_at = CONTENT.index("Mouse")
+        clusters = cluster_signals(["fone corrida", "garrafa termica"], self.client,
+                                   lambda window: self.messages)
+        self.assertEqual([c["cluster_name"] for c in clusters], ["Fone Corrida", "Garrafa \"Térmica\""])
+        self.assertEqual(clusters[0]["source_signals_used"], ["fone corrida"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[0] / "sources"))
+from intent_signals import EXPANSIONS, MarketplaceSignals, autocomplete_queries  # noqa: E402
+
+
+class SlowAutosuggest:
+    """Answers autosuggest calls after a delay, tracking how many run at once."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay if params["q"] != "b" else self.delay * 4)  # "b" answers last
+        with self.lock:
+            self.active -= 1
+        q = params["q"]
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = json.dumps({"suggested_queries": [{"q": f"{q} pro"}, {"q": "shared term"}]}).encode()
+        return resp
+
+
+@mock.patch.dict(os.environ, {"HTTP_CACHE_DISABLED": "1"})
+class TestMarketplaceSignals(unittest.TestCase):
+    def test_expansion_modes(self):
+        self.assertEqual(autocomplete_queries(["fone", "casa"], "none"), ["fone", "casa"])
+        self.assertEqual(len(autocomplete_queries(["fone", "casa"], "alphabet", expanded_seeds=1)), 2 + 26)
+        self.assertEqual(len(EXPANSIONS["pairs"]), 26 * 26)
+        self.assertEqual(autocomplete_queries(["fone"], "sampled")[:3], ["fone", "fone a", "fone e"])
+
+    def test_fan_out_is_concurrent_and_ordered(self):
+        miner = MarketplaceSignals(concurrency=4, requests_per_second=1000)
+        miner.session = SlowAutosuggest()
+        seeds = ["a", "b", "c", "d", "e", "f", "g", "h"]
+
+        start = time.perf_counter()
+        miner.fetch_autocomplete_many(seeds)
+        elapsed = time.perf_counter() - start
+
+        self.assertGreater(miner.session.peak, 1)
+        self.assertLess(elapsed, 0.05 * len(seeds))
+        terms = [s["term"] for s in miner.signals]
+        # Seed order, not completion order; the shared term is kept once, from the first seed
+        self.assertEqual(terms, ["a pro", "shared term"] + [f"{s} pro" for s in seeds[1:]])
+        self.assertEqual(miner.signals[1]["meta"], {"seed": "a"})
+
+    def test_add_signal_is_thread_safe(self):
+        miner = MarketplaceSignals()
+        threads = [threading.Thread(target=lambda: [miner.add_signal(f"termo {i}", "t") for i in range(500)])
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(miner.signals), 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
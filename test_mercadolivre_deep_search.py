@@ -0,0 +1,97 @@
+import os
+import random
+import unittest
+from unittest import mock
+
+from src.services.mercadolivre_service import MercadoLivreService
+from src.services.metrics.metrics_service import (
+    RunningMarketStats,
+    analyze_market_concentration,
+    analyze_price_compression,
+)
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class PagedSession:
+    """Serves `total` items; seller/price pattern repeats so the sample stabilises."""
+
+    def __init__(self, total, sellers=4):
+        self.total = total
+        self.sellers = sellers
+        self.offsets = []
+
+    def get(self, url, params=None, **kwargs):
+        offset, limit = params.get("offset", 0), params["limit"]
+        self.offsets.append(offset)
+        results = [
+            {"title": f"Item {i}", "price": 100 + (i % 10), "permalink": f"https://ml/{i}",
+             "seller": {"nickname": f"seller-{i % self.sellers}"}}
+            for i in range(offset, min(offset + limit, self.total))
+        ]
+        return FakeResponse({"results": results, "paging": {"total": self.total}})
+
+
+class TestDeepSearch(unittest.TestCase):
+    def setUp(self):
+        # Paged fakes must hit the session every time, not the on-disk HTTP cache
+        env = mock.patch.dict(os.environ, {"HTTP_CACHE_DISABLED": "1"})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def service(self, session):
+        svc = MercadoLivreService(requests_per_second=1000)
+        svc.session = session
+        return svc
+
+    def test_walks_offsets_until_last_page(self):
+        session = PagedSession(total=120)
+        items = list(self.service(session).iter_products({"term": "fone"}, max_results=500, tolerance=0))
+        self.assertEqual(len(items), 120)
+        self.assertEqual(session.offsets, [0, 50, 100])
+
+    def test_respects_max_results(self):
+        session = PagedSession(total=10_000)
+        items = list(self.service(session).iter_products({"term": "fone"}, max_results=70, tolerance=0))
+        self.assertEqual(len(items), 70)
+        self.assertEqual(session.offsets, [0, 50])
+
+    def test_stops_early_when_sample_is_stable(self):
+        session = PagedSession(total=10_000)
+        items = list(self.service(session).iter_products({"term": "fone"}, max_results=1000, patience=2))
+        # Page 1 sets the baseline, pages 2 and 3 are stable -> stop
+        self.assertEqual(session.offsets, [0, 50, 100])
+        self.assertEqual(len(items), 150)
+
+    def test_is_lazy(self):
+        session = PagedSession(total=10_000)
+        stream = self.service(session).iter_products({"term": "fone"}, max_results=1000)
+        next(stream)
+        self.assertEqual(session.offsets, [0])
+
+
+class TestRunningMarketStats(unittest.TestCase):
+    def test_matches_list_metrics(self):
+        rng = random.Random(7)
+        items = [{"seller_name": f"s{rng.randint(0, 6)}", "price": rng.choice([0, rng.uniform(10, 90)])} for _ in range(200)]
+        stats = RunningMarketStats()
+        for n, item in enumerate(items, 1):
+            stats.add(item)
+            self.assertAlmostEqual(stats.concentration, analyze_market_concentration(items[:n]))
+            self.assertAlmostEqual(stats.compression, analyze_price_compression(items[:n]))
+
+
+if __name__ == '__main__':
+    unittest.main()
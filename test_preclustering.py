@@ -0,0 +1,59 @@
+import random
+import unittest
+from unittest import mock
+
+from src.services import ai_processor, preclustering
+from src.services.ai_processor import AIProcessor
+from src.services.preclustering import Bucket, bucket_signals, expand_representatives, normalize_tokens, offline_clusters
+
+SIGNALS = ["Fone Bluetooth", "fone de ouvido bluetooth", "fones bluetooth", "fone bluetooth jbl",
+           "garrafa térmica", "garrafa termica 1l", "Garrafa Térmica Inox", "mouse gamer", "mouse gamer rgb",
+           "cadeira gamer", "para", "caixa de som jbl"]
+
+
+class TestPreclustering(unittest.TestCase):
+    def test_normalize_tokens(self):
+        self.assertEqual(normalize_tokens("Garrafa Térmica para Café"), ["garrafa", "termica", "cafe"])
+        self.assertEqual(normalize_tokens("o melhor de todos"), ["todos"])
+
+    def test_buckets(self):
+        buckets = bucket_signals(SIGNALS)
+        self.assertEqual(buckets[0], Bucket("Fone Bluetooth", ["Fone Bluetooth", "fone bluetooth jbl",
+                                                               "fones bluetooth", "fone de ouvido bluetooth"]))
+        self.assertEqual(sorted(buckets[1].members), ["Garrafa Térmica Inox", "garrafa termica 1l", "garrafa térmica"])
+        together = {b.representative: b.members for b in buckets}
+        self.assertIn("mouse gamer rgb", together["mouse gamer"])
+        self.assertNotIn("cadeira gamer", together["mouse gamer"])
+        # Stopword-only signals are dropped; every other signal lands in exactly one bucket
+        members = [m for b in buckets for m in b.members]
+        self.assertEqual(sorted(members), sorted(s for s in SIGNALS if s != "para"))
+
+    @unittest.skipUnless(preclustering.HAS_NUMPY, "numpy not installed")
+    def test_numpy_and_pure_python_agree(self):
+        rng = random.Random(3)
+        words = "fone bluetooth garrafa termica mouse gamer cadeira escritorio kit tenis corrida air fryer".split()
+        signals = [" ".join(rng.sample(words, 3)) + f" {rng.randint(1, 40)}" for _ in range(400)]
+        with mock.patch.object(preclustering, "HAS_NUMPY", False):
+            pure = bucket_signals(signals)
+        self.assertEqual(bucket_signals(signals), pure)
+
+    def test_expand_and_offline_clusters(self):
+        buckets = bucket_signals(SIGNALS)
+        clusters = expand_representatives([{"cluster_name": "Fones", "source_signals_used": ["fone bluetooth"]}], buckets)
+        self.assertEqual(len(clusters[0]["source_signals_used"]), 4)
+
+        offline = offline_clusters(buckets)
+        self.assertEqual([c["cluster_name"] for c in offline], ["Fone Bluetooth", "garrafa térmica", "mouse gamer"])
+        self.assertEqual(offline[0]["confidence_score"], 50)
+
+    def test_processor_falls_back_to_local_buckets_without_key(self):
+        with mock.patch.object(ai_processor, "save_cluster", return_value=7) as save, \
+                mock.patch.object(AIProcessor, "_save_raw_output"):
+            clusters = AIProcessor(None).analyze_signals(SIGNALS)
+        self.assertEqual(len(clusters), 3)
+        self.assertEqual(save.call_count, 3)
+        self.assertEqual(clusters[0]["db_id"], 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
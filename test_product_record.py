@@ -0,0 +1,65 @@
+import json
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src.services.metrics.metrics_service import RunningMarketStats
+from src.utils.jsonl import read_records, write_records
+from src.utils.product_record import ProductRecord
+
+ML_DICT = {
+    "timestamp": "2025-03-01T12:00:00+00:00", "source": "mercadolivre_api", "search_keyword": "fone",
+    "marketplace": "Mercado Livre", "title": "Fone X", "price": 99.9, "permalink": "https://ml/1",
+    "thumbnail": None, "free_shipping": True, "rating": 0.0, "reviews_count": 0, "seller_name": "loja",
+}
+AMAZON_DICT = {
+    "timestamp": "2025-03-01T12:00:00+00:00", "source": "amazon_br_scraping", "search_keyword": "fone",
+    "title": "Fone Y", "price": 0.0, "permalink": "https://amz/1", "thumbnail": "t.jpg", "rating": 4.5, "is_prime": False,
+}
+
+
+class TestProductRecord(unittest.TestCase):
+    def test_dict_round_trip_keeps_key_order(self):
+        for data in (ML_DICT, AMAZON_DICT, {**AMAZON_DICT, "brand": "JBL"}):
+            record = ProductRecord.from_dict(data)
+            self.assertEqual(list(record.to_dict().items()), list(data.items()))
+
+    def test_reads_like_the_old_dicts(self):
+        record = ProductRecord.from_dict(AMAZON_DICT)
+        self.assertEqual(record["price"], 0.0)
+        self.assertEqual(record.get("timestamp"), "2025-03-01T12:00:00+00:00")
+        self.assertIsNone(record.get("seller_name"))
+        self.assertEqual(record.get("marketplace", "Unknown"), "Unknown")
+        self.assertNotIn("free_shipping", record)
+        with self.assertRaises(KeyError):
+            record["url"]
+
+        stats, expected = RunningMarketStats(), RunningMarketStats()
+        stats.add(ProductRecord.from_dict(ML_DICT))
+        expected.add(ML_DICT)
+        self.assertEqual((stats.concentration, stats.compression), (expected.concentration, expected.compression))
+
+    def test_compact_and_interned(self):
+        a = ProductRecord("mercado" + "livre_api", "fone", "A", 10, "u1", seller_name="lo" + "ja")
+        b = ProductRecord("mercadolivre_api", "fo" + "ne", "B", "12", "u2", seller_name="loja")
+        self.assertIs(a.source, b.source)
+        self.assertIs(a.search_keyword, b.search_keyword)
+        self.assertIs(a.seller_name, b.seller_name)
+        self.assertEqual(b.price, 12.0)
+        self.assertFalse(hasattr(a, "__dict__"))
+        self.assertLessEqual(abs(a.timestamp - datetime.now(timezone.utc).timestamp()), 5)
+        self.assertLess(sys.getsizeof(a) * 3, sys.getsizeof(ML_DICT) + sys.getsizeof(ML_DICT["timestamp"]))
+
+    def test_serialised_at_the_json_boundary(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "products.jsonl"
+            write_records(path, [ProductRecord.from_dict(ML_DICT)])
+            self.assertEqual(read_records(path), [ML_DICT])
+        with self.assertRaises(TypeError):
+            json.dumps(ProductRecord.from_dict(ML_DICT))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.utils import keyword_utils
+from src.utils.raw_manifest import MANIFEST_NAME, RawManifest
+
+
+class TestRawManifest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.raw = Path(tmp.name)
+        self.manifest = RawManifest(self.raw)
+
+    def write(self, name, payload, bump=0):
+        path = self.raw / name
+        path.write_text(json.dumps(payload), encoding="utf-8")
+        # Directory mtime resolution can be coarse; force a visible change
+        st = os.stat(self.raw)
+        os.utime(self.raw, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000 * (bump + 1)))
+        return path
+
+    def test_latest_by_prefix_source_and_count(self):
+        self.write("ml_keywords-20250101T000000Z.json", {"source": "ml", "keywords": ["a"]})
+        self.write("ml_keywords-20250301T000000Z.json", {"source": "ml", "keywords": []}, 1)
+        self.write("ml_keywords-20250201T000000Z.json", {"source": "gt", "keywords": ["b"]}, 2)
+        self.write("mercado_livre-20250101T000000Z.json", [{"title": "x"}], 3)
+
+        self.assertEqual(self.manifest.latest("ml_keywords").name, "ml_keywords-20250301T000000Z.json")
+        self.assertEqual(self.manifest.latest("ml_keywords", nonempty=True).name,
+                         "ml_keywords-20250201T000000Z.json")
+        self.assertEqual(self.manifest.latest("ml_keywords", source="ml", nonempty=True).name,
+                         "ml_keywords-20250101T000000Z.json")
+        self.assertEqual(self.manifest.latest("mercado_livre").name, "mercado_livre-20250101T000000Z.json")
+        self.assertIsNone(self.manifest.latest("amazon"))
+        self.assertEqual(self.manifest.prefixes(), ["mercado_livre", "ml_keywords"])
+
+    def test_deletions_and_other_instances(self):
+        self.write("amazon-20250101T000000Z.json", [1])
+        newest = self.write("amazon-20250102T000000Z.json", [2], 1)
+        self.assertEqual(self.manifest.latest("amazon"), newest)
+
+        newest.unlink()
+        self.write("other-20250101T000000Z.json", [], 2)
+        self.assertEqual(self.manifest.latest("amazon").name, "amazon-20250101T000000Z.json")
+
+        # A second process reads the lines the first one appended instead of re-hashing files
+        other = RawManifest(self.raw)
+        with mock.patch.object(RawManifest, "record", side_effect=AssertionError("re-indexed")):
+            self.assertEqual(other.latest("amazon").name, "amazon-20250101T000000Z.json")
+        self.assertTrue((self.raw / MANIFEST_NAME).exists())
+
+    def test_rebuild(self):
+        self.write("gt_keywords-20250101T000000Z.json", {"source": "gt", "keywords": ["x"]})
+        self.manifest.latest("gt_keywords")
+        self.manifest.rebuild()
+        lines = (self.raw / MANIFEST_NAME).read_text(encoding="utf-8").splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])["count"], 1)
+
+    def test_load_keywords_uses_manifest(self):
+        self.write("ml_keywords-20250101T000000Z.json", {"source": "ml", "keywords": ["fone"]})
+        self.write("gt_keywords-20250102T000000Z.json", {"source": "gt", "keywords": ["tv"]}, 1)
+        self.write("gt_keywords-20250103T000000Z.json", {"source": "gt", "keywords": []}, 2)
+
+        with mock.patch.object(keyword_utils, "DATA_DIR", self.raw):
+            self.assertEqual(keyword_utils.load_keywords(["ml"]), (["fone"], "ml"))
+            self.assertEqual(keyword_utils.load_keywords(["amazon"]), (["tv"], "gt"))
+            path = keyword_utils.save_keywords(["mouse"], "ml")
+            self.assertEqual(keyword_utils.load_keywords(["ml"]), (["mouse"], "ml"))
+        self.assertIn(path.name, {e["file"] for e in self.manifest.entries()})
+
+
+if __name__ == "__main__":
+    unittest.main()
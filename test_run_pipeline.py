@@ -0,0 +1,83 @@
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import mock
+
+import run_pipeline
+
+
+class TestInProcessRunner(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.runs_log = Path(tmp.name) / "pipeline_runs.jsonl"
+        patcher = mock.patch.object(run_pipeline, "RUNS_LOG", self.runs_log)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_main(self, argv=()):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            run_pipeline.main(list(argv))
+        return out.getvalue()
+
+    def test_stages_share_context_in_memory(self):
+        seen = {}
+
+        def collect(ctx):
+            ctx["ml_data"] = [{"title": "Fone"}]
+
+        def score(ctx):
+            seen.update(ctx)
+
+        with mock.patch.object(run_pipeline, "collect_products", collect), \
+             mock.patch.object(run_pipeline, "score_opportunities", score), \
+             mock.patch.object(run_pipeline, "run_command") as subprocess_run:
+            output = self.run_main()
+
+        subprocess_run.assert_not_called()
+        self.assertEqual(seen["ml_data"], [{"title": "Fone"}])
+        self.assertIn("Tempo por etapa", output)
+        self.assertIn("Etapas concluídas: 2/2", output)
+
+    def test_failure_stops_pipeline(self):
+        score = mock.Mock()
+        with mock.patch.object(run_pipeline, "collect_products", side_effect=RuntimeError("boom")), \
+             mock.patch.object(run_pipeline, "score_opportunities", score), \
+             self.assertRaises(SystemExit), redirect_stdout(io.StringIO()), \
+             mock.patch("traceback.print_exc"):
+            run_pipeline.main([])
+        score.assert_not_called()
+
+    def test_isolated_mode_uses_subprocesses(self):
+        with mock.patch.object(run_pipeline, "run_command", return_value=True) as subprocess_run, \
+             mock.patch.object(run_pipeline, "collect_products") as collect:
+            self.run_main(["--isolated"])
+        self.assertEqual([c.args[0] for c in subprocess_run.call_args_list],
+                         ["src.services.mercadolivre_service", "src.services.pipeline_v2"])
+        collect.assert_not_called()
+
+    def test_full_graph_runs_collectors_before_clustering(self):
+        calls = []
+
+        def script(path, args, desc):
+            calls.append(path)
+            return True
+
+        with mock.patch.object(run_pipeline, "run_script", side_effect=script), \
+             mock.patch.object(run_pipeline, "collect_products"), \
+             mock.patch.object(run_pipeline, "score_opportunities"):
+            self.run_main(["--full", "--workers", "3"])
+
+        self.assertLess(calls.index("sources/intent_signals.py"), calls.index("sources/ai_processor.py"))
+        self.assertLess(calls.index("sources/ai_processor.py"), calls.index("sources/amazon.py"))
+        record = json.loads(self.runs_log.read_text(encoding="utf-8").splitlines()[-1])
+        self.assertEqual(record["critical_path"][-1], "scoring")
+        self.assertEqual(len(record["stages"]), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
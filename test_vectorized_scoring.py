@@ -0,0 +1,80 @@
+import random
+import unittest
+from unittest import mock
+
+from src.services.scoring import scoring_service, vectorized_scoring
+from src.services.scoring.scoring_service import calculate_indice_intencao_v2, calculate_indice_intencao_v2_batch
+
+
+def random_entries(n_terms=300, seed=7):
+    rng = random.Random(seed)
+    entries = []
+    for t in range(n_terms):
+        items = []
+        for _ in range(rng.choice([0, 1, 2, 5, 30])):
+            item = {"price": rng.choice([0, rng.randint(1, 500), round(rng.uniform(1, 999), 2)])}
+            if rng.random() < 0.8:
+                item["rating"] = rng.choice([0, 3, 4.5, round(rng.uniform(1, 5), 1)])
+            key = rng.choice(["seller_name", "brand", None])
+            if key:
+                item[key] = f"s{rng.randint(0, 6)}"
+            items.append(item)
+        entries.append({
+            "term": f"term-{t}",
+            "ai_confidence": rng.choice([0.0, 0.35, 0.9, 1.3]),
+            "source_count": rng.choice([1, 2, 3, 5]),
+            "scraped_data": items,
+            "velocity_meta": {"velocity_index": rng.uniform(-0.2, 1.2), "acceleration": 0.0, "trend_direction": "stable"},
+        })
+    return entries
+
+
+@unittest.skipUnless(vectorized_scoring.HAS_NUMPY, "numpy not installed")
+class TestVectorizedScoring(unittest.TestCase):
+    def test_matches_scalar_scores_exactly(self):
+        entries = random_entries()
+        expected = [calculate_indice_intencao_v2(**e) for e in entries]
+        self.assertEqual(calculate_indice_intencao_v2_batch(entries), expected)
+
+    def test_malformed_items_fail_like_the_scalar_path(self):
+        for bad in ({"price": None}, {"price": "15"}, {"price": 10, "rating": "4.5"}, {"price": True}):
+            entry = dict(random_entries(n_terms=1)[0], scraped_data=[{"price": 20, "rating": 4}, bad])
+            with self.assertRaises(TypeError, msg=bad):
+                calculate_indice_intencao_v2_batch([entry])
+            if not isinstance(bad["price"], bool):  # True > 0 is valid Python: scalar scores it as 1
+                with self.assertRaises(TypeError, msg=bad):
+                    calculate_indice_intencao_v2(**entry)
+
+    def test_unrounded_indices_match_metric_helpers(self):
+        from src.services.metrics import metrics_service as m
+        entries = random_entries(n_terms=50, seed=3)
+        columns = vectorized_scoring.build_columns([e["scraped_data"] for e in entries])
+        n = len(entries)
+        conc = vectorized_scoring.concentration(columns["term_id"], columns["seller_id"], columns["n_sellers"], n)
+        comp = vectorized_scoring.price_compression(columns["term_id"], columns["price"], n)
+        qual = vectorized_scoring.quality_opportunity(columns["term_id"], columns["rating"], n)
+        for i, e in enumerate(entries):
+            self.assertEqual(conc[i], m.analyze_market_concentration(e["scraped_data"]))
+            self.assertEqual(comp[i], m.analyze_price_compression(e["scraped_data"]))
+            self.assertEqual(qual[i], m.analyze_quality_opportunity(e["scraped_data"]))
+
+
+class TestBatchFallback(unittest.TestCase):
+    def test_without_numpy_uses_per_term_path(self):
+        entries = random_entries(n_terms=20)
+        with mock.patch.object(vectorized_scoring, "HAS_NUMPY", False):
+            results = calculate_indice_intencao_v2_batch(entries)
+        self.assertEqual(results, [calculate_indice_intencao_v2(**e) for e in entries])
+
+    def test_missing_velocity_is_loaded_in_one_batch(self):
+        entries = [{"term": "a"}, {"term": "b"}]
+        stable = {"velocity_index": 0.5, "acceleration": 0.0, "trend_direction": "stable"}
+        with mock.patch.object(scoring_service, "calculate_search_velocities",
+                               return_value={"a": stable, "b": stable}) as batch:
+            results = calculate_indice_intencao_v2_batch(entries)
+        batch.assert_called_once_with(["a", "b"])
+        self.assertEqual(len(results), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
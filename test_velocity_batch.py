@@ -0,0 +1,47 @@
+import unittest
+from datetime import datetime, timedelta
+
+from src.database import database
+from src.services.metrics.metrics_service import calculate_search_velocities, calculate_search_velocity
+
+from test_bulk_writes import DatabaseTestCase
+
+
+class TestBatchedVelocity(DatabaseTestCase):
+    def seed(self, term, values, metric_type="occurrence_rank"):
+        start = datetime(2026, 1, 1)
+        database.add_term_history_snapshot(term, 0.0, metric_type="bootstrap")  # creates the table
+        with database.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                "INSERT INTO search_term_history (term, source, metric_value, metric_type, captured_at) VALUES (?, ?, ?, ?, ?)",
+                [(term, "test", v, metric_type, start + timedelta(days=i)) for i, v in enumerate(values)],
+            )
+
+    def test_windowed_query_keeps_latest_rows_per_term(self):
+        self.seed("fone", range(1, 21))
+        self.seed("mouse", [5, 3])
+        histories = database.get_term_histories(["fone", "mouse", "unknown"], limit=7)
+
+        self.assertEqual([r["metric_value"] for r in histories["fone"]], [20, 19, 18, 17, 16, 15, 14])
+        self.assertEqual(len(histories["mouse"]), 2)
+        self.assertNotIn("unknown", histories)
+
+    def test_matches_per_term_velocity(self):
+        self.seed("fone", [1, 2, 4, 8])
+        self.seed("mouse", [10, 6, 3])
+        self.seed("teclado", [5])
+        self.seed("cabo", [3, 3], metric_type="occurrence")  # other metric: ignored by both paths
+        terms = ["fone", "mouse", "teclado", "cabo", "nada"]
+
+        batched = calculate_search_velocities(terms)
+        self.assertEqual(batched, {term: calculate_search_velocity(term) for term in terms})
+        self.assertEqual(batched["fone"]["trend_direction"], "exploding")
+        self.assertEqual(batched["mouse"]["trend_direction"], "declining")
+
+    def test_missing_table_returns_empty(self):
+        self.assertEqual(database.get_term_histories(["fone"]), {})
+
+
+if __name__ == "__main__":
+    unittest.main()